@@ -0,0 +1,150 @@
+import crypto from 'crypto';
+import { promises as fs } from 'fs';
+import path from 'path';
+import { clearInterval, setInterval } from 'timers';
+import { CacheEntry, CacheStore } from './types';
+
+const SWEEP_INTERVAL_MS = 10 * 60 * 1000; // full directory scan, off the request path
+const SWEEP_LOW_WATERMARK = 0.9; // evict down to 90% of maxBytes so the next writes do not evict again
+const STALE_TMP_MS = 60 * 1000;
+
+// One JSON file per key in a directory that survives restarts and can be
+// mounted into several api replicas. Files are written to a temp name and
+// renamed, so concurrent replicas never read a partial entry. Each file's
+// mtime is set to its expiresAt, so sweep() decides expiry from stat alone.
+// Size and expiry of known files are kept in memory: set() evicts from that
+// index without touching the directory, and only the periodic sweep() stats
+// every file (to pick up other replicas' writes and stale temp files).
+export class DiskStore implements CacheStore {
+  private index = new Map<string, { size: number; expiresAt: number }>();
+  private bytes = 0;
+  private sweeping?: Promise<void>;
+  private timer?: NodeJS.Timeout;
+
+  constructor(private dir: string, private maxBytes: number) {}
+
+  async init() {
+    await fs.mkdir(this.dir, { recursive: true });
+    await this.sweep();
+    this.timer = setInterval(() => {
+      this.sweep().catch((err) => console.error('Cache error: ', err));
+    }, SWEEP_INTERVAL_MS);
+    this.timer.unref();
+  }
+
+  close() {
+    clearInterval(this.timer);
+  }
+
+  async get(key: string) {
+    const file = this.file(key);
+    try {
+      const entry: CacheEntry = JSON.parse(await fs.readFile(file, 'utf8'));
+      if (entry.expiresAt <= Date.now()) {
+        await fs.unlink(file).catch(() => undefined);
+        this.untrack(file);
+        return undefined;
+      }
+      return entry;
+    } catch (err) {
+      // Missing (removed by another replica) or unreadable
+      this.untrack(file);
+      return undefined;
+    }
+  }
+
+  async set(key: string, entry: CacheEntry) {
+    const file = this.file(key);
+    const tmp = `${file}.${process.pid}.tmp`;
+    const body = JSON.stringify(entry);
+    await fs.writeFile(tmp, body);
+    const expiresAt = new Date(entry.expiresAt);
+    await fs.utimes(tmp, expiresAt, expiresAt);
+    await fs.rename(tmp, file);
+    this.track(file, Buffer.byteLength(body), entry.expiresAt);
+
+    if (this.bytes > this.maxBytes) {
+      await this.evict();
+    }
+  }
+
+  stats() {
+    return { entries: this.index.size, bytes: this.bytes };
+  }
+
+  // Rebuilds the index from the directory: drops expired entries and stale temp files,
+  // then evicts like set() does. Entry files are never opened: their mtime is the expiry time
+  sweep() {
+    if (!this.sweeping) {
+      const done = () => (this.sweeping = undefined);
+      this.sweeping = this.scan().then(done, (err) => {
+        done();
+        throw err;
+      });
+    }
+    return this.sweeping;
+  }
+
+  private async scan() {
+    const now = Date.now();
+    const index = new Map<string, { size: number; expiresAt: number }>();
+    for (const name of await fs.readdir(this.dir)) {
+      const file = path.join(this.dir, name);
+      try {
+        const stat = await fs.stat(file);
+        const isExpiredEntry = name.endsWith('.json') && stat.mtimeMs <= now;
+        const isStaleTmp =
+          name.endsWith('.tmp') && now - stat.mtimeMs > STALE_TMP_MS;
+        if (isExpiredEntry || isStaleTmp) {
+          await fs.unlink(file);
+        } else if (name.endsWith('.json')) {
+          index.set(file, { size: stat.size, expiresAt: stat.mtimeMs });
+        }
+      } catch (err) {
+        // Removed or rewritten by another replica in the meantime
+      }
+    }
+
+    this.index = index;
+    this.bytes = [...index.values()].reduce((sum, { size }) => sum + size, 0);
+    await this.evict();
+  }
+
+  // Drops expired entries, then the ones closest to expiry until the index fits in maxBytes again
+  private async evict() {
+    if (this.bytes <= this.maxBytes * SWEEP_LOW_WATERMARK) {
+      return;
+    }
+    const now = Date.now();
+    const files = [...this.index.entries()].sort(
+      (a, b) => a[1].expiresAt - b[1].expiresAt
+    );
+    for (const [file, { expiresAt }] of files) {
+      const fits = this.bytes <= this.maxBytes * SWEEP_LOW_WATERMARK;
+      if (expiresAt > now && fits) {
+        break;
+      }
+      this.untrack(file);
+      await fs.unlink(file).catch(() => undefined);
+    }
+  }
+
+  private track(file: string, size: number, expiresAt: number) {
+    this.untrack(file);
+    this.index.set(file, { size, expiresAt });
+    this.bytes += size;
+  }
+
+  private untrack(file: string) {
+    const known = this.index.get(file);
+    if (known) {
+      this.index.delete(file);
+      this.bytes -= known.size;
+    }
+  }
+
+  private file(key: string) {
+    const hash = crypto.createHash('sha1').update(key).digest('hex');
+    return path.join(this.dir, `${hash}.json`);
+  }
+}
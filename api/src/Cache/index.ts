@@ -0,0 +1,38 @@
+import { Request, Response } from 'express';
+import config from '../config';
+import { DiskStore } from './diskStore';
+import { MemoryStore } from './memoryStore';
+import { createCacheMiddleware } from './middleware';
+import { TieredStore } from './tieredStore';
+import { ttlFor } from './ttl';
+import { CacheStore } from './types';
+
+export { MemoryStore } from './memoryStore';
+export { DiskStore } from './diskStore';
+export { TieredStore } from './tieredStore';
+export { createCacheMiddleware } from './middleware';
+export { ttlFor } from './ttl';
+export * from './types';
+
+const memory = new MemoryStore(config.cacheMaxBytes);
+const disk = config.cacheDir
+  ? new DiskStore(config.cacheDir, config.cacheDiskMaxBytes)
+  : null;
+if (disk) {
+  disk.init().catch((err) => console.error('Cache error: ', err));
+}
+const store: CacheStore = disk ? new TieredStore(memory, disk) : memory;
+
+const { middleware, counters } = createCacheMiddleware(store, ttlFor);
+
+export const responseCache = middleware;
+
+export const cacheStats = (_req: Request, res: Response) => {
+  const lookups = counters.hits + counters.misses;
+  res.json({
+    ...counters,
+    hitRatio: lookups ? counters.hits / lookups : 0,
+    memory: memory.stats(),
+    disk: disk ? disk.stats() : null,
+  });
+};
@@ -0,0 +1,52 @@
+import { CacheEntry, CacheStore, entrySize } from './types';
+
+// LRU bounded by the total byte size of keys and bodies.
+// Map keeps insertion order, so re-inserting on read makes the first key the least recently used.
+export class MemoryStore implements CacheStore {
+  private entries = new Map<string, CacheEntry>();
+  private bytes = 0;
+
+  constructor(private maxBytes: number) {}
+
+  async get(key: string) {
+    const entry = this.entries.get(key);
+    if (!entry) {
+      return undefined;
+    }
+    this.delete(key);
+    if (entry.expiresAt <= Date.now()) {
+      return undefined;
+    }
+    this.insert(key, entry);
+    return entry;
+  }
+
+  async set(key: string, entry: CacheEntry) {
+    this.delete(key);
+    if (entrySize(key, entry) > this.maxBytes) {
+      return;
+    }
+    this.insert(key, entry);
+    while (this.bytes > this.maxBytes) {
+      const oldest = this.entries.keys().next().value as string;
+      this.delete(oldest);
+    }
+  }
+
+  stats() {
+    return { entries: this.entries.size, bytes: this.bytes };
+  }
+
+  private insert(key: string, entry: CacheEntry) {
+    this.entries.set(key, entry);
+    this.bytes += entrySize(key, entry);
+  }
+
+  private delete(key: string) {
+    const entry = this.entries.get(key);
+    if (entry) {
+      this.entries.delete(key);
+      this.bytes -= entrySize(key, entry);
+    }
+  }
+}
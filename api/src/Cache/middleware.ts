@@ -0,0 +1,94 @@
+import { NextFunction, Request, Response } from 'express';
+import { CacheEntry, CacheStore } from './types';
+
+export interface CacheCounters {
+  hits: number;
+  misses: number;
+  coalesced: number;
+  stores: number;
+}
+
+const replay = (res: Response, entry: CacheEntry, status: string) => {
+  res.set('X-Cache', status);
+  if (entry.contentType) {
+    res.set('Content-Type', entry.contentType);
+  }
+  res.status(entry.status).send(entry.body);
+};
+
+// Caches successful (2xx) GET responses with a TTL chosen per URL. Concurrent requests
+// for the same key are coalesced: only the first one reaches the route (and the
+// upstream GraphQL API), the others wait for its response and replay it.
+export const createCacheMiddleware = (
+  store: CacheStore,
+  ttlFor: (url: string) => number
+) => {
+  const counters: CacheCounters = { hits: 0, misses: 0, coalesced: 0, stores: 0 };
+  const inFlight = new Map<string, Promise<CacheEntry | undefined>>();
+
+  const middleware = async (req: Request, res: Response, next: NextFunction) => {
+    const ttl = ttlFor(req.originalUrl);
+    if (req.method !== 'GET' || ttl <= 0) {
+      return next();
+    }
+    const key = `${req.method} ${req.originalUrl}`;
+
+    const pending = inFlight.get(key);
+    if (pending) {
+      counters.coalesced += 1;
+      const entry = await pending;
+      return entry ? replay(res, entry, 'COALESCED') : next();
+    }
+
+    let resolve: (entry: CacheEntry | undefined) => void = () => undefined;
+    const promise = new Promise<CacheEntry | undefined>((r) => (resolve = r));
+    inFlight.set(key, promise);
+    let finished = false;
+    const finish = (entry: CacheEntry | undefined) => {
+      if (finished) {
+        return;
+      }
+      finished = true;
+      if (inFlight.get(key) === promise) {
+        inFlight.delete(key);
+      }
+      resolve(entry);
+    };
+
+    const cached = await store.get(key).catch(() => undefined);
+    if (cached) {
+      counters.hits += 1;
+      finish(cached);
+      return replay(res, cached, 'HIT');
+    }
+    counters.misses += 1;
+
+    // res.json() serializes and calls res.send() with a string; capture that call
+    const send = res.send.bind(res);
+    res.send = (body?: any) => {
+      if (typeof body !== 'string') {
+        return send(body);
+      }
+      let entry: CacheEntry | undefined;
+      if (res.statusCode >= 200 && res.statusCode < 300) {
+        entry = {
+          status: res.statusCode,
+          contentType: res.get('Content-Type'),
+          body,
+          expiresAt: Date.now() + ttl * 1000,
+        };
+        counters.stores += 1;
+        store.set(key, entry).catch((err) => console.error('Cache error: ', err));
+      }
+      finish(entry);
+      res.set('X-Cache', 'MISS');
+      return send(body);
+    };
+    // Waiters must not hang if the route ends the response without res.send()
+    res.on('close', () => finish(undefined));
+
+    next();
+  };
+
+  return { middleware, counters };
+};
@@ -0,0 +1,27 @@
+import { CacheEntry, CacheStore } from './types';
+
+// Memory LRU in front of a persistent store: hits from the persistent store are promoted to memory
+export class TieredStore implements CacheStore {
+  constructor(private memory: CacheStore, private persistent: CacheStore) {}
+
+  async get(key: string) {
+    const entry = await this.memory.get(key);
+    if (entry) {
+      return entry;
+    }
+    const stored = await this.persistent.get(key);
+    if (stored) {
+      await this.memory.set(key, stored);
+    }
+    return stored;
+  }
+
+  async set(key: string, entry: CacheEntry) {
+    await this.memory.set(key, entry);
+    await this.persistent.set(key, entry);
+  }
+
+  stats() {
+    return this.memory.stats();
+  }
+}
@@ -0,0 +1,21 @@
+const MINUTE = 60;
+const HOUR = 60 * MINUTE;
+
+// TTL in seconds per route class, first match wins; 0 disables caching.
+// Problem bodies barely change, while submissions are only useful when fresh.
+const ttlRules: [RegExp, number][] = [
+  [/^\/cache\//, 0],
+  [/^\/(select|officialSolution|problems)(\?|$)/, 24 * HOUR],
+  [/^\/(daily|dailyQuestion)(\?|$)/, HOUR],
+  [/^\/globalRanking(\?|$)/, HOUR],
+  [/^\/(trendingDiscuss|discussTopic|discussComments)(\/|\?|$)/, 10 * MINUTE],
+  [/^\/[^/?]+\/(submission|acSubmission|calendar)(\?|$)/, MINUTE],
+  [/^\/userProfileCalendar(\?|$)/, MINUTE],
+];
+
+const DEFAULT_TTL = 5 * MINUTE;
+
+export const ttlFor = (url: string) => {
+  const rule = ttlRules.find(([pattern]) => pattern.test(url));
+  return rule ? rule[1] : DEFAULT_TTL;
+};
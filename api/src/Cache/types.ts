@@ -0,0 +1,15 @@
+export interface CacheEntry {
+  status: number;
+  contentType?: string;
+  body: string;
+  expiresAt: number; // epoch ms
+}
+
+export interface CacheStore {
+  get(key: string): Promise<CacheEntry | undefined>;
+  set(key: string, entry: CacheEntry): Promise<void>;
+  stats(): { entries: number; bytes: number };
+}
+
+export const entrySize = (key: string, entry: CacheEntry) =>
+  Buffer.byteLength(key) + Buffer.byteLength(entry.body);
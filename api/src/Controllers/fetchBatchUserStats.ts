@@ -0,0 +1,76 @@
+import { Response } from 'express';
+import { forwardRateLimit } from './upstream';
+import { BatchUserStatsData } from '../types';
+
+// Unknown usernames only null their own alias; any other error means the chunk was not answered
+const isUnknownUserError = (
+  error: { message?: string; path?: (string | number)[] },
+  data: BatchUserStatsData
+) =>
+  Array.isArray(error.path) &&
+  error.path.length === 1 &&
+  /^u\d+$/.test(String(error.path[0])) &&
+  data[error.path[0]] === null &&
+  /does not exist/i.test(error.message || '');
+
+const fetchBatchUserStats = async (
+  options: { usernames: string[]; chunkSize: number },
+  res: Response,
+  formatData: (data: BatchUserStatsData, usernames: string[]) => {},
+  buildQuery: (count: number) => string
+) => {
+  try {
+    let users = {};
+
+    // Chunks are sent one after another to stay within the upstream document size and rate limits
+    for (let start = 0; start < options.usernames.length; start += options.chunkSize) {
+      const chunk = options.usernames.slice(start, start + options.chunkSize);
+      const variables = chunk.reduce<Record<string, string>>(
+        (acc, username, i) => ({ ...acc, [`u${i}`]: username }),
+        {}
+      );
+
+      const response = await fetch('https://leetcode.com/graphql', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          Referer: 'https://leetcode.com',
+        },
+        body: JSON.stringify({
+          query: buildQuery(chunk.length),
+          variables,
+        }),
+      });
+
+      if (response.status === 429) {
+        return forwardRateLimit(response, res);
+      }
+
+      // Unknown usernames come back as null aliases next to per-alias errors; keep the rest.
+      // A missing document or any other error fails the whole request, so clients retry
+      // instead of recording every user of the chunk as empty.
+      const result = await response.json();
+      const errors: { message?: string; path?: (string | number)[] }[] =
+        result.errors || [];
+      if (
+        !response.ok ||
+        !result.data ||
+        !errors.every((error) => isUnknownUserError(error, result.data))
+      ) {
+        return res.status(502).json({
+          error: 'Upstream did not return the batch',
+          status: response.status,
+          errors,
+        });
+      }
+      users = { ...users, ...formatData(result.data, chunk) };
+    }
+
+    return res.json({ count: options.usernames.length, users });
+  } catch (err) {
+    console.error('Error: ', err);
+    return res.status(500).json({ error: String(err) });
+  }
+};
+
+export default fetchBatchUserStats;
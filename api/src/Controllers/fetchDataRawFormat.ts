@@ -1,4 +1,5 @@
 import { Response } from 'express';
+import { forwardRateLimit } from './upstream';
 
 const fetchDataRawFormat = async (
     options: { username: string },
@@ -20,7 +21,11 @@ const fetchDataRawFormat = async (
                 },
             }),
         });
-        
+
+        if (response.status === 429) {
+            return forwardRateLimit(response, res);
+        }
+
         const result = await response.json();
         if (!response.ok) {
             console.error(`HTTP error! status: ${response.status}`);
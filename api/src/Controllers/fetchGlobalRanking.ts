@@ -0,0 +1,43 @@
+import { Response } from 'express';
+import { forwardRateLimit } from './upstream';
+import { GlobalRankingData } from '../types';
+
+const fetchGlobalRanking = async (
+  options: { page: number },
+  res: Response,
+  formatData: (data: GlobalRankingData, page: number) => {},
+  query: string
+) => {
+  try {
+    const response = await fetch('https://leetcode.com/graphql', {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        Referer: 'https://leetcode.com',
+      },
+      body: JSON.stringify({
+        query: query,
+        variables: {
+          page: options.page,
+        },
+      }),
+    });
+
+    if (response.status === 429) {
+      return forwardRateLimit(response, res);
+    }
+
+    // Upstream errors keep a non-2xx status, so clients retry the page and the cache skips it
+    const result = await response.json();
+    if (!response.ok || result.errors || !result.data) {
+      return res.status(response.ok ? 502 : response.status).json(result);
+    }
+
+    return res.json(formatData(result.data, options.page));
+  } catch (err) {
+    console.error('Error: ', err);
+    return res.status(500).json({ error: String(err) });
+  }
+};
+
+export default fetchGlobalRanking;
@@ -1,4 +1,5 @@
 import { Response } from 'express';
+import { forwardRateLimit } from './upstream';
 import { UserData } from '../types';
 
 const fetchUserDetails = async (
@@ -23,6 +24,10 @@ const fetchUserDetails = async (
       }),
     });
 
+    if (response.status === 429) {
+      return forwardRateLimit(response, res);
+    }
+
     const result = await response.json();
 
     if (result.errors) {
@@ -2,4 +2,6 @@ export { default as fetchSingleProblem } from './fetchSingleProblem';
 export { default as fetchProblems } from './fetchProblems';
 export { default as fetchUserDetails } from './fetchUserDetails';
 export { default as fetchTrendingTopics } from './fetchDiscussion';
-export { default as fetchDataRawFormat } from './fetchDataRawFormat';
\ No newline at end of file
+export { default as fetchDataRawFormat } from './fetchDataRawFormat';
+export { default as fetchBatchUserStats } from './fetchBatchUserStats';
+export { default as fetchGlobalRanking } from './fetchGlobalRanking';
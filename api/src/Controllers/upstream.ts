@@ -0,0 +1,14 @@
+import { Response } from 'express';
+
+// Forwards an upstream 429 (with its Retry-After) so crawlers can back off
+// instead of reading an empty payload
+export const forwardRateLimit = (
+  upstream: { headers: Headers },
+  res: Response
+) => {
+  const retryAfter = upstream.headers.get('retry-after');
+  if (retryAfter) {
+    res.set('Retry-After', retryAfter);
+  }
+  return res.status(429).json({ error: 'Too many requests' });
+};
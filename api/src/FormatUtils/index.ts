@@ -1,3 +1,4 @@
 export * from './userData';
 export * from './problemData';
-export * from './trendingTopicData';
\ No newline at end of file
+export * from './trendingTopicData';
+export * from './rankingData';
@@ -0,0 +1,20 @@
+import { GlobalRankingData } from '../types';
+
+// Flat rows with the same fields the leaderboard page shows
+export const formatGlobalRankingData = (
+  data: GlobalRankingData,
+  page: number
+) => ({
+  page,
+  totalUsers: data.globalRanking.totalUsers,
+  userPerPage: data.globalRanking.userPerPage,
+  users: data.globalRanking.rankingNodes.map((node) => ({
+    globalRank: node.currentGlobalRanking,
+    username: node.user.username,
+    displayName: node.user.profile.realName || node.user.username,
+    rating: Number(node.currentRating),
+    country: node.user.profile.countryName || null,
+    countryCode: node.user.profile.countryCode || null,
+    dataRegion: node.dataRegion,
+  })),
+});
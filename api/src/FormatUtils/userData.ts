@@ -1,4 +1,4 @@
-import { UserData } from '../types';
+import { BatchUserStatsData, UserData } from '../types';
 
 export const formatUserData = (data: UserData) => ({
   username: data.matchedUser.username,
@@ -42,15 +42,20 @@ export const formatContestHistoryData = (data: UserData) => ({
   contestHistory: data.userContestRankingHistory,
 });
 
-export const formatSolvedProblemsData = (data: UserData) => ({
-  solvedProblem: data.matchedUser.submitStats.acSubmissionNum[0].count,
-  easySolved: data.matchedUser.submitStats.acSubmissionNum[1].count,
-  mediumSolved: data.matchedUser.submitStats.acSubmissionNum[2].count,
-  hardSolved: data.matchedUser.submitStats.acSubmissionNum[3].count,
-  totalSubmissionNum: data.matchedUser.submitStats.totalSubmissionNum,
-  acSubmissionNum: data.matchedUser.submitStats.acSubmissionNum,
+const formatSubmitStats = (
+  submitStats: UserData['matchedUser']['submitStats']
+) => ({
+  solvedProblem: submitStats.acSubmissionNum[0].count,
+  easySolved: submitStats.acSubmissionNum[1].count,
+  mediumSolved: submitStats.acSubmissionNum[2].count,
+  hardSolved: submitStats.acSubmissionNum[3].count,
+  totalSubmissionNum: submitStats.totalSubmissionNum,
+  acSubmissionNum: submitStats.acSubmissionNum,
 });
 
+export const formatSolvedProblemsData = (data: UserData) =>
+  formatSubmitStats(data.matchedUser.submitStats);
+
 export const formatSubmissionData = (data: UserData) => ({
   count: data.recentSubmissionList.length,
   submission: data.recentSubmissionList,
@@ -64,3 +69,21 @@ export const formatAcSubmissionData = (data: UserData) => ({
 export const formatSubmissionCalendarData = (data: UserData) => ({
   submissionCalendar: data.matchedUser.submissionCalendar,
 });
+
+// Same shapes as /:username/solved and /languageStats, keyed by username
+export const formatBatchUserStatsData = (
+  data: BatchUserStatsData,
+  usernames: string[]
+) =>
+  usernames.reduce<Record<string, {} | null>>((acc, username, i) => {
+    const user = data[`u${i}`];
+    acc[username] = user
+      ? {
+          solved: formatSubmitStats(user.submitStats),
+          languageStats: {
+            matchedUser: { languageProblemCount: user.languageProblemCount },
+          },
+        }
+      : null;
+    return acc;
+  }, {});
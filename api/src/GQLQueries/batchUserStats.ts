@@ -0,0 +1,36 @@
+const userStatsFields = `
+        submitStats {
+            totalSubmissionNum {
+                difficulty
+                count
+                submissions
+            }
+            acSubmissionNum {
+                difficulty
+                count
+                submissions
+            }
+        }
+        languageProblemCount {
+            languageName
+            problemsSolved
+        }`;
+
+// One aliased matchedUser field per username ($u0 -> u0, $u1 -> u1, ...),
+// so the solved and language stats of a whole chunk come back in one upstream request
+const buildQuery = (count: number) => {
+  const variables: string[] = [];
+  const fields: string[] = [];
+  for (let i = 0; i < count; i++) {
+    variables.push(`$u${i}: String!`);
+    fields.push(`
+    u${i}: matchedUser(username: $u${i}) {${userStatsFields}
+    }`);
+  }
+
+  return `#graphql
+query getBatchUserStats(${variables.join(', ')}) {${fields.join('')}
+}`;
+};
+
+export default buildQuery;
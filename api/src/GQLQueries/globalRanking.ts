@@ -0,0 +1,22 @@
+const query = `#graphql
+query getGlobalRanking ($page: Int) {
+    globalRanking(page: $page) {
+        totalUsers
+        userPerPage
+        rankingNodes {
+            currentRating
+            currentGlobalRanking
+            dataRegion
+            user {
+                username
+                profile {
+                    realName
+                    countryCode
+                    countryName
+                }
+            }
+        }
+    }
+}`;
+
+export default query;
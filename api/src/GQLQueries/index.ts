@@ -8,4 +8,6 @@ export { default as userProfileQuery } from './userProfile';
 export { default as selectProblemQuery } from './selectProblem';
 export { default as submissionQuery } from './recentSubmit';
 export { default as trendingDiscussQuery } from './trendingDiscuss';
-export { default as languageStatsQuery } from './languageStats';
\ No newline at end of file
+export { default as languageStatsQuery } from './languageStats';
+export { default as buildBatchUserStatsQuery } from './batchUserStats';
+export { default as globalRankingQuery } from './globalRanking';
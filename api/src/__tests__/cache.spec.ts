@@ -0,0 +1,88 @@
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import request from 'supertest';
+import app from '../app';
+import { DiskStore, MemoryStore, ttlFor } from '../Cache';
+
+const entry = (body: string) => ({
+  status: 200,
+  body,
+  expiresAt: Date.now() + 60 * 1000,
+});
+
+describe('Response Cache Tests', () => {
+  it('Should serve a repeated request from the cache', async () => {
+    const url = `/select?titleSlug=two-sum&run=${Date.now()}`;
+    const before = (await request(app).get('/cache/stats')).body;
+
+    const first = await request(app).get(url);
+    const second = await request(app).get(url);
+
+    expect(first.headers['x-cache']).toBe('MISS');
+    expect(second.headers['x-cache']).toBe('HIT');
+    expect(second.body).toEqual(first.body);
+
+    const after = (await request(app).get('/cache/stats')).body;
+    expect(after.misses - before.misses).toBe(1);
+    expect(after.hits - before.hits).toBe(1);
+  });
+
+  it('Should coalesce concurrent requests for the same key', async () => {
+    const url = `/select?titleSlug=two-sum&run=coalesce-${Date.now()}`;
+    const before = (await request(app).get('/cache/stats')).body;
+
+    const responses = await Promise.all([
+      request(app).get(url),
+      request(app).get(url),
+      request(app).get(url),
+    ]);
+
+    const after = (await request(app).get('/cache/stats')).body;
+    expect(after.misses - before.misses).toBe(1);
+    expect(after.coalesced - before.coalesced).toBe(2);
+    responses.forEach((response) => expect(response.body).toEqual(responses[0].body));
+  });
+
+  it('Should evict the least recently used entry when over the byte limit', async () => {
+    const store = new MemoryStore(30);
+    await store.set('a', entry('1234567890'));
+    await store.set('b', entry('1234567890'));
+    await store.get('a');
+    await store.set('c', entry('1234567890'));
+
+    expect(await store.get('a')).toBeDefined();
+    expect(await store.get('b')).toBeUndefined();
+    expect(await store.get('c')).toBeDefined();
+    expect(store.stats().bytes).toBeLessThanOrEqual(30);
+  });
+
+  it('Should evict the disk entries closest to expiry when over the byte limit', async () => {
+    const dir = fs.mkdtempSync(path.join(os.tmpdir(), 'disk-store-'));
+    const store = new DiskStore(dir, 250);
+    await store.init();
+    const at = (seconds: number) => ({
+      ...entry('x'.repeat(50)),
+      expiresAt: Date.now() + seconds * 1000,
+    });
+    await store.set('soon', at(10));
+    await store.set('later', at(60));
+    await store.set('latest', at(120));
+
+    expect(await store.get('soon')).toBeUndefined();
+    expect(await store.get('later')).toBeDefined();
+    expect(await store.get('latest')).toBeDefined();
+    expect(store.stats().entries).toBe(2);
+    expect(fs.readdirSync(dir)).toHaveLength(2);
+
+    store.close();
+    fs.rmSync(dir, { recursive: true, force: true });
+  });
+
+  it('Should pick longer TTLs for problems than for submissions', () => {
+    expect(ttlFor('/select?titleSlug=two-sum')).toBeGreaterThan(
+      ttlFor('/jambobjones/submission')
+    );
+    expect(ttlFor('/cache/stats')).toBe(0);
+  });
+});
@@ -7,12 +7,44 @@ import {
   dailyProblem,
   problems,
   selectProblem,
+  batchUserStats,
+  globalRanking,
 } from './mockData';
 
 export const handlers = [
   msw.http.post('https://leetcode.com/graphql', async (ctx) => {
     const test = await ctx.request.json();
-    const typed = test as { query: string };
+    const typed = test as {
+      query: string;
+      variables?: { username?: string; u0?: string; page?: number };
+    };
+    if (typed.variables?.username === 'ratelimited') {
+      return new msw.HttpResponse(null, {
+        status: 429,
+        headers: { 'Retry-After': '7' },
+      });
+    }
+
+    if (typed.query.indexOf('getBatchUserStats') !== -1) {
+      if (typed.variables?.u0 === 'brokenbatch') {
+        return msw.HttpResponse.json({
+          data: null,
+          errors: [{ message: 'Query is too complex' }],
+        });
+      }
+      return msw.HttpResponse.json(batchUserStats);
+    }
+
+    if (typed.query.indexOf('getGlobalRanking') !== -1) {
+      if (typed.variables?.page === 9999) {
+        return msw.HttpResponse.json({
+          data: null,
+          errors: [{ message: 'Page out of range' }],
+        });
+      }
+      return msw.HttpResponse.json(globalRanking);
+    }
+
     if (typed.query.indexOf('getUserProfile') !== -1) {
       return msw.HttpResponse.json(singleUser);
     }
@@ -5,3 +5,5 @@ export { default as singleUserContests } from './singleUserContests.json';
 export { default as dailyProblem } from './dailyProblem.json';
 export { default as problems } from './problems.json';
 export { default as selectProblem } from './selectProblem.json';
+export { default as batchUserStats } from './batchUserStats.json';
+export { default as globalRanking } from './globalRanking.json';
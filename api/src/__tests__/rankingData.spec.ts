@@ -0,0 +1,36 @@
+import request from 'supertest';
+import app from '../app';
+
+describe('Global Ranking Tests', () => {
+  it('Should fetch a page of the global ranking', async () => {
+    const response = await request(app).get('/globalRanking?page=3');
+    expect(response.body.page).toBe(3);
+    expect(response.body.userPerPage).toBe(25);
+    expect(response.body.users).toHaveLength(2);
+    expect(response.body.users[0]).toEqual({
+      globalRank: 1,
+      username: 'neal_wu',
+      displayName: 'Neal Wu',
+      rating: 3686.245,
+      country: 'United States',
+      countryCode: 'US',
+      dataRegion: 'US',
+    });
+    expect(response.body.users[1].displayName).toBe('jiangly');
+    expect(response.body.users[1].country).toBeNull();
+  });
+
+  it('Should not cache an upstream error as a successful page', async () => {
+    const first = await request(app).get('/globalRanking?page=9999');
+    const second = await request(app).get('/globalRanking?page=9999');
+    expect(first.status).toBe(502);
+    expect(first.body.errors[0].message).toBe('Page out of range');
+    expect(second.status).toBe(502);
+    expect(second.headers['x-cache']).toBe('MISS');
+  });
+
+  it('Should reject an invalid page', async () => {
+    const response = await request(app).get('/globalRanking?page=0');
+    expect(response.status).toBe(400);
+  });
+});
@@ -84,9 +84,50 @@ describe('User Data Tests', () => {
     expect(response.body.count).toBeLessThanOrEqual(20);
   });
 
+  it('Should forward upstream rate limiting with Retry-After', async () => {
+    const response = await request(app).get('/ratelimited/solved');
+    expect(response.status).toBe(429);
+    expect(response.headers['retry-after']).toBe('7');
+  });
+
   it('Should fetch Users Submission Calendar', async () => {
     const response = await request(app).get('/jambobjones/calendar');
     assert('submissionCalendar' in response.body);
     expect(typeof response.body.submissionCalendar).toBe('string');
   });
+
+  it('Should fetch stats of several users in one batch', async () => {
+    const response = await request(app)
+      .post('/batch/userStats')
+      .send({ usernames: ['jambobjones', 'missinguser'] });
+    expect(response.body.count).toBe(2);
+    [
+      'solvedProblem',
+      'easySolved',
+      'mediumSolved',
+      'hardSolved',
+      'totalSubmissionNum',
+      'acSubmissionNum',
+    ].forEach((key) => {
+      assert(key in response.body.users.jambobjones.solved);
+    });
+    expect(
+      response.body.users.jambobjones.languageStats.matchedUser
+        .languageProblemCount
+    ).toHaveLength(2);
+    expect(response.body.users.missinguser).toBeNull();
+  });
+
+  it('Should fail a batch the upstream did not answer', async () => {
+    const response = await request(app)
+      .post('/batch/userStats')
+      .send({ usernames: ['brokenbatch', 'jambobjones'] });
+    expect(response.status).toBe(502);
+    expect(response.body.users).toBeUndefined();
+  });
+
+  it('Should reject a batch without usernames', async () => {
+    const response = await request(app).post('/batch/userStats').send({});
+    expect(response.status).toBe(400);
+  });
 });
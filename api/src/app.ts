@@ -2,8 +2,8 @@ import express, { NextFunction, Response } from 'express';
 import cors from 'cors';
 import * as leetcode from './leetCode';
 import { FetchUserDataRequest } from './types';
-import apicache from 'apicache';
 import axios from 'axios';
+import { cacheStats, responseCache } from './Cache';
 import {
   userContestRankingInfoQuery,
   discussCommentsQuery,
@@ -17,11 +17,11 @@ import {
 } from './GQLQueries/newQueries';
 
 const app = express();
-let cache = apicache.middleware;
 const API_URL = process.env.LEETCODE_API_URL || 'https://leetcode.com/graphql';
 
-app.use(cache('5 minutes'));
 app.use(cors()); //enable all CORS request
+// Successful GET responses only, with a TTL per route class (see Cache/ttl.ts)
+app.use(responseCache);
 app.use((req: express.Request, _res: Response, next: NextFunction) => {
   console.log('Requested URL:', req.originalUrl);
   next();
@@ -45,6 +45,9 @@ async function queryLeetCodeAPI(query: string, variables: any) {
   }
 }
 
+//cache hit/miss counters and sizes
+app.get('/cache/stats', cacheStats);
+
 app.get('/', (_req, res) => {
   res.json({
     apiOverview:
@@ -71,12 +74,15 @@ app.get('/', (_req, res) => {
         '/userProfileUserQuestionProgressV2/:userSlug':
           'Get your question progress',
         '/skillStats/:username': 'Get your skill stats',
+        'POST /batch/userStats {"usernames": [...]}':
+          'Get solved and language stats of up to 100 users in one call',
       },
       contest: {
         description:
           'Endpoints for retrieving contest ranking and performance data.',
         Method: 'GET',
         '/userContestRankingInfo/:username': 'Get user contest ranking info',
+        '/globalRanking?page=1': 'Get one page of the global contest ranking',
       },
       discussion: {
         description: 'Endpoints for fetching discussion topics and comments.',
@@ -85,6 +91,11 @@ app.get('/', (_req, res) => {
         '/discussTopic/:topicId': 'Get discussion topic',
         '/discussComments/:topicId': 'Get discussion comments',
       },
+      cache: {
+        description: 'Response cache hit/miss counters and sizes.',
+        Method: 'GET',
+        '/cache/stats': 'Get cache statistics',
+      },
       problems: {
         description:
           'Endpoints for fetching problem-related data, including lists, details, and solutions.',
@@ -241,6 +252,12 @@ app.get('/trendingDiscuss', leetcode.trendingCategoryTopics);
 
 app.get('/languageStats', leetcode.languageStats);
 
+//get one page of the global contest ranking
+app.get('/globalRanking', leetcode.globalRanking);
+
+//get solved and language stats of many users at once
+app.post('/batch/userStats', express.json(), leetcode.batchUserStats);
+
 // Construct options object on all user routes.
 app.use(
   '/:username*',
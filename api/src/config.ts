@@ -1,5 +1,16 @@
+import os from 'os';
+import path from 'path';
+
 const config = {
   port: process.env.PORT || 3000,
+  // POST /batch/userStats: max usernames per request and per upstream GraphQL document
+  batchMaxUsers: parseInt(process.env.BATCH_MAX_USERS || '100'),
+  batchChunkSize: parseInt(process.env.BATCH_CHUNK_SIZE || '25'),
+  // Response cache: in-memory LRU size, and an on-disk store shared by replicas ('' disables it).
+  // The default lives outside the app tree so cache writes do not restart `npm run dev` (nodemon)
+  cacheMaxBytes: parseInt(process.env.CACHE_MAX_BYTES || String(64 * 1024 * 1024)),
+  cacheDir: process.env.CACHE_DIR ?? path.join(os.tmpdir(), 'alfa-leetcode-api-cache'),
+  cacheDiskMaxBytes: parseInt(process.env.CACHE_DISK_MAX_BYTES || String(1024 * 1024 * 1024)),
 };
 
 export default config;
@@ -3,6 +3,7 @@ import * as gqlQueries from './GQLQueries';
 import * as formatUtils from './FormatUtils';
 import * as controllers from './Controllers';
 import { TransformedUserDataRequest } from './types';
+import config from './config';
 
 export const userData = (req: TransformedUserDataRequest, res: Response) => {
   controllers.fetchUserDetails(
@@ -168,4 +169,45 @@ export const languageStats = (_req: Request, res: Response) => {
     });
   }
  
-};
\ No newline at end of file
+};
+
+export const batchUserStats = (req: Request, res: Response) => {
+  const usernames = req.body?.usernames;
+  if (
+    Array.isArray(usernames) &&
+    usernames.length > 0 &&
+    usernames.length <= config.batchMaxUsers &&
+    usernames.every((username) => typeof username === 'string' && username)
+  ) {
+    controllers.fetchBatchUserStats(
+      { usernames, chunkSize: config.batchChunkSize },
+      res,
+      formatUtils.formatBatchUserStatsData,
+      gqlQueries.buildBatchUserStatsQuery
+    );
+  } else {
+    res.status(400).json({
+      error: `Missing or invalid body: usernames must be a list of 1 to ${config.batchMaxUsers} usernames`,
+      solution: 'send a JSON body with the usernames to fetch',
+      example: 'POST localhost:3000/batch/userStats {"usernames": ["uwi", "neal_wu"]}',
+    });
+  }
+};
+
+export const globalRanking = (req: Request, res: Response) => {
+  const page = Number(req.query.page ?? 1);
+  if (Number.isInteger(page) && page > 0) {
+    controllers.fetchGlobalRanking(
+      { page },
+      res,
+      formatUtils.formatGlobalRankingData,
+      gqlQueries.globalRankingQuery
+    );
+  } else {
+    res.status(400).json({
+      error: 'Invalid query parameter: page must be a positive integer',
+      solution: 'put the ranking page number after globalRanking',
+      example: 'localhost:3000/globalRanking?page=2',
+    });
+  }
+};
@@ -66,6 +66,39 @@ export interface UserData {
   recentSubmissionList: Submission[];
 }
 
+// Batch user stats: one alias (u0, u1, ...) per requested username, null for unknown users
+export type BatchUserStatsData = Record<
+  string,
+  | (Pick<MatchedUser, 'submitStats'> & {
+      languageProblemCount: {
+        languageName: string;
+        problemsSolved: number;
+      }[];
+    })
+  | null
+>;
+
+// Global contest ranking, one page of rankingNodes
+export interface GlobalRankingData {
+  globalRanking: {
+    totalUsers: number;
+    userPerPage: number;
+    rankingNodes: {
+      currentRating: string;
+      currentGlobalRanking: number;
+      dataRegion: string;
+      user: {
+        username: string;
+        profile: {
+          realName: string;
+          countryCode: string | null;
+          countryName: string | null;
+        };
+      };
+    }[];
+  };
+}
+
 interface Badge {
   name: string;
   icon: string;
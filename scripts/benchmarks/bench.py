@@ -0,0 +1,284 @@
+import sys
+import os
+import contextlib
+import importlib.util
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+# Сценарии запускают настоящий код скриптов
+scripts_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for name in ('fill-user-info', 'db-connector', 'data-extraction'):
+    sys.path.append(os.path.join(scripts_dir, name))
+root_dir = os.path.abspath(os.path.join(scripts_dir, '..'))
+
+from generate import SIZES, generate
+from mock_api import MockApiServer
+
+# --- Configuration ---
+SCENARIOS = ["crawl", "load", "reports"]
+DEFAULT_SIZES = ["10k", "100k"]  # 1M — явно: python bench.py 1M
+BENCH_DIR = os.path.join(root_dir, "results", "benchmarks")
+DATA_DIR = os.path.join(BENCH_DIR, "data")  # сгенерированные наборы, переиспользуются между запусками
+HISTORY_FILE = os.path.join(BENCH_DIR, "history.jsonl")  # по строке на запуск: коммит, окружение, метрики
+REGRESSION_THRESHOLD = 0.10  # метрика хуже предыдущего запуска больше чем на 10% — помечается как регрессия
+
+CRAWL_USERS = 2000  # пользователей из набора 10k на один прогон crawl
+CRAWL_LATENCY_MS = 20.0  # задержка mock api
+CRAWL_RATE_429 = 0.01  # доля ответов 429 от mock api
+CRAWL_CONCURRENCY = 16
+CRAWL_BATCH_SIZE = 25  # для сценария crawl_batch (POST /batch/userStats)
+CRAWL_RATE_LIMIT_PER_SEC = 200.0  # стартовый темп token bucket; сам limiter — часть измеряемого пути
+CRAWL_MAX_RATE_PER_SEC = 1000.0
+CRAWL_INSTANCES = 3  # mock-серверов в сценарии crawl_sharded (шардирование fill-user-info по BASE_URLS)
+
+BENCH_SCHEMA = "leetcode_bench"  # load пишет в отдельную схему той же БД, данные в public не трогаются
+
+# Направление метрик: для *_per_sec больше — лучше, для секунд меньше — лучше
+HIGHER_IS_BETTER = ("users_per_sec", "rows_per_sec", "lookups_per_sec")
+
+
+def load_fill_user_info():
+    """fill-user-info.py с дефисом в имени не импортируется обычным import — загружается по пути"""
+    path = os.path.join(scripts_dir, "fill-user-info", "fill-user-info.py")
+    spec = importlib.util.spec_from_file_location("fill_user_info_bench", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# --- Scenarios ---
+
+def bench_crawl(batch_size, instances=1):
+    """
+    users/sec fill-user-info против mock api (CRAWL_LATENCY_MS задержки, CRAWL_RATE_429 ответов 429):
+    полный путь main() — EndpointPool, token bucket, запись CSV и чекпоинты ProgressStore.
+    При instances > 1 пользователи шардируются между несколькими mock-серверами (каждый со своим
+    лимитом), число потоков растёт пропорционально.
+    """
+    from endpoint_pool import EndpointPool
+
+    users_path = os.path.join(generate("10k", DATA_DIR), "users.csv")
+    servers = [
+        MockApiServer(port=0, latency_ms=CRAWL_LATENCY_MS, rate_429=CRAWL_RATE_429).start()
+        for _ in range(instances)
+    ]
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_file = os.path.join(work_dir, "users.csv")
+        pd.read_csv(users_path, nrows=CRAWL_USERS, dtype=str).to_csv(input_file, index=False)
+
+        fill = load_fill_user_info()
+        fill.API_CLIENT.close()
+        fill.BASE_URLS = [server.base_url for server in servers]
+        fill.INPUT_FILE = input_file
+        fill.LANGUAGE_STATS_OUTPUT = os.path.join(work_dir, "language_stats2.csv")
+        fill.SOLVED_STATS_OUTPUT = os.path.join(work_dir, "solved_stats2.csv")
+        fill.PROGRESS_DB = os.path.join(work_dir, "fill_progress.sqlite3")
+        fill.METRICS_LOG = os.path.join(work_dir, "fill_metrics.jsonl")
+        fill.CONCURRENCY = CRAWL_CONCURRENCY * instances
+        fill.BATCH_SIZE = batch_size
+        fill.API_CLIENT = EndpointPool(
+            fill.BASE_URLS, CRAWL_RATE_LIMIT_PER_SEC, 1.0, CRAWL_MAX_RATE_PER_SEC,
+            pool_size=CRAWL_CONCURRENCY * instances, max_retries=fill.MAX_RETRIES,
+            failover_retries=fill.FAILOVER_RETRIES, initial_backoff=fill.INITIAL_BACKOFF,
+            max_backoff=fill.MAX_BACKOFF, metrics=fill.METRICS,
+        )
+
+        started = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            fill.main()
+        elapsed = time.perf_counter() - started
+        written = len(pd.read_csv(fill.SOLVED_STATS_OUTPUT, usecols=["username"]))
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+    result = {
+        "users": written,
+        "seconds": elapsed,
+        "users_per_sec": written / elapsed,
+        "requests": sum(server.counts["requests"] for server in servers),
+        "throttled": sum(server.counts["throttled"] for server in servers),
+    }
+    # Задержки запросов со стороны клиента по метрикам fill-user-info (metrics.CrawlMetrics)
+    for endpoint, counts in fill.METRICS.snapshot()["requests"].items():
+        route = endpoint.split(" ", 1)[1].strip("/").replace(":username/", "").replace("/", "_")
+        result[f"{route}_p50_ms"] = counts["p50_ms"]
+        result[f"{route}_p95_ms"] = counts["p95_ms"]
+    return result
+
+
+def bench_engine():
+    """engine db_connector с search_path на пустую BENCH_SCHEMA"""
+    import db_connector
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(db_connector.engine.url, connect_args={"options": f"-csearch_path={BENCH_SCHEMA}"})
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+    db_connector.engine = engine
+    return engine
+
+
+def bench_load(size):
+    """rows/sec bulk_load (COPY + upsert + инкрементальные агрегаты) набора size в пустую схему"""
+    import db_connector
+
+    data_dir = generate(size, DATA_DIR)
+    bench_engine()
+    db_connector.ensure_schema()
+    # Снапшот user_index обновляется внутри bulk_load и входит в замер, но пишется не в results/
+    index_dir = tempfile.TemporaryDirectory()
+    db_connector.USER_INDEX_PATH = os.path.join(index_dir.name, "user_index.bin")
+
+    result = {"rows": 0, "seconds": 0.0}
+    for table_name in ("users", "solved_stats", "language_stats"):
+        started = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            db_connector.bulk_load([os.path.join(data_dir, f"{table_name}.csv")], table_name)
+        elapsed = time.perf_counter() - started
+        with db_connector.engine.connect() as conn:
+            rows = conn.exec_driver_sql(f"SELECT count(*) FROM {table_name}").scalar()
+        result[f"{table_name}_rows_per_sec"] = rows / elapsed
+        result["rows"] += rows
+        result["seconds"] += elapsed
+    result["rows_per_sec"] = result["rows"] / result["seconds"]
+
+    # Точечные запросы к user_index: get() до 10k пользователей, равномерно по набору
+    from user_index import UserIndex
+    index = UserIndex(db_connector.USER_INDEX_PATH)
+    usernames = [index.username(row) for row in range(0, len(index), max(len(index) // 10_000, 1))]
+    started = time.perf_counter()
+    index.get_many(usernames)
+    result["index_lookups_per_sec"] = len(usernames) / (time.perf_counter() - started)
+    index.close()
+    index_dir.cleanup()
+    return result
+
+
+def bench_reports(size, report_engine):
+    """Время каждого отчёта reports.py: по файлам набора (duckdb) или по схеме после bench_load (postgres)"""
+    import data_extraction
+
+    data_dir = generate(size, DATA_DIR)
+    data_extraction.REPORT_ENGINE = report_engine
+    if report_engine == "duckdb":
+        from local_engine import connect
+        data_extraction.local_db = connect(data_dir)
+    else:
+        import db_connector
+        data_extraction.engine = db_connector.engine
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        data_extraction.results_dir = out_dir
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            timings = data_extraction.run_reports()
+
+    result = {"seconds": sum(timing["total"] for timing in timings)}
+    for timing in timings:
+        result[f"{timing['name']}_seconds"] = timing["total"]
+    return result
+
+
+# --- Results ---
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root_dir,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root_dir,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+
+def previous_results():
+    """Метрики последнего сохранённого запуска по каждому сценарию"""
+    previous = {}
+    if not os.path.exists(HISTORY_FILE):
+        return previous
+    with open(HISTORY_FILE, encoding="utf-8") as infile:
+        for line in infile:
+            run = json.loads(line)
+            for scenario, metrics in run["results"].items():
+                previous[scenario] = (run["commit"], metrics)
+    return previous
+
+
+def compare(results, previous):
+    """Печатает метрики и изменение относительно предыдущего запуска того же сценария"""
+    print(f"\n{'сценарий':<28}{'метрика':<36}{'значение':>14}{'было':>14}{'изм.':>9}")
+    for scenario, metrics in results.items():
+        commit, before = previous.get(scenario, (None, {}))
+        for metric, value in metrics.items():
+            old = before.get(metric)
+            change = ""
+            if isinstance(old, (int, float)) and old:
+                delta = (value - old) / old
+                worse = -delta if metric.endswith(HIGHER_IS_BETTER) else delta
+                change = f"{delta:+.1%}" + (" !" if worse > REGRESSION_THRESHOLD else "")
+            old_text = f"{old:>14.2f}" if isinstance(old, (int, float)) else f"{'':>14}"
+            print(f"{scenario:<28}{metric:<36}{value:>14.2f}{old_text}{change:>9}")
+    print(f"\n! — хуже предыдущего запуска больше чем на {REGRESSION_THRESHOLD:.0%}")
+
+
+def save_results(results):
+    commit, dirty = git_commit()
+    run = {
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} CPU",
+        "results": results,
+    }
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    with open(HISTORY_FILE, "a", encoding="utf-8") as outfile:
+        outfile.write(json.dumps(run, ensure_ascii=False) + "\n")
+    print(f"Результаты сохранены в {HISTORY_FILE} (коммит {commit}{', есть незакоммиченные изменения' if dirty else ''})")
+
+
+def main(args):
+    scenarios = [arg for arg in args if arg in SCENARIOS] or SCENARIOS
+    sizes = [arg for arg in args if arg in SIZES] or DEFAULT_SIZES
+    unknown = [arg for arg in args if arg not in SCENARIOS and arg not in SIZES]
+    if unknown:
+        print(f"Неизвестные аргументы: {unknown}. Сценарии: {SCENARIOS}, размеры: {list(SIZES)}")
+        return
+
+    results = {}
+    if "crawl" in scenarios:
+        print(f"crawl: {CRAWL_USERS} пользователей, задержка {CRAWL_LATENCY_MS} мс, 429 в {CRAWL_RATE_429:.0%} ответов")
+        results["crawl_per_user"] = bench_crawl(batch_size=0)
+        results["crawl_batch"] = bench_crawl(batch_size=CRAWL_BATCH_SIZE)
+        results[f"crawl_sharded_{CRAWL_INSTANCES}"] = bench_crawl(batch_size=0, instances=CRAWL_INSTANCES)
+
+    for size in sizes:
+        loaded = False
+        if "load" in scenarios:
+            print(f"load: {size}")
+            try:
+                results[f"load_{size}"] = bench_load(size)
+                loaded = True
+            except Exception as e:
+                # Без настроенной БД (.env db-connector) сценарии load и postgres-отчёты пропускаются
+                print(f"load_{size} пропущен: {e!r}")
+        if "reports" in scenarios:
+            print(f"reports: {size}")
+            results[f"reports_duckdb_{size}"] = bench_reports(size, "duckdb")
+            if loaded:
+                results[f"reports_postgres_{size}"] = bench_reports(size, "postgres")
+
+    compare(results, previous_results())
+    save_results(results)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
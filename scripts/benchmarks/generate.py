@@ -0,0 +1,96 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+SIZES = {"10k": 10_000, "100k": 100_000, "1M": 1_000_000}
+SEED = 42  # один и тот же размер всегда даёт одни и те же файлы
+CHUNK_USERS = 100_000  # пользователей, генерируемых и дописываемых в файлы за раз
+USERS_PER_PAGE = 25
+
+COUNTRIES = np.array(["China", "India", "United States", "Russia", "Japan", "Brazil", "Germany", "Canada",
+                      "Korea, Republic of", "Vietnam", "Ukraine", "Not specified"])
+LANGUAGES = np.array(["C++", "Java", "Python3", "Python", "JavaScript", "TypeScript", "Go", "Rust", "Kotlin",
+                      "C#", "C", "Swift"])
+
+
+def users_chunk(rng, start, count):
+    """Строки users.csv в формате leaderboard-parser для рангов start+1..start+count"""
+    rank = np.arange(start + 1, start + count + 1)
+    return pd.DataFrame({
+        "global_rank": rank,
+        "username": [f"user{r}" for r in rank],
+        "display_name": [f"User {r}" for r in rank],
+        "score": np.round(3700 - np.log1p(rank) * 150 + rng.normal(0, 5, count)).astype(int),
+        "country": COUNTRIES[rng.integers(0, len(COUNTRIES), count)],
+        "contests_attended": rng.integers(0, 300, count),
+        "page": (rank - 1) // USERS_PER_PAGE + 1,
+    })
+
+
+def solved_chunk(rng, usernames):
+    """Строки solved_stats.csv в формате fill-user-info"""
+    count = len(usernames)
+    frame = pd.DataFrame({"username": usernames})
+    for difficulty, high in (("easy", 800), ("medium", 1600), ("hard", 700)):
+        total = rng.integers(0, high, count)
+        frame[difficulty] = total
+        frame[f"ac_{difficulty}"] = (total * rng.uniform(0.5, 1.0, count)).astype(int)
+    return frame[["username", "easy", "medium", "hard", "ac_easy", "ac_medium", "ac_hard"]]
+
+
+def languages_chunk(rng, usernames):
+    """Строки language_stats.csv: 1-4 разных языка на пользователя"""
+    per_user = rng.integers(1, 5, len(usernames))
+    # Разные языки пользователя — первые per_user столбцов случайной перестановки
+    order = rng.random((len(usernames), len(LANGUAGES))).argsort(axis=1)
+    mask = np.arange(len(LANGUAGES)) < per_user[:, None]
+    return pd.DataFrame({
+        "username": np.repeat(np.asarray(usernames, dtype=object), per_user),
+        "languageName": LANGUAGES[order[mask]],
+        "problemsSolved": rng.integers(1, 900, int(per_user.sum())),
+    })
+
+
+def dataset_dir(base_dir, size):
+    return os.path.join(base_dir, size)
+
+
+def generate(size, base_dir):
+    """
+    Пишет в base_dir/<size>/ users.csv, solved_stats.csv и language_stats.csv на SIZES[size] пользователей
+    кусками по CHUNK_USERS, не держа весь набор в памяти. Уже сгенерированный набор не пересоздаётся.
+    Возвращает каталог набора.
+    """
+    out_dir = dataset_dir(base_dir, size)
+    marker = os.path.join(out_dir, ".complete")
+    if os.path.exists(marker):
+        return out_dir
+    os.makedirs(out_dir, exist_ok=True)
+
+    total = SIZES[size]
+    started = time.perf_counter()
+    for start in range(0, total, CHUNK_USERS):
+        rng = np.random.default_rng([SEED, start])
+        users = users_chunk(rng, start, min(CHUNK_USERS, total - start))
+        first = start == 0
+        for name, frame in (
+            ("users.csv", users),
+            ("solved_stats.csv", solved_chunk(rng, users["username"])),
+            ("language_stats.csv", languages_chunk(rng, users["username"])),
+        ):
+            frame.to_csv(os.path.join(out_dir, name), mode="w" if first else "a", header=first, index=False)
+
+    open(marker, "w").close()
+    print(f"Набор {size} ({total} пользователей) сгенерирован в {out_dir} за {time.perf_counter() - started:.1f} с")
+    return out_dir
+
+
+if __name__ == "__main__":
+    # python generate.py [10k 100k 1M] — по умолчанию все размеры, в results/benchmarks/data
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../results/benchmarks/data"))
+    for size in sys.argv[1:] or list(SIZES):
+        generate(size, base_dir)
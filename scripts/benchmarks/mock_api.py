@@ -0,0 +1,228 @@
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# --- Configuration ---
+HOST = "127.0.0.1"
+PORT = 3100
+LATENCY_MS = 20.0  # средняя задержка ответа, как у /api с запросом к LeetCode
+LATENCY_JITTER_MS = 10.0  # задержка равномерно распределена в LATENCY_MS ± LATENCY_JITTER_MS
+RATE_429 = 0.0  # доля запросов, на которые отвечается 429 Too Many Requests
+RETRY_AFTER_SEC = 0.2  # Retry-After в ответах 429 (0 — без заголовка)
+
+LANGUAGES = ["C++", "Java", "Python3", "Python", "JavaScript", "TypeScript", "Go", "Rust", "Kotlin", "C#", "C", "Swift"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+
+
+def solved_payload(username):
+    """Ответ GET /:username/solved; для одного username всегда одинаковый"""
+    rng = random.Random(f"solved:{username}")
+    total = [rng.randint(0, 800), rng.randint(0, 1600), rng.randint(0, 700)]
+    accepted = [rng.randint(0, count) for count in total]
+    return {
+        "solvedProblem": sum(accepted),
+        "totalSubmissionNum": [{"difficulty": "All", "count": sum(total)}] + [
+            {"difficulty": difficulty, "count": count} for difficulty, count in zip(DIFFICULTIES, total)
+        ],
+        "acSubmissionNum": [{"difficulty": "All", "count": sum(accepted)}] + [
+            {"difficulty": difficulty, "count": count} for difficulty, count in zip(DIFFICULTIES, accepted)
+        ],
+    }
+
+
+def language_payload(username):
+    """Ответ GET /languageStats?username=..."""
+    rng = random.Random(f"languages:{username}")
+    languages = rng.sample(LANGUAGES, rng.randint(1, 4))
+    return {"matchedUser": {"languageProblemCount": [
+        {"languageName": language, "problemsSolved": rng.randint(1, 900)} for language in languages
+    ]}}
+
+
+def submission_times(username, now, since):
+    """
+    Время посылок пользователя в (since, now]: у каждого username свой период (от 2 часов до 3 дней)
+    и сдвиг, поэтому со временем появляются новые посылки, а старые не меняются
+    """
+    rng = random.Random(f"submissions:{username}")
+    period = rng.randint(2 * 3600, 3 * 24 * 3600)
+    phase = rng.randint(0, period - 1)
+    last = (int(now) - phase) // period * period + phase
+    times = []
+    while last > since:
+        times.append(last)
+        last -= period
+    return times
+
+
+def submission_item(username, timestamp):
+    rng = random.Random(f"submission:{username}:{timestamp}")
+    slug = f"problem-{rng.randint(1, 3000)}"
+    return {
+        "title": slug.replace("-", " ").title(),
+        "titleSlug": slug,
+        "timestamp": str(timestamp),
+        "statusDisplay": rng.choice(["Accepted", "Accepted", "Wrong Answer", "Time Limit Exceeded"]),
+        "lang": rng.choice(["cpp", "java", "python3", "golang", "rust"]),
+    }
+
+
+def submissions_payload(username, now, limit, accepted_only=False):
+    """Ответ GET /:username/submission и /acSubmission: последние limit посылок, новые первыми"""
+    items = []
+    for timestamp in submission_times(username, now, now - 365 * 24 * 3600):
+        item = submission_item(username, timestamp)
+        if not accepted_only or item["statusDisplay"] == "Accepted":
+            items.append(item)
+        if len(items) >= limit:
+            break
+    return {"count": len(items), "submission": items}
+
+
+def calendar_payload(username, now):
+    """Ответ GET /:username/calendar: submissionCalendar — JSON-строка {полночь UTC: число посылок}"""
+    calendar = {}
+    for timestamp in submission_times(username, now, now - 365 * 24 * 3600):
+        day = str(timestamp // 86400 * 86400)
+        calendar[day] = calendar.get(day, 0) + 1
+    return {"submissionCalendar": json.dumps(calendar)}
+
+
+def ranking_payload(page):
+    """Ответ GET /globalRanking?page=N"""
+    rng = random.Random(f"page:{page}")
+    users = [
+        {
+            "globalRank": (page - 1) * 25 + i + 1,
+            "username": f"user{(page - 1) * 25 + i + 1}",
+            "displayName": f"User {(page - 1) * 25 + i + 1}",
+            "rating": 3500 - page - i / 25,
+            "country": rng.choice(["China", "India", "United States", "Russia", None]),
+            "countryCode": None,
+            "dataRegion": "US",
+        }
+        for i in range(25)
+    ]
+    return {"page": page, "totalUsers": 1_000_000, "userPerPage": 25, "users": users}
+
+
+def server_now(server):
+    return time.time() + server.clock_offset
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    """Маршруты /api, которые используют fill-user-info, pipeline, global_ranking_api и submissions, с синтетическими данными"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def throttle(self):
+        """Задержка ответа и, для доли rate_429 запросов, ответ 429. Возвращает True, если ответ уже отправлен"""
+        server = self.server
+        time.sleep(max(0.0, server.latency_ms + random.uniform(-1, 1) * server.jitter_ms) / 1000)
+        # 429 получает каждый 1/rate_429-й запрос, а не случайный: число 429 за прогон воспроизводимо
+        number = server.count("requests")
+        if int(number * server.rate_429) > int((number - 1) * server.rate_429):
+            server.count("throttled")
+            headers = {"Retry-After": str(server.retry_after)} if server.retry_after else None
+            self.send_json(429, {"error": "Too many requests"}, headers)
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == "/cache/stats":
+            # health check EndpointPool: отвечает сразу, без задержки и 429
+            self.send_json(200, {"hits": 0, "misses": 0})
+            return
+        if self.throttle():
+            return
+        parts = url.path.strip("/").split("/")
+        if url.path == "/languageStats" and "username" in query:
+            self.send_json(200, language_payload(query["username"][0]))
+        elif url.path == "/globalRanking":
+            self.send_json(200, ranking_payload(int(query.get("page", ["1"])[0])))
+        elif len(parts) == 2 and parts[1] == "solved":
+            self.send_json(200, solved_payload(parts[0]))
+        elif len(parts) == 2 and parts[1] in ("submission", "acSubmission"):
+            limit = int(query.get("limit", ["20"])[0])
+            self.send_json(200, submissions_payload(parts[0], server_now(self.server), limit, parts[1] == "acSubmission"))
+        elif len(parts) == 2 and parts[1] == "calendar":
+            self.send_json(200, calendar_payload(parts[0], server_now(self.server)))
+        else:
+            self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.throttle():
+            return
+        if self.path != "/batch/userStats":
+            self.send_json(404, {"error": "Not found"})
+            return
+        usernames = body.get("usernames", [])
+        self.send_json(200, {"count": len(usernames), "users": {
+            username: {"solved": solved_payload(username), "languageStats": language_payload(username)}
+            for username in usernames
+        }})
+
+
+class MockApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host=HOST, port=PORT, latency_ms=LATENCY_MS, jitter_ms=LATENCY_JITTER_MS,
+                 rate_429=RATE_429, retry_after=RETRY_AFTER_SEC):
+        super().__init__((host, port), MockApiHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = min(jitter_ms, latency_ms)
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.clock_offset = 0.0  # сдвиг часов для /submission и /calendar: тесты «проматывают» время вперёд
+        self.counts = {"requests": 0, "throttled": 0}
+        self.counts_lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        with self.counts_lock:
+            self.counts[name] += 1
+            return self.counts[name]
+
+    def start(self):
+        """Запускает сервер в фоновом потоке (для сценариев bench.py)"""
+        threading.Thread(target=self.serve_forever, name="mock-api", daemon=True).start()
+        return self
+
+
+if __name__ == "__main__":
+    # python mock_api.py [port] [latency_ms] [rate_429]
+    args = sys.argv[1:]
+    server = MockApiServer(
+        port=int(args[0]) if len(args) > 0 else PORT,
+        latency_ms=float(args[1]) if len(args) > 1 else LATENCY_MS,
+        rate_429=float(args[2]) if len(args) > 2 else RATE_429,
+    )
+    print(f"Mock api на {server.base_url}: задержка {server.latency_ms} мс, 429 в {server.rate_429:.0%} запросов")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
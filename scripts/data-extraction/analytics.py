@@ -0,0 +1,169 @@
+import sys
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../db-connector')))
+base_dir = os.path.dirname(os.path.abspath(__file__))
+results_dir = os.path.abspath(os.path.join(base_dir, "../../results"))
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+
+
+def group_percentiles(codes: np.ndarray, values: np.ndarray, n_groups: int, percentiles=PERCENTILES) -> np.ndarray:
+    """
+    Перцентили values внутри каждой группы codes (0..n_groups-1) за одну сортировку:
+    массив сортируется по (группа, значение), перцентиль группы — линейная интерполяция между
+    соседними элементами её отрезка (как np.percentile). Возвращает массив n_groups x len(percentiles),
+    NaN для пустых групп.
+    """
+    order = np.lexsort((values, codes))
+    sorted_values = values[order].astype(np.float64)
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    positions = starts[:, None] + (counts[:, None] - 1) * (np.asarray(percentiles, dtype=np.float64) / 100)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, (starts + counts - 1)[:, None])
+    empty = counts == 0
+    lower[empty] = upper[empty] = 0
+    fraction = positions - lower
+    result = sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction
+    result[empty] = np.nan
+    return result
+
+
+def ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+class UserStats:
+    """
+    Аналитика по solved_stats x language_stats x users на массивах NumPy.
+    Страны, языки и пользователи хранятся как коды категорий, все агрегаты по группам считаются
+    через bincount и одну сортировку, без циклов по строкам.
+    """
+
+    def __init__(self, users: pd.DataFrame, solved: pd.DataFrame, languages: pd.DataFrame):
+        user_index = pd.Index(users["username"])
+        countries = pd.Categorical(users["country"].fillna("Not specified"))
+        self.countries = countries.categories
+
+        # solved_stats: только пользователи, для которых известна страна
+        position = user_index.get_indexer(solved["username"])
+        known = position >= 0
+        self.country_codes = countries.codes[position[known]].astype(np.int64)
+        self.total = solved.loc[known, DIFFICULTIES].to_numpy(dtype=np.int64, na_value=0)
+        self.accepted = solved.loc[known, [f"ac_{d}" for d in DIFFICULTIES]].to_numpy(dtype=np.int64, na_value=0)
+
+        # language_stats: коды пользователя и языка для каждой строки; строки без языка или пользователя
+        # отбрасываются, иначе factorize даёт им код -1
+        languages = languages.dropna(subset=["username", "languagename"])
+        language_codes, self.languages = pd.factorize(languages["languagename"], sort=True)
+        self.language_codes = language_codes.astype(np.int64)
+        self.language_user_codes, self.language_users = pd.factorize(languages["username"])
+        self.problems_solved = languages["problemssolved"].to_numpy(dtype=np.int64, na_value=0)
+
+    @classmethod
+    def from_results(cls, path: str = results_dir) -> "UserStats":
+        """Загружает таблицы прямо из файлов в results через local_engine (DuckDB)."""
+        from local_engine import connect
+
+        con = connect(path)
+        return cls(
+            con.execute("SELECT username, country FROM users").df(),
+            con.execute("SELECT * FROM solved_stats").df(),
+            con.execute("SELECT username, languagename, problemssolved FROM language_stats").df(),
+        )
+
+    def country_distribution(self, percentiles=PERCENTILES) -> pd.DataFrame:
+        """По странам: число пользователей, среднее и перцентили числа решённых задач (медиана — p50)."""
+        n = len(self.countries)
+        solved = self.total.sum(axis=1)
+        users = np.bincount(self.country_codes, minlength=n)
+        frame = pd.DataFrame(
+            group_percentiles(self.country_codes, solved, n, percentiles),
+            index=self.countries, columns=[f"p{p}" for p in percentiles],
+        )
+        frame.insert(0, "mean", ratio(np.bincount(self.country_codes, weights=solved, minlength=n), users))
+        frame.insert(0, "users", users)
+        frame.index.name = "country"
+        return frame[frame["users"] > 0]
+
+    def acceptance_by_country(self) -> pd.DataFrame:
+        """
+        По странам и сложностям: доля принятых ac_*/* (по суммам задач в стране)
+        и доля hard среди всех задач.
+        """
+        n = len(self.countries)
+        frame = pd.DataFrame(index=self.countries)
+        totals = np.zeros(n)
+        for i, difficulty in enumerate(DIFFICULTIES):
+            total = np.bincount(self.country_codes, weights=self.total[:, i], minlength=n)
+            accepted = np.bincount(self.country_codes, weights=self.accepted[:, i], minlength=n)
+            frame[f"ac_ratio_{difficulty}"] = ratio(accepted, total)
+            totals += total
+        frame["hard_share"] = ratio(np.bincount(self.country_codes, weights=self.total[:, 2], minlength=n), totals)
+        frame.index.name = "country"
+        return frame[totals > 0]
+
+    def language_distribution(self, percentiles=PERCENTILES) -> pd.DataFrame:
+        """По языкам: число пользователей, среднее и перцентили числа решённых на этом языке задач."""
+        n = len(self.languages)
+        users = np.bincount(self.language_codes, minlength=n)
+        frame = pd.DataFrame(
+            group_percentiles(self.language_codes, self.problems_solved, n, percentiles),
+            index=self.languages, columns=[f"p{p}" for p in percentiles],
+        )
+        frame.insert(0, "mean", ratio(np.bincount(self.language_codes, weights=self.problems_solved, minlength=n), users))
+        frame.insert(0, "users", users)
+        frame.index.name = "languagename"
+        return frame
+
+    def language_co_usage(self) -> pd.DataFrame:
+        """
+        Матрица языки x языки: сколько пользователей пишут на обоих (на диагонали — на языке вообще).
+        Считается одним bincount по всем парам (язык, язык) внутри каждого пользователя,
+        без плотной матрицы пользователи x языки.
+        """
+        n = len(self.languages)
+        pairs = np.unique(self.language_user_codes.astype(np.int64) * n + self.language_codes)
+        users, codes = np.divmod(pairs, n)
+
+        # Строки отсортированы по пользователю: каждая строка соединяется со всеми строками своей группы
+        starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        sizes = np.diff(np.r_[starts, len(users)])
+        row_sizes = np.repeat(sizes, sizes)
+        left = np.repeat(np.arange(len(users)), row_sizes)
+        offsets = np.arange(len(left)) - np.repeat(np.cumsum(row_sizes) - row_sizes, row_sizes)
+        right = np.repeat(np.repeat(starts, sizes), row_sizes) + offsets
+
+        co_usage = np.bincount(codes[left] * n + codes[right], minlength=n * n).reshape(n, n)
+        return pd.DataFrame(co_usage, index=self.languages, columns=self.languages)
+
+
+def main():
+    started = time.perf_counter()
+    stats = UserStats.from_results()
+    loaded = time.perf_counter()
+
+    outputs = {
+        "country_distribution.csv": stats.country_distribution(),
+        "acceptance_by_country.csv": stats.acceptance_by_country(),
+        "language_distribution.csv": stats.language_distribution(),
+        "language_co_usage.csv": stats.language_co_usage(),
+    }
+    computed = time.perf_counter()
+
+    for name, frame in outputs.items():
+        frame.to_csv(os.path.join(results_dir, name))
+        print(f"{name} сохранён")
+    print(f"Загрузка {loaded - started:.2f} с, расчёт {computed - loaded:.3f} с")
+
+
+if __name__ == "__main__":
+    main()
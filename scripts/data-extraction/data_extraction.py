@@ -1,46 +1,109 @@
 import sys
 import os
-import pandas as pd
-import os
+import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../db-connector')))
-from db_connector import engine
+from reports import REPORTS
 base_dir = os.path.dirname(os.path.abspath(__file__))
 results_dir = os.path.abspath(os.path.join(base_dir, "../../results"))
 
-# 1. Самые популярные языки
-query1 = '''
-SELECT languagename, COUNT(DISTINCT username) AS user_count
-FROM language_stats
-GROUP BY languagename
-ORDER BY user_count DESC;
-'''
-df1 = pd.read_sql(query1, engine)
-df1.to_csv(os.path.join(results_dir, "popular_languages.csv"), index=False)
-print("popular_languages.csv сохранён")
-
-# 2. Самые популярные языки по странам
-query2 = '''
-SELECT u.country, l.languagename, COUNT(DISTINCT l.username) AS user_count
-FROM language_stats l
-JOIN users u ON l.username = u.username
-GROUP BY u.country, l.languagename
-ORDER BY u.country, user_count DESC;
-'''
-df2 = pd.read_sql(query2, engine)
-df2.to_csv(os.path.join(results_dir, "languages_by_country.csv"), index=False)
-print("languages_by_country.csv сохранён")
-
-# 3. Среднее количество решённых задач по странам
-query3 = '''
-SELECT 
-    u.country, 
-    AVG((s.easy::int + s.medium::int + s.hard::int)) AS avg_solved,
-    AVG((s.ac_easy::int + s.ac_medium::int + s.ac_hard::int)) AS avg_ac
-FROM solved_stats s
-JOIN users u ON s.username = u.username
-GROUP BY u.country
-ORDER BY avg_solved DESC;
-'''
-df3 = pd.read_sql(query3, engine)
-df3.to_csv(os.path.join(results_dir, "avg_solved_by_country.csv"), index=False)
-print("avg_solved_by_country.csv сохранён")
\ No newline at end of file
+# "postgres" — отчёты по БД из db_connector, "duckdb" — in-process прямо по файлам в results (см. local_engine.py)
+REPORT_ENGINE = os.getenv("REPORT_ENGINE", "postgres")
+# Сколько отчётов выполняется одновременно (каждому нужно своё соединение из пула engine)
+REPORT_CONCURRENCY = 4
+# Сколько строк за раз забирается с сервера и пишется в CSV
+FETCH_CHUNK_SIZE = 10_000
+
+
+engine = None
+local_db = None
+
+
+@contextmanager
+def report_cursor(name: str):
+    """Курсор для отчёта: серверный курсор psycopg2 на своём соединении из пула или курсор DuckDB."""
+    if REPORT_ENGINE == "duckdb":
+        cur = local_db.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+        return
+
+    conn = engine.raw_connection()
+    try:
+        # Именованный курсор psycopg2 — серверный: строки приходят по мере fetchmany
+        with conn.cursor(name=f"report_{name}") as cur:
+            cur.itersize = FETCH_CHUNK_SIZE
+            yield cur
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def run_report(name: str) -> dict:
+    """
+    Выполняет отчёт на server-side курсоре и пишет результат в CSV кусками по FETCH_CHUNK_SIZE строк,
+    не держа весь результат в памяти. Возвращает замеры: время до первой строки, полное время, число строк.
+    """
+    report = REPORTS[name]
+    path = os.path.join(results_dir, report["output"])
+    started = time.perf_counter()
+    first_row = None
+    rows = 0
+
+    with report_cursor(name) as cur, open(path, "w", newline="", encoding="utf-8") as outfile:
+        cur.execute(report["query"])
+        writer = csv.writer(outfile)
+        header_written = False
+        while True:
+            chunk = cur.fetchmany(FETCH_CHUNK_SIZE)
+            if not header_written:
+                # У серверного курсора описание колонок появляется после первого fetch
+                writer.writerow(column[0] for column in cur.description)
+                header_written = True
+                first_row = time.perf_counter() - started
+            if not chunk:
+                break
+            writer.writerows(chunk)
+            rows += len(chunk)
+
+    elapsed = time.perf_counter() - started
+    print(f"{report['output']} сохранён: {rows} строк за {elapsed:.2f} с")
+    return {"name": name, "rows": rows, "first_row": first_row, "total": elapsed}
+
+
+def run_reports(names: list[str] = None) -> list[dict]:
+    """Выполняет отчёты (по умолчанию все из REPORTS) параллельно и печатает сводку по времени."""
+    names = names or list(REPORTS)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=REPORT_CONCURRENCY) as executor:
+        timings = list(executor.map(run_report, names))
+    wall = time.perf_counter() - started
+
+    print(f"\n{'отчёт':<24}{'строк':>10}{'первая строка, с':>18}{'всего, с':>10}")
+    for timing in timings:
+        print(f"{timing['name']:<24}{timing['rows']:>10}{timing['first_row']:>18.2f}{timing['total']:>10.2f}")
+    print(f"Сумма {sum(t['total'] for t in timings):.2f} с, фактически {wall:.2f} с")
+    return timings
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(REPORTS)
+    if REPORT_ENGINE == "duckdb":
+        from local_engine import connect, view_names
+        local_db = connect(results_dir)
+        # Отчёты по таблицам, для которых в results нет файлов, пропускаются, а не падают с CatalogException
+        available = view_names(local_db)
+        skipped = [name for name in names if not set(REPORTS[name]["tables"]) <= available]
+        for name in skipped:
+            print(f"Отчёт {name} пропущен: нет {', '.join(sorted(set(REPORTS[name]['tables']) - available))}")
+        names = [name for name in names if name not in skipped]
+    else:
+        from db_connector import engine, ensure_schema
+        # Отчёты читают агрегаты, которые bulk_load поддерживает в актуальном состоянии
+        ensure_schema()
+    if names:
+        run_reports(names)
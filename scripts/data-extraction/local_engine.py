@@ -0,0 +1,99 @@
+import os
+
+from db_schema import TABLES, AGGREGATES
+
+# Файлы в results, из которых собирается каждая таблица, в порядке приоритета:
+# строка пользователя из более позднего файла перекрывает строку из более раннего (как в bulk_load)
+SOURCES = {
+    "users": ["users.csv", "users.parquet"],
+    "solved_stats": ["solved_stats.csv", "solved_stats2.csv", "solved_stats2.parquet",
+                     "solved_stats_changes.csv", "solved_stats_changes.parquet"],
+    "language_stats": ["language_stats.csv", "language_stats2.csv", "language_stats2.parquet",
+                       "language_stats_changes.csv", "language_stats_changes.parquet"],
+    "submissions": ["submissions"],
+}
+
+SQL_TYPES = {
+    "integer": "INTEGER",
+    "bigint": "BIGINT",
+    "double precision": "DOUBLE",
+    "boolean": "BOOLEAN",
+}
+
+
+def sql_string(value: str) -> str:
+    """Строковый литерал SQL: пути и значения по умолчанию встраиваются в представления, параметры там недоступны"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def column_expression(name: str, sql_type: str, spec: dict, typed: bool) -> str:
+    """
+    Выражение колонки таблицы из db_schema. CSV читаются как текст и чистятся так же, как в bulk_load:
+    разделители тысяч убираются, "N/A" становится NULL, пустые значения заменяются на default.
+    """
+    if sql_type.startswith("text"):
+        default = spec.get("defaults", {}).get(name)
+        value = f"CAST({name} AS VARCHAR)"
+        return f"COALESCE(NULLIF({value}, ''), {sql_string(default)}) AS {name}" if default else f"{value} AS {name}"
+    duck_type = SQL_TYPES[sql_type]
+    if typed:
+        return f"CAST({name} AS {duck_type}) AS {name}"
+    return f"TRY_CAST(replace({name}, ',', '') AS {duck_type}) AS {name}"
+
+
+def source_query(path: str, order: int, spec: dict) -> str:
+    typed = path.endswith(".parquet") or os.path.isdir(path)
+    if typed:
+        # Каталог — part-файлы fill-user-info или hive-партиции хранилища посылок (day=YYYY-MM-DD/)
+        reader = f"read_parquet({sql_string(os.path.join(path, '**', '*.parquet') if os.path.isdir(path) else path)})"
+    else:
+        reader = f"read_csv({sql_string(path)}, header = true, all_varchar = true)"
+    columns = ", ".join(
+        column_expression(name, sql_type.replace(" NOT NULL", ""), spec, typed)
+        for name, sql_type in spec["columns"].items()
+    )
+    # Повторные строки-заголовки, дописанные старыми запусками fill-user-info, пропускаются
+    return f"SELECT {columns}, {order} AS file_order FROM {reader} WHERE username != 'username'"
+
+
+def connect(results_dir: str, threads: int = None):
+    """
+    Открывает in-process DuckDB, в которой таблицы db_schema и агрегаты для отчётов — представления
+    прямо над CSV/Parquet в results_dir: загрузка в БД не нужна, фильтры и выбор колонок
+    проталкиваются в чтение файлов.
+    """
+    import duckdb  # optional dependency, only needed for REPORT_ENGINE=duckdb
+
+    con = duckdb.connect()
+    if threads:
+        con.execute(f"SET threads = {int(threads)}")
+
+    missing = set()
+    for table_name, spec in TABLES.items():
+        paths = [os.path.join(results_dir, name) for name in SOURCES[table_name]]
+        parts = [source_query(path, order, spec) for order, path in enumerate(paths) if os.path.exists(path)]
+        if not parts:
+            print(f"Нет файлов для таблицы {table_name} в {results_dir}")
+            missing.add(table_name)
+            continue
+        key = ", ".join(spec["key"])
+        con.execute(f"""
+            CREATE VIEW {table_name} AS
+            SELECT * EXCLUDE (file_order)
+            FROM ({' UNION ALL '.join(parts)})
+            QUALIFY row_number() OVER (PARTITION BY {key} ORDER BY file_order DESC) = 1
+        """)
+
+    # Агрегат строится из таблиц, перечисленных в его "affected"; без любой из них он пропускается
+    for name, spec in AGGREGATES.items():
+        absent = sorted(missing & set(spec["affected"]))
+        if absent:
+            print(f"Агрегат {name} пропущен: нет таблиц {', '.join(absent)}")
+            continue
+        con.execute(f"CREATE VIEW {name} AS {spec['query'].format(where='')}")
+    return con
+
+
+def view_names(con) -> set:
+    """Представления, которые connect смог создать"""
+    return {row[0] for row in con.execute("SELECT view_name FROM duckdb_views() WHERE NOT internal").fetchall()}
@@ -0,0 +1,66 @@
+# Реестр отчётов data_extraction: имя -> запрос, файл в results и таблицы/агрегаты, из которых он читает.
+# Отчёты независимы друг от друга и выполняются параллельно, новый отчёт достаточно добавить сюда.
+REPORTS = {
+    # Самые популярные языки
+    "popular_languages": {
+        "output": "popular_languages.csv",
+        "tables": ["popular_languages"],
+        "query": """
+            SELECT languagename, user_count
+            FROM popular_languages
+            ORDER BY user_count DESC
+        """,
+    },
+    # Самые популярные языки по странам
+    "languages_by_country": {
+        "output": "languages_by_country.csv",
+        "tables": ["languages_by_country"],
+        "query": """
+            SELECT country, languagename, user_count
+            FROM languages_by_country
+            ORDER BY country, user_count DESC
+        """,
+    },
+    # Среднее количество решённых задач по странам
+    "avg_solved_by_country": {
+        "output": "avg_solved_by_country.csv",
+        "tables": ["avg_solved_by_country"],
+        "query": """
+            SELECT country, avg_solved, avg_ac
+            FROM avg_solved_by_country
+            ORDER BY avg_solved DESC
+        """,
+    },
+    # Сколько пользователей пишут на 1, 2, 3... языках
+    "languages_per_user": {
+        "output": "languages_per_user.csv",
+        "tables": ["language_stats"],
+        "query": """
+            SELECT language_count, COUNT(*) AS user_count
+            FROM (
+                SELECT username, COUNT(*) AS language_count
+                FROM language_stats
+                GROUP BY username
+            ) per_user
+            GROUP BY language_count
+            ORDER BY language_count
+        """,
+    },
+    # Решённые задачи каждого пользователя с местом внутри страны (по строке на пользователя)
+    "user_solved": {
+        "output": "user_solved.csv",
+        "tables": ["users", "solved_stats"],
+        "query": """
+            SELECT
+                u.username,
+                u.country,
+                u.global_rank,
+                s.easy + s.medium + s.hard AS solved,
+                s.ac_easy + s.ac_medium + s.ac_hard AS ac,
+                RANK() OVER (PARTITION BY u.country ORDER BY s.easy + s.medium + s.hard DESC) AS country_rank
+            FROM users u
+            JOIN solved_stats s ON s.username = u.username
+            ORDER BY u.country, country_rank
+        """,
+    },
+}
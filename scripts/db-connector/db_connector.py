@@ -1,8 +1,13 @@
 from sqlalchemy import create_engine, text, inspect
 import pandas as pd
 from dotenv import load_dotenv
+import contextlib
+import io
 import os
 
+from db_schema import DIMENSIONS, TABLES, INDEXES, AGGREGATES
+import user_index
+
 load_dotenv()
 
 DB_USER = os.getenv("DB_USER")
@@ -13,9 +18,18 @@ DB_NAME = os.getenv("DB_NAME")
 
 engine = create_engine(f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}")
 
+# Снапшот user_index, который обновляется после каждой загрузки; пустая строка отключает его
+USER_INDEX_PATH = os.getenv("USER_INDEX_PATH", user_index.INDEX_PATH)
+
+def read_table_file(path: str) -> pd.DataFrame:
+    """Читает CSV или Parquet (файл или каталог с part-файлами от fill-user-info)"""
+    if path.endswith(".parquet") or os.path.isdir(path):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
 
 def load_csv_to_db(csv_path: str, table_name: str):
-    df = pd.read_csv(csv_path)
+    df = read_table_file(csv_path)
     df.columns = [c.lower() for c in df.columns]  
     if 'is_accepted' in df.columns:
         df['is_accepted'] = df['is_accepted'].astype(bool)
@@ -39,3 +53,237 @@ def fetch_data(table_name: str, username: str = None, columns: list[str] = None)
         return rows
 
 
+def table_ddl(table_name: str, spec: dict) -> str:
+    columns = [f"{name} {sql_type}" for name, sql_type in spec["columns"].items()]
+    columns.append(f"PRIMARY KEY ({', '.join(spec['key'])})")
+    for column, dimension in spec.get("dimensions", {}).items():
+        columns.append(f"FOREIGN KEY ({column}) REFERENCES {dimension} ({DIMENSIONS[dimension]})")
+    return f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(columns)})"
+
+
+def ensure_schema():
+    """
+    Создаёт справочники, типизированные таблицы с первичными ключами, индексы и таблицы агрегатов.
+    Старая таблица без ключа (созданная load_csv_to_db через to_sql) переименовывается
+    в <table>_untyped, а не удаляется. Новые таблицы агрегатов сразу заполняются целиком.
+    """
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for dimension, column in DIMENSIONS.items():
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {dimension} ({column} text PRIMARY KEY)"))
+        for table_name, spec in TABLES.items():
+            if inspector.has_table(table_name) and not inspector.get_pk_constraint(table_name)["constrained_columns"]:
+                conn.execute(text(f"ALTER TABLE {table_name} RENAME TO {table_name}_untyped"))
+                print(f"Таблица {table_name} без первичного ключа переименована в {table_name}_untyped")
+            conn.execute(text(table_ddl(table_name, spec)))
+        for index in INDEXES:
+            conn.execute(text(index))
+
+        created = [name for name in AGGREGATES if not inspector.has_table(name)]
+        for name in created:
+            conn.execute(text(table_ddl(name, AGGREGATES[name])))
+
+    if created:
+        conn = engine.raw_connection()
+        try:
+            with conn.cursor() as cur:
+                refresh_aggregates(cur, names=created)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def refresh_aggregates(cur, source: str = None, names: list[str] = None):
+    """
+    Пересчитывает таблицы агрегатов внутри транзакции курсора cur.
+    С source пересчитываются только группы, затронутые изменёнными строками этой таблицы
+    (временная таблица changed), без него — агрегаты names (по умолчанию все) целиком.
+    """
+    for name, spec in AGGREGATES.items():
+        if names is not None and name not in names:
+            continue
+        if source is None:
+            cur.execute(f"TRUNCATE {name}")
+            cur.execute(f"INSERT INTO {name} {spec['query'].format(where='')}")
+            print(f"Агрегат {name} пересчитан целиком: {cur.rowcount} строк")
+            continue
+        if source not in spec["affected"]:
+            continue
+
+        group_column = spec["group"].split(".")[-1]
+        cur.execute("DROP TABLE IF EXISTS affected")
+        cur.execute(
+            f"CREATE TEMP TABLE affected ON COMMIT DROP AS "
+            f"SELECT DISTINCT value FROM ({spec['affected'][source]}) AS a (value)"
+        )
+        cur.execute(f"DELETE FROM {name} WHERE {group_column} IN (SELECT value FROM affected)")
+        where = f"WHERE {spec['group']} IN (SELECT value FROM affected)"
+        cur.execute(f"INSERT INTO {name} {spec['query'].format(where=where)}")
+        print(f"Агрегат {name} обновлён: {cur.rowcount} строк")
+
+
+BOOLEANS = {"true": True, "false": False, "1": True, "0": False}
+
+
+def clean_chunk(chunk: pd.DataFrame, table_name: str) -> pd.DataFrame:
+    """
+    Приводит кусок данных к колонкам таблицы: пропускает повторные строки-заголовки,
+    дописанные старыми запусками fill-user-info, убирает разделители тысяч ("1,234"),
+    а нечисловые значения ("N/A") в числовых колонках превращает в NULL.
+    """
+    spec = TABLES[table_name]
+    chunk = chunk.rename(columns=str.lower)[list(spec["columns"])].copy()
+    chunk = chunk[chunk["username"] != "username"]
+    for name, default in spec.get("defaults", {}).items():
+        chunk[name] = chunk[name].fillna(default).replace("", default)
+    for name, sql_type in spec["columns"].items():
+        sql_type = sql_type.replace(" NOT NULL", "")
+        if sql_type.startswith("text"):
+            continue
+        if sql_type == "boolean":
+            chunk[name] = chunk[name].astype(str).str.lower().map(BOOLEANS).astype("boolean")
+            continue
+        values = pd.to_numeric(chunk[name].astype(str).str.replace(",", "", regex=False), errors="coerce")
+        chunk[name] = values.round().astype("Int64") if sql_type in ("integer", "bigint") else values
+    return chunk
+
+
+def iter_clean_chunks(path: str, table_name: str, chunksize: int):
+    """Читает CSV/Parquet файл кусками по chunksize строк, очищенными clean_chunk"""
+    if path.endswith(".parquet") or os.path.isdir(path):
+        frame = read_table_file(path)
+        chunks = (frame.iloc[start:start + chunksize] for start in range(0, len(frame), chunksize))
+    else:
+        chunks = pd.read_csv(path, dtype=str, chunksize=chunksize, keep_default_na=False)
+
+    for chunk in chunks:
+        yield clean_chunk(chunk, table_name)
+
+
+def bulk_load(paths: list[str], table_name: str, chunksize: int = 100_000, update_index: bool = True) -> int:
+    """
+    Загружает один или несколько файлов (CSV/Parquet) в типизированную таблицу:
+    куски потоково идут через COPY FROM STDIN во временную staging-таблицу, затем
+    INSERT ... ON CONFLICT сливает их в основную. Дубликаты ключа внутри загрузки схлопываются
+    (побеждает строка из более позднего файла), существующие строки обновляются только если
+    значения изменились. Новые значения справочников добавляются до слияния, затронутые
+    группы агрегатов пересчитываются в той же транзакции. При update_index изменённые пользователи
+    таблиц из снапшота user_index один раз дописываются в него.
+    Возвращает число вставленных или изменённых строк.
+    """
+    ensure_schema()
+    changed_users = set()
+
+    def chunks():
+        for path in paths:
+            yield from iter_clean_chunks(path, table_name, chunksize)
+            print(f"Данные из {path} загружены в staging для {table_name}")
+
+    applied = upsert_chunks(chunks(), table_name, changed_users)
+    if update_index and table_name in user_index.USER_TABLES + [user_index.LIST_TABLE]:
+        update_user_index(sorted(changed_users))
+    return applied
+
+
+def upsert_records(records: list[dict], table_name: str, changed_users: set = None) -> int:
+    """
+    Upsert записей в памяти (например, от потокового pipeline) тем же путём, что и bulk_load.
+    Схема должна быть уже создана через ensure_schema(). Снапшот user_index здесь не обновляется:
+    изменённые пользователи добавляются в changed_users, и вызывающий один раз передаёт их
+    в update_user_index, а не на каждую пачку.
+    """
+    if not records:
+        return 0
+    return upsert_chunks([clean_chunk(pd.DataFrame(records), table_name)], table_name, changed_users)
+
+
+def upsert_chunks(chunks, table_name: str, changed_users: set = None) -> int:
+    """
+    Сливает очищенные куски в таблицу через staging-таблицу и COPY, см. bulk_load.
+    Если передан changed_users, в него добавляются username изменённых строк.
+    """
+    spec = TABLES[table_name]
+    columns = list(spec["columns"])
+    key = spec["key"]
+    values = [name for name in columns if name not in key]
+    column_list = ", ".join(columns)
+    changed_list = ", ".join(key + spec.get("tracked", []))
+
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"CREATE TEMP TABLE staging (LIKE {table_name} INCLUDING DEFAULTS, seq bigserial) ON COMMIT DROP"
+            )
+            staged = 0
+            for chunk in chunks:
+                buffer = io.StringIO()
+                chunk.to_csv(buffer, header=False, index=False)
+                buffer.seek(0)
+                cur.copy_expert(f"COPY staging ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+                staged += len(chunk)
+
+            for column, dimension in spec.get("dimensions", {}).items():
+                cur.execute(
+                    f"INSERT INTO {dimension} ({DIMENSIONS[dimension]}) "
+                    f"SELECT DISTINCT {column} FROM staging ON CONFLICT DO NOTHING"
+                )
+
+            # changed: ключи изменённых строк с новыми и, для tracked-колонок, старыми значениями
+            cur.execute(
+                f"CREATE TEMP TABLE changed ON COMMIT DROP AS SELECT {changed_list} FROM {table_name} WITH NO DATA"
+            )
+            for column in spec.get("tracked", []):
+                cur.execute(f"""
+                    INSERT INTO changed ({changed_list})
+                    SELECT {', '.join(f"t.{name}" for name in key + spec['tracked'])}
+                    FROM {table_name} t
+                    JOIN staging s USING ({', '.join(key)})
+                    WHERE t.{column} IS DISTINCT FROM s.{column}
+                """)
+
+            cur.execute(f"""
+                WITH applied AS (
+                INSERT INTO {table_name} ({column_list})
+                SELECT DISTINCT ON ({', '.join(key)}) {column_list}
+                FROM staging
+                ORDER BY {', '.join(key)}, seq DESC
+                ON CONFLICT ({', '.join(key)}) DO UPDATE
+                SET {', '.join(f"{name} = EXCLUDED.{name}" for name in values)}
+                WHERE ({', '.join(f"{table_name}.{name}" for name in values)})
+                      IS DISTINCT FROM ({', '.join(f"EXCLUDED.{name}" for name in values)})
+                RETURNING {changed_list}
+                )
+                INSERT INTO changed ({changed_list}) SELECT {changed_list} FROM applied
+            """)
+            applied = cur.rowcount
+            refresh_aggregates(cur, source=table_name)
+            if changed_users is not None:
+                cur.execute("SELECT DISTINCT username FROM changed")
+                changed_users.update(row[0] for row in cur.fetchall())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(f"{table_name}: прочитано {staged} строк, вставлено или изменено {applied}")
+    return applied
+
+
+def update_user_index(usernames: list[str]):
+    """
+    Дописывает изменённых пользователей в снапшот user_index (без снапшота строит его целиком).
+    Данные к этому моменту уже закоммичены, поэтому ошибка не прерывает загрузку: снапшот
+    удаляется и будет построен заново при следующей.
+    """
+    if not USER_INDEX_PATH:
+        return
+    try:
+        users_count = user_index.rebuild(engine, USER_INDEX_PATH, usernames)
+        print(f"Снапшот user_index обновлён: {len(usernames)} изменённых пользователей, всего {users_count}")
+    except Exception as e:
+        print(f"Не удалось обновить снапшот user_index ({e}), он будет построен заново при следующей загрузке")
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(USER_INDEX_PATH)
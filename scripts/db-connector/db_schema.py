@@ -0,0 +1,136 @@
+# Схема аналитических таблиц, которой управляет db_connector
+
+# Справочники: значения попадают сюда при загрузке фактов, факты ссылаются на них внешним ключом
+DIMENSIONS = {
+    "countries": "country",
+    "languages": "languagename",
+}
+
+# Типизированные таблицы для bulk_load: колонки (в порядке CSV после lower()), первичный ключ,
+# значения по умолчанию для пустых ячеек и колонки-ссылки на справочники
+TABLES = {
+    "users": {
+        "columns": {
+            "global_rank": "integer",
+            "username": "text NOT NULL",
+            "display_name": "text",
+            "score": "double precision",
+            "country": "text NOT NULL",
+            "contests_attended": "integer",
+            "page": "integer",
+        },
+        "key": ["username"],
+        "defaults": {"country": "Not specified"},
+        "dimensions": {"country": "countries"},
+        # Старые значения этих колонок нужны, чтобы пересчитать агрегаты группы, из которой ушёл пользователь
+        "tracked": ["country"],
+    },
+    "solved_stats": {
+        "columns": {
+            "username": "text NOT NULL",
+            "easy": "integer",
+            "medium": "integer",
+            "hard": "integer",
+            "ac_easy": "integer",
+            "ac_medium": "integer",
+            "ac_hard": "integer",
+        },
+        "key": ["username"],
+    },
+    "language_stats": {
+        "columns": {
+            "username": "text NOT NULL",
+            "languagename": "text NOT NULL",
+            "problemssolved": "integer",
+        },
+        "key": ["username", "languagename"],
+        "dimensions": {"languagename": "languages"},
+    },
+    # Набор results/submissions/ от scripts/submissions (каталог day=YYYY-MM-DD/ с part-файлами)
+    "submissions": {
+        "columns": {
+            "username": "text NOT NULL",
+            "timestamp": "bigint NOT NULL",
+            "title_slug": "text NOT NULL",
+            "title": "text",
+            "status": "text",
+            "lang": "text NOT NULL",
+            "is_accepted": "boolean",
+        },
+        "key": ["username", "timestamp", "title_slug", "lang"],
+    },
+}
+
+# username уже покрыт первичными ключами, отдельно индексируются колонки группировок и JOIN'ов
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS users_country ON users (country)",
+    "CREATE INDEX IF NOT EXISTS language_stats_languagename ON language_stats (languagename)",
+]
+
+# Предрасчитанные агрегаты для отчётов. После каждой загрузки пересчитываются только затронутые
+# группы (значения `group`): `affected` для каждой исходной таблицы выбирает их из временной таблицы
+# changed, куда bulk_load складывает ключи (и tracked-колонки) изменённых строк.
+AGGREGATES = {
+    "popular_languages": {
+        "columns": {
+            "languagename": "text NOT NULL",
+            "user_count": "integer NOT NULL",
+        },
+        "key": ["languagename"],
+        "group": "languagename",
+        "query": """
+            SELECT languagename, COUNT(*) AS user_count
+            FROM language_stats
+            {where}
+            GROUP BY languagename
+        """,
+        "affected": {
+            "language_stats": "SELECT languagename FROM changed",
+        },
+    },
+    "languages_by_country": {
+        "columns": {
+            "country": "text NOT NULL",
+            "languagename": "text NOT NULL",
+            "user_count": "integer NOT NULL",
+        },
+        "key": ["country", "languagename"],
+        "group": "u.country",
+        "query": """
+            SELECT u.country, l.languagename, COUNT(*) AS user_count
+            FROM language_stats l
+            JOIN users u ON l.username = u.username
+            {where}
+            GROUP BY u.country, l.languagename
+        """,
+        "affected": {
+            "language_stats": "SELECT u.country FROM changed c JOIN users u ON c.username = u.username",
+            "users": "SELECT country FROM changed",
+        },
+    },
+    "avg_solved_by_country": {
+        "columns": {
+            "country": "text NOT NULL",
+            "user_count": "integer NOT NULL",
+            "avg_solved": "double precision",
+            "avg_ac": "double precision",
+        },
+        "key": ["country"],
+        "group": "u.country",
+        "query": """
+            SELECT
+                u.country,
+                COUNT(*) AS user_count,
+                AVG(s.easy + s.medium + s.hard) AS avg_solved,
+                AVG(s.ac_easy + s.ac_medium + s.ac_hard) AS avg_ac
+            FROM solved_stats s
+            JOIN users u ON s.username = u.username
+            {where}
+            GROUP BY u.country
+        """,
+        "affected": {
+            "solved_stats": "SELECT u.country FROM changed c JOIN users u ON c.username = u.username",
+            "users": "SELECT country FROM changed",
+        },
+    },
+}
@@ -1,15 +1,26 @@
-from db_connector import load_csv_to_db, fetch_data
-
-# Загрузка CSV в БД
-csv_tables = [
-    ("submissions.csv", "submissions"),
-    ("language_stats.csv", "language_stats"),
-    ("solved_stats.csv", "solved_stats"),
-    ("users.csv", "users")
+import os
+import sys
+
+from db_connector import bulk_load, fetch_data
+from user_index import UserIndex
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../submissions')))
+from submissions import STORE_DIR
+
+# Посылки: набор submissions хранилища scripts/submissions (STORE_DIR от корня репозитория, части по дням),
+# тем же upsert'ом по ключу посылки, поэтому повторная загрузка ничего не дублирует
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+bulk_load([os.path.join(REPO_ROOT, STORE_DIR, "submissions")], "submissions")
+
+# Типизированные таблицы: COPY + upsert, более поздние файлы перекрывают ранние
+bulk_tables = [
+    (["language_stats.csv", "language_stats2.csv"], "language_stats"),
+    (["solved_stats.csv", "solved_stats2.csv"], "solved_stats"),
+    (["users.csv"], "users")
 ]
 
-for csv_path, table_name in csv_tables:
-    load_csv_to_db(csv_path, table_name)
+for paths, table_name in bulk_tables:
+    bulk_load(paths, table_name)
 
 # Примеры выборки
 print(fetch_data("language_stats")[:5])
@@ -25,3 +36,9 @@ print(fetch_data("users", username="klion26"))
 print(fetch_data("language_stats", username="Naruto_x", columns=["languagename"]))
 print(fetch_data("solved_stats", username="_kevinyang", columns=["hard", "ac_hard"]))
 print(fetch_data("users", username="klion26", columns=["display_name", "country"]))
+
+# Точечные запросы без обращения к БД: снапшот user_index, обновлённый bulk_load
+index = UserIndex()
+print(index.get("xiaowuc1"))
+print(index.get_many(["_kevinyang", "klion26"]))
+print(index.scan(country="China", language="Rust", min_solved=100).head())
@@ -0,0 +1,502 @@
+import fcntl
+import json
+import mmap
+import os
+import struct
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from db_schema import TABLES
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.path.abspath(os.path.join(base_dir, "../../results/user_index.bin"))
+
+# Таблицы с одной строкой на пользователя хранятся колонками по строке пользователя,
+# language_stats — списком (username, languagename) на пользователя
+USER_TABLES = ["users", "solved_stats"]
+LIST_TABLE = "language_stats"
+LIST_COLUMN = "languagename"
+LIST_VALUE = "problemssolved"
+
+FULL_REBUILD_SHARE = 0.5  # если изменилось больше половины пользователей, снапшот строится из БД заново
+
+MAGIC = b"LCUIDX01"
+ALIGN = 64  # смещение каждого массива в файле кратно ALIGN
+INT_NULL = np.iinfo(np.int32).min  # NULL в integer-колонках
+FNV_OFFSET = 0xCBF29CE484222325
+FNV_PRIME = 0x100000001B3
+MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def fnv1a(data: bytes) -> int:
+    """FNV-1a (64 бита) username для хэш-таблицы снапшота"""
+    h = FNV_OFFSET
+    for byte in data:
+        h = ((h ^ byte) * FNV_PRIME) & MASK64
+    return h
+
+
+def fnv1a_blob(blob: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """fnv1a всех строк blob[offsets[i]:offsets[i + 1]] сразу: цикл по позиции символа, а не по строке"""
+    starts = offsets[:-1]
+    lengths = np.diff(offsets)
+    hashes = np.full(len(lengths), FNV_OFFSET, dtype=np.uint64)
+    prime = np.uint64(FNV_PRIME)
+    for position in range(int(lengths.max()) if len(lengths) else 0):
+        active = np.flatnonzero(lengths > position)
+        hashes[active] = (hashes[active] ^ blob[starts[active] + position].astype(np.uint64)) * prime
+    return hashes
+
+
+def build_slots(blob: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Хэш-таблица username -> строка с открытой адресацией (linear probing), размер — степень двойки
+    не меньше 2n. Заполняется векторно: за раунд каждая свободная ячейка достаётся первому претенденту,
+    остальные сдвигаются на следующую ячейку.
+    """
+    count = len(offsets) - 1
+    size = 1 << max(int(2 * count - 1).bit_length(), 4)
+    mask = np.uint64(size - 1)
+    slots = np.full(size, -1, dtype=np.int32)
+    position = (fnv1a_blob(blob, offsets) & mask).astype(np.int64)
+    pending = np.arange(count)
+    while len(pending):
+        wanted = position[pending]
+        free = slots[wanted] == -1
+        claimed, first = np.unique(wanted[free], return_index=True)
+        winners = pending[free][first]
+        slots[claimed] = winners
+        placed = np.zeros(count, dtype=bool)
+        placed[winners] = True
+        pending = pending[~placed[pending]]
+        position[pending] = (position[pending] + 1) & (size - 1)
+    return slots
+
+
+def encode_strings(values) -> tuple[np.ndarray, np.ndarray]:
+    """Список строк (None -> пустая) в (blob байтов UTF-8, offsets длины n + 1)"""
+    encoded = [b"" if value is None else str(value).encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def replace_strings(blob, offsets, count, rows, values):
+    """
+    Строки blob/offsets, дополненные пустыми до count, с заменой строк rows на values.
+    Неизменённые строки копируются векторно, в Python кодируются только values.
+    """
+    lengths = np.zeros(count, dtype=np.int64)
+    lengths[:len(offsets) - 1] = np.diff(offsets)
+    keep = np.ones(count, dtype=bool)
+    keep[rows] = False
+    kept_bytes = np.repeat(keep[:len(offsets) - 1], np.diff(offsets))
+
+    new_blob_values, new_offsets = encode_strings(values)
+    lengths[rows] = np.diff(new_offsets)
+    result_offsets = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(lengths, out=result_offsets[1:])
+    result = np.empty(result_offsets[-1], dtype=np.uint8)
+    result[np.repeat(keep, lengths)] = blob[kept_bytes]
+    for row, start, end in zip(rows, new_offsets[:-1], new_offsets[1:]):
+        result[result_offsets[row]:result_offsets[row] + end - start] = new_blob_values[start:end]
+    return result, result_offsets
+
+
+def inverted(keys: np.ndarray, size: int):
+    """Позиции keys, сгруппированные по коду 0..size-1 (-1 пропускается): (offsets длины size + 1, позиции)"""
+    valid = keys >= 0
+    order = np.flatnonzero(valid)[np.argsort(keys[valid], kind="stable")]
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys[valid], minlength=size), out=offsets[1:])
+    return offsets, order
+
+
+def column_kind(table_name: str, column: str) -> str:
+    """Как колонка хранится в снапшоте: code (справочник), string, int или float"""
+    sql_type = TABLES[table_name]["columns"][column]
+    if column in TABLES[table_name].get("dimensions", {}):
+        return "code"
+    if sql_type.startswith("text"):
+        return "string"
+    return "int" if sql_type == "integer" else "float"
+
+
+def user_columns():
+    """(table_name, column) колонок, которые хранятся по строке пользователя"""
+    return [
+        (table_name, column)
+        for table_name in USER_TABLES
+        for column in TABLES[table_name]["columns"]
+        if column != "username"
+    ]
+
+
+# --- Snapshot file ---
+
+def write_snapshot(path: str, arrays: dict, meta: dict):
+    """
+    Пишет снапшот: MAGIC, длина заголовка, JSON-заголовок (meta и расположение массивов), массивы
+    с выравниванием ALIGN. Файл пишется рядом и подменяется через os.replace: открытые
+    читатели продолжают видеть старую версию.
+    """
+    layout = {}
+    position = 0
+    for name, array in arrays.items():
+        position = -(-position // ALIGN) * ALIGN
+        layout[name] = {"dtype": array.dtype.str, "count": len(array), "offset": position}
+        position += array.nbytes
+    header = json.dumps({"meta": meta, "arrays": layout}, ensure_ascii=False).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as outfile:
+        outfile.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        for name, array in arrays.items():
+            outfile.seek(data_start + layout[name]["offset"])
+            outfile.write(np.ascontiguousarray(array).tobytes())
+        outfile.truncate(data_start + position)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str):
+    """Отображает снапшот в память: массивы — read-only представления над mmap без копирования"""
+    with open(path, "rb") as infile:
+        buffer = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        buffer.close()
+        raise ValueError(f"{path} не является снапшотом user_index")
+    (header_length,) = struct.unpack_from("<Q", buffer, len(MAGIC))
+    header = json.loads(buffer[len(MAGIC) + 8:len(MAGIC) + 8 + header_length])
+    data_start = -(-(len(MAGIC) + 8 + header_length) // ALIGN) * ALIGN
+    arrays = {
+        name: np.frombuffer(buffer, dtype=spec["dtype"], count=spec["count"], offset=data_start + spec["offset"])
+        if spec["count"] else np.empty(0, dtype=spec["dtype"])
+        for name, spec in header["arrays"].items()
+    }
+    return buffer, arrays, header["meta"]
+
+
+class UserIndex:
+    """
+    Колоночный индекс пользователей поверх снапшота в памяти процесса: usernames, страны и языки
+    интернированы (строки — общий буфер с offsets, страны и языки — коды справочников), колонки
+    users и solved_stats — массивы по строке пользователя, language_stats — CSR-списки по пользователю
+    и обратные списки по стране и языку. Поиск по username — O(1) через хэш-таблицу снапшота,
+    открытие — только mmap, без чтения данных. Открытый индекс видит снапшот на момент открытия.
+    """
+
+    def __init__(self, path: str = INDEX_PATH):
+        self.path = path
+        self.buffer, self.arrays, self.meta = read_snapshot(path)
+        self.countries = self.meta["countries"]
+        self.languages = self.meta["languages"]
+        self.country_codes = {name: code for code, name in enumerate(self.countries)}
+        self.language_codes = {name: code for code, name in enumerate(self.languages)}
+        self.names = self.arrays["names"]
+        self.name_offsets = self.arrays["name_offsets"]
+        self.slots = self.arrays["slots"]
+
+    def __len__(self):
+        return len(self.name_offsets) - 1
+
+    def __contains__(self, username):
+        return self.row(username) >= 0
+
+    def close(self):
+        """Освобождает mmap; представления массивов, полученные из индекса, после этого использовать нельзя"""
+        self.arrays = self.names = self.name_offsets = self.slots = None
+        self.buffer.close()
+
+    def username(self, row: int) -> str:
+        return self.names[self.name_offsets[row]:self.name_offsets[row + 1]].tobytes().decode("utf-8")
+
+    def row(self, username: str) -> int:
+        """Номер строки пользователя или -1"""
+        if not len(self):
+            return -1
+        data = username.encode("utf-8")
+        mask = len(self.slots) - 1
+        slot = fnv1a(data) & mask
+        while True:
+            row = int(self.slots[slot])
+            if row < 0:
+                return -1
+            if self.names[self.name_offsets[row]:self.name_offsets[row + 1]].tobytes() == data:
+                return row
+            slot = (slot + 1) & mask
+
+    def rows(self, usernames) -> np.ndarray:
+        return np.array([self.row(username) for username in usernames], dtype=np.int64)
+
+    def value(self, table_name: str, column: str, row: int):
+        array = self.arrays[f"{table_name}.{column}"]
+        kind = column_kind(table_name, column)
+        if kind == "string":
+            if self.arrays[f"{table_name}.{column}.null"][row]:
+                return None
+            offsets = self.arrays[f"{table_name}.{column}.offsets"]
+            return array[offsets[row]:offsets[row + 1]].tobytes().decode("utf-8")
+        value = array[row].item()
+        if kind == "code":
+            return self.countries[value] if value >= 0 else None
+        if kind == "int":
+            return None if value == INT_NULL else value
+        return None if np.isnan(value) else value
+
+    def languages_of(self, row: int) -> dict:
+        start, end = self.arrays["lang_offsets"][row], self.arrays["lang_offsets"][row + 1]
+        codes = self.arrays["lang_codes"][start:end]
+        solved = self.arrays["lang_solved"][start:end]
+        return {
+            self.languages[code]: None if count == INT_NULL else int(count)
+            for code, count in zip(codes.tolist(), solved.tolist())
+        }
+
+    def get(self, username: str):
+        """Все данные пользователя: колонки users и solved_stats (None, если строки нет) и languages {язык: решено}"""
+        row = self.row(username)
+        if row < 0:
+            return None
+        record = {"username": username}
+        for table_name in USER_TABLES:
+            present = bool(self.arrays[f"{table_name}.present"][row])
+            for table, column in user_columns():
+                if table == table_name:
+                    record[column] = self.value(table_name, column, row) if present else None
+        record["languages"] = self.languages_of(row)
+        return record
+
+    def get_many(self, usernames) -> list:
+        """get для списка usernames, в том же порядке"""
+        return [self.get(username) for username in usernames]
+
+    def scan(self, country: str = None, language: str = None, min_solved: int = None) -> pd.DataFrame:
+        """
+        Пользователи страны и/или языка (с problemssolved по языку, не меньше min_solved) одним DataFrame
+        с колонками users и solved_stats. Выбираются только строки из обратных списков, без прохода по всем.
+        """
+        solved = None
+        if language is not None:
+            code = self.language_codes.get(language)
+            if code is None:
+                return self.frame(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32))
+            start, end = self.arrays["by_language_offsets"][code:code + 2]
+            entries = self.arrays["by_language_entries"][start:end]
+            rows = self.arrays["lang_rows"][entries]
+            solved = self.arrays["lang_solved"][entries]
+            if min_solved is not None:
+                keep = (solved != INT_NULL) & (solved >= min_solved)
+                rows, solved = rows[keep], solved[keep]
+            if country is not None:
+                keep = self.arrays["users.country"][rows] == self.country_codes.get(country, -2)
+                rows, solved = rows[keep], solved[keep]
+        elif country is not None:
+            code = self.country_codes.get(country)
+            if code is None:
+                return self.frame(np.empty(0, dtype=np.int64))
+            start, end = self.arrays["by_country_offsets"][code:code + 2]
+            rows = self.arrays["by_country_rows"][start:end]
+        else:
+            rows = np.arange(len(self))
+        return self.frame(rows, solved)
+
+    def frame(self, rows: np.ndarray, solved: np.ndarray = None) -> pd.DataFrame:
+        """DataFrame строк rows: NULL — <NA>, страна — категория"""
+        data = {"username": [self.username(row) for row in rows]}
+        for table_name, column in user_columns():
+            array = self.arrays[f"{table_name}.{column}"]
+            present = self.arrays[f"{table_name}.present"][rows]
+            kind = column_kind(table_name, column)
+            if kind == "string":
+                offsets = self.arrays[f"{table_name}.{column}.offsets"]
+                values = [array[offsets[row]:offsets[row + 1]].tobytes().decode("utf-8") for row in rows]
+                nulls = ~present | self.arrays[f"{table_name}.{column}.null"][rows]
+                data[column] = pd.Series(values, dtype="string").mask(nulls)
+            elif kind == "code":
+                data[column] = pd.Categorical.from_codes(np.where(present, array[rows], -1), self.countries)
+            elif kind == "int":
+                values = array[rows]
+                data[column] = pd.arrays.IntegerArray(values, ~present | (values == INT_NULL))
+            else:
+                data[column] = np.where(present, array[rows], np.nan)
+        if solved is not None:
+            data[LIST_VALUE] = pd.arrays.IntegerArray(solved.astype(np.int32), solved == INT_NULL)
+        return pd.DataFrame(data)
+
+
+# --- Build ---
+
+def empty_state():
+    arrays = {"names": np.empty(0, dtype=np.uint8), "name_offsets": np.zeros(1, dtype=np.int64)}
+    return arrays, {"countries": [], "languages": []}
+
+
+def build(state, users: pd.DataFrame, solved: pd.DataFrame, languages: pd.DataFrame, usernames=None, index=None):
+    """
+    Новое содержимое снапшота: state (arrays, meta) старого снапшота, в котором все данные пользователей
+    usernames (по умолчанию — всех из кадров) заменены строками users, solved и languages.
+    Новые пользователи, страны и языки дописываются в конец, неизменённые массивы копируются векторно.
+    """
+    old, meta = state
+    old_count = len(old["name_offsets"]) - 1
+    if usernames is None:
+        usernames = pd.unique(pd.concat([users["username"], solved["username"], languages["username"]]))
+    usernames = list(dict.fromkeys(usernames))
+
+    old_rows = index.rows(usernames) if index is not None else np.full(len(usernames), -1, dtype=np.int64)
+    added = [username for username, row in zip(usernames, old_rows) if row < 0]
+    count = old_count + len(added)
+    old_rows[old_rows < 0] = np.arange(old_count, count)
+    row_of = dict(zip(usernames, old_rows.tolist()))
+
+    arrays = {}
+    added_names, added_offsets = encode_strings(added)
+    arrays["names"] = np.concatenate([old["names"], added_names])
+    arrays["name_offsets"] = np.concatenate([old["name_offsets"], old["name_offsets"][-1] + added_offsets[1:]])
+    countries = list(meta["countries"])
+    languages_list = list(meta["languages"])
+
+    def codes(values, dictionary):
+        known = {name: code for code, name in enumerate(dictionary)}
+        result = []
+        for value in values:
+            if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+                result.append(-1)
+                continue
+            if value not in known:
+                known[value] = len(dictionary)
+                dictionary.append(value)
+            result.append(known[value])
+        return np.array(result, dtype=np.int32)
+
+    changed = np.asarray(old_rows, dtype=np.int64)
+    for table_name, frame in (("users", users), ("solved_stats", solved)):
+        frame = frame.drop_duplicates("username", keep="last")
+        rows = frame["username"].map(row_of).to_numpy(dtype=np.int64)
+        present = np.zeros(count, dtype=bool)
+        present[:old_count] = old.get(f"{table_name}.present", present[:old_count])
+        present[changed] = False
+        present[rows] = True
+        arrays[f"{table_name}.present"] = present
+
+        for table, column in user_columns():
+            if table != table_name:
+                continue
+            name = f"{table_name}.{column}"
+            kind = column_kind(table_name, column)
+            if kind == "string":
+                values = [None if pd.isna(value) else value for value in frame[column]]
+                replaced = dict.fromkeys(changed.tolist())
+                replaced.update(zip(rows.tolist(), values))
+                nulls = np.ones(count, dtype=bool)
+                nulls[:old_count] = old.get(f"{name}.null", nulls[:old_count])
+                nulls[list(replaced)] = [value is None for value in replaced.values()]
+                arrays[f"{name}.null"] = nulls
+                blob, offsets = replace_strings(
+                    old.get(name, np.empty(0, dtype=np.uint8)), old.get(f"{name}.offsets", np.zeros(1, dtype=np.int64)),
+                    count, np.array(list(replaced), dtype=np.int64), list(replaced.values()),
+                )
+                arrays[name], arrays[f"{name}.offsets"] = blob, offsets
+                continue
+            dtype, null = (np.float64, np.nan) if kind == "float" else (np.int32, -1 if kind == "code" else INT_NULL)
+            array = np.full(count, null, dtype=dtype)
+            if name in old:
+                array[:old_count] = old[name]
+            array[changed] = null
+            if kind == "code":
+                array[rows] = codes(frame[column].tolist(), countries)
+            elif kind == "int":
+                values = pd.to_numeric(frame[column], errors="coerce")
+                array[rows] = values.fillna(INT_NULL).to_numpy(dtype=np.int64)
+            else:
+                array[rows] = pd.to_numeric(frame[column], errors="coerce").to_numpy(dtype=np.float64)
+            arrays[name] = array
+
+    # language_stats: записи старых пользователей, кроме изменённых, плюс новые; затем CSR по строке пользователя
+    if "lang_rows" in old:
+        keep = np.ones(count, dtype=bool)
+        keep[changed] = False
+        kept = keep[old["lang_rows"]]
+        entry_rows = old["lang_rows"][kept].astype(np.int64)
+        entry_codes = old["lang_codes"][kept]
+        entry_solved = old["lang_solved"][kept]
+    else:
+        entry_rows = np.empty(0, dtype=np.int64)
+        entry_codes = np.empty(0, dtype=np.int32)
+        entry_solved = np.empty(0, dtype=np.int32)
+    languages = languages.drop_duplicates(["username", LIST_COLUMN], keep="last")
+    entry_rows = np.concatenate([entry_rows, languages["username"].map(row_of).to_numpy(dtype=np.int64)])
+    entry_codes = np.concatenate([entry_codes, codes(languages[LIST_COLUMN].tolist(), languages_list)])
+    entry_solved = np.concatenate([
+        entry_solved,
+        pd.to_numeric(languages[LIST_VALUE], errors="coerce").fillna(INT_NULL).to_numpy(dtype=np.int64).astype(np.int32),
+    ])
+    order = np.lexsort((-entry_solved.astype(np.int64), entry_rows))  # внутри пользователя — по убыванию решённых
+    arrays["lang_rows"] = entry_rows[order].astype(np.int32)
+    arrays["lang_codes"] = entry_codes[order]
+    arrays["lang_solved"] = entry_solved[order]
+    arrays["lang_offsets"] = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(arrays["lang_rows"], minlength=count), out=arrays["lang_offsets"][1:])
+
+    arrays["by_language_offsets"], arrays["by_language_entries"] = inverted(
+        arrays["lang_codes"], len(languages_list))
+    arrays["by_country_offsets"], arrays["by_country_rows"] = inverted(
+        np.where(arrays["users.present"], arrays["users.country"], -1), len(countries))
+    arrays["slots"] = build_slots(arrays["names"], arrays["name_offsets"])
+
+    return arrays, {"countries": countries, "languages": languages_list, "users": count, "built_at": time.time()}
+
+
+# --- Sources ---
+
+def read_tables(conn, usernames=None):
+    """users, solved_stats и language_stats из БД целиком или только для usernames"""
+    where = "WHERE username = ANY(:usernames)" if usernames is not None else ""
+    params = {"usernames": list(usernames)} if usernames is not None else {}
+    frames = []
+    for table_name in USER_TABLES + [LIST_TABLE]:
+        columns = ", ".join(TABLES[table_name]["columns"])
+        frames.append(pd.read_sql(text(f"SELECT {columns} FROM {table_name} {where}"), conn, params=params))
+    return frames
+
+
+def rebuild(engine, path: str = INDEX_PATH, usernames=None) -> int:
+    """
+    Обновляет снапшот после загрузки: для usernames перечитывает из БД только их строки и дописывает
+    их в существующий снапшот, без usernames или без снапшота строит его из таблиц целиком.
+    Параллельные обновления одного снапшота сериализуются блокировкой <path>.lock.
+    Возвращает число пользователей в снапшоте.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        index = UserIndex(path) if os.path.exists(path) else None
+        try:
+            if index is not None and usernames is not None and len(usernames) <= FULL_REBUILD_SHARE * len(index):
+                if not len(usernames):
+                    return len(index)
+                with engine.connect() as conn:
+                    frames = read_tables(conn, usernames)
+                arrays, meta = build((index.arrays, index.meta), *frames, usernames=usernames, index=index)
+            else:
+                with engine.connect() as conn:
+                    frames = read_tables(conn)
+                arrays, meta = build(empty_state(), *frames)
+            write_snapshot(path, arrays, meta)
+        finally:
+            if index is not None:
+                index.close()
+    return meta["users"]
+
+
+if __name__ == "__main__":
+    # Полная пересборка снапшота из БД
+    from db_connector import engine
+
+    started = time.perf_counter()
+    users_count = rebuild(engine)
+    print(f"Снапшот {INDEX_PATH} построен: {users_count} пользователей за {time.perf_counter() - started:.1f} с")
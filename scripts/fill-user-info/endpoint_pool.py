@@ -0,0 +1,182 @@
+import bisect
+import hashlib
+import threading
+
+import requests
+
+from http_client import ApiClient, FetchError
+from rate_limiter import AdaptiveTokenBucket
+
+HEALTH_PATH = "/cache/stats"  # cheap api route answered without a LeetCode request
+
+
+def ring_hash(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hashing ring with `replicas` virtual nodes per endpoint.
+    Adding or removing an endpoint moves only the keys of that endpoint,
+    and the failover order of a key is simply the next endpoints around the ring.
+    """
+
+    def __init__(self, names, replicas=100):
+        points = sorted((ring_hash(f"{name}#{i}"), name) for name in names for i in range(replicas))
+        self.hashes = [point for point, _ in points]
+        self.names = [name for _, name in points]
+        self.size = len(set(names))
+
+    def nodes(self, key):
+        """All endpoints in ring order starting at the key: the owner first, then its failover successors."""
+        start = bisect.bisect(self.hashes, ring_hash(key)) % len(self.hashes)
+        seen = []
+        for i in range(len(self.names)):
+            name = self.names[(start + i) % len(self.names)]
+            if name not in seen:
+                seen.append(name)
+                if len(seen) == self.size:
+                    break
+        return seen
+
+
+def is_endpoint_failure(error):
+    """
+    Whether a FetchError is the instance's fault (connection errors, timeouts, 5xx, exhausted 429s)
+    and worth failing over, rather than a 4xx that every instance would answer the same way.
+    """
+    reason = error.reason
+    if isinstance(reason, requests.exceptions.HTTPError) and reason.response is not None:
+        return reason.response.status_code >= 500
+    return True
+
+
+class Endpoint:
+    """One api instance: its own keep-alive client, AIMD rate limit and health state."""
+
+    def __init__(self, base_url, client):
+        self.base_url = base_url.rstrip("/")
+        self.client = client
+        self.failures = 0
+        self.healthy = True
+        self.served = 0
+        self.failovers = 0
+
+
+class EndpointPool:
+    """
+    Shards requests across several api instances by consistent hashing of a key (e.g. the username).
+    Each instance has its own token bucket, so the total request budget grows with the number of instances.
+    An instance is taken out of rotation after `failure_threshold` consecutive failed requests or a failed
+    health check, its keys fail over to the next instances on the ring, and a background health check
+    (GET HEALTH_PATH every `health_every` seconds) puts it back once it answers again.
+    With a single base URL it behaves like a plain ApiClient.
+    """
+
+    def __init__(self, base_urls, rate, min_rate, max_rate, pool_size=10, max_retries=6, failover_retries=2,
+                 initial_backoff=0.5, max_backoff=30.0, timeout=10, metrics=None,
+                 health_path=HEALTH_PATH, health_every=10.0, failure_threshold=3, replicas=100):
+        if not base_urls:
+            raise ValueError("EndpointPool needs at least one base URL")
+        # With failover available, give up on one instance sooner instead of waiting out its full backoff
+        retries = max_retries if len(base_urls) == 1 else max(1, min(max_retries, failover_retries))
+        self.endpoints = {}
+        for base_url in base_urls:
+            limiter = AdaptiveTokenBucket(rate, min_rate, max_rate)
+            client = ApiClient(limiter, pool_size=pool_size, max_retries=retries, initial_backoff=initial_backoff,
+                               max_backoff=max_backoff, timeout=timeout, metrics=metrics)
+            endpoint = Endpoint(base_url, client)
+            self.endpoints[endpoint.base_url] = endpoint
+        self.ring = HashRing(list(self.endpoints), replicas)
+        self.lock = threading.Lock()
+        self.failure_threshold = failure_threshold
+        self.health_path = health_path
+        self.health_every = health_every
+        self.stopped = threading.Event()
+        self.health_thread = None
+        if len(self.endpoints) > 1 and health_every:
+            self.health_thread = threading.Thread(target=self.health_loop, name="health", daemon=True)
+            self.health_thread.start()
+
+    @property
+    def rate(self):
+        """Combined request budget of the healthy instances (req/sec)."""
+        return sum(endpoint.client.limiter.rate for endpoint in self.endpoints.values() if endpoint.healthy)
+
+    def candidates(self, key):
+        """Instances to try for a key: healthy ones in ring order, then the unhealthy ones as a last resort."""
+        nodes = [self.endpoints[name] for name in self.ring.nodes(key)]
+        return [endpoint for endpoint in nodes if endpoint.healthy] + [endpoint for endpoint in nodes if not endpoint.healthy]
+
+    def set_health(self, endpoint, healthy, reason=None):
+        with self.lock:
+            changed = endpoint.healthy != healthy
+            endpoint.healthy = healthy
+            endpoint.failures = 0 if healthy else endpoint.failures
+        if changed:
+            print(f"Endpoint {endpoint.base_url} is {'back in rotation' if healthy else f'down: {reason}'}")
+
+    def on_success(self, endpoint):
+        with self.lock:
+            endpoint.failures = 0
+            endpoint.served += 1
+
+    def on_failure(self, endpoint, error):
+        with self.lock:
+            endpoint.failures += 1
+            endpoint.failovers += 1
+            down = endpoint.failures >= self.failure_threshold
+        if down:
+            self.set_health(endpoint, False, error.reason)
+
+    def get_json(self, path, key=None):
+        return self.request_json("GET", path, key)
+
+    def post_json(self, path, payload, key=None):
+        return self.request_json("POST", path, key, json=payload)
+
+    def request_json(self, method, path, key=None, **kwargs):
+        """Sends the request to the key's instance, failing over around the ring. Raises FetchError."""
+        error = None
+        for endpoint in self.candidates(path if key is None else key):
+            try:
+                data = endpoint.client.request_json(method, endpoint.base_url + path, **kwargs)
+            except FetchError as e:
+                if not is_endpoint_failure(e):
+                    raise
+                error = e
+                self.on_failure(endpoint, e)
+                continue
+            self.on_success(endpoint)
+            return data
+        raise error
+
+    def check(self, endpoint):
+        """One health probe, outside the rate limiter: the health route does not reach LeetCode."""
+        try:
+            response = endpoint.client.session.get(endpoint.base_url + self.health_path, timeout=2)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            self.set_health(endpoint, False, e)
+            return
+        self.set_health(endpoint, True)
+
+    def health_loop(self):
+        while not self.stopped.wait(self.health_every):
+            for endpoint in list(self.endpoints.values()):
+                self.check(endpoint)
+
+    def status(self):
+        """Per-instance summary for the end-of-run report."""
+        return [
+            {"base_url": endpoint.base_url, "healthy": endpoint.healthy, "served": endpoint.served,
+             "failovers": endpoint.failovers, "rate": round(endpoint.client.limiter.rate, 1)}
+            for endpoint in self.endpoints.values()
+        ]
+
+    def close(self):
+        self.stopped.set()
+        if self.health_thread:
+            self.health_thread.join()
+        for endpoint in self.endpoints.values():
+            endpoint.client.close()
@@ -1,123 +1,217 @@
-import requests
 import csv
+import hashlib
 import json
+import math
+import os
 import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from endpoint_pool import EndpointPool
+from http_client import FetchError
+from metrics import CrawlMetrics, MetricsServer, ProgressReporter
+from progress_store import ProgressStore
+from sinks import CsvSink, OutputMismatchError, ParquetSink, parquet_schema
+from user_stats import extract_language_stats, extract_solved_stats
 
 # --- Configuration ---
-BASE_URL = "http://localhost:3000"
+BASE_URLS = ["http://localhost:3000"] # api instances; users are sharded across them by consistent hashing of the username
 INPUT_FILE = "results/users.csv"
 LANGUAGE_STATS_OUTPUT = "results/language_stats2.csv"
 SOLVED_STATS_OUTPUT = "results/solved_stats2.csv"
-MAX_RETRIES = 3
-INITIAL_BACKOFF = 0.05  # seconds
+PROGRESS_DB = "results/fill_progress.sqlite3" # Done/failed/pending state of every user, used to resume
+CHECKPOINT_EVERY = 200 # Users written between two progress checkpoints
+OUTPUT_FORMAT = "csv" # "csv", or "parquet": outputs become <name>.parquet directories of part files (needs pyarrow)
+PARQUET_PART_ROWS = 1_000_000 # Parquet: the part written at each checkpoint is merged into parts of ~this many rows at the end of the run
+
+MODE = "fill" # "fill": fetch users that are not done yet; "refresh": re-fetch stale users, write only changed ones
+LANGUAGE_STATS_CHANGES_OUTPUT = "results/language_stats_changes.csv" # Refresh mode: new versions of changed users
+SOLVED_STATS_CHANGES_OUTPUT = "results/solved_stats_changes.csv"
+REFRESH_BASE_INTERVAL_SEC = 24 * 3600 # Staleness interval of the top ranked user without contests, see refresh_interval
+REFRESH_BATCH_SIZE = 20000 # Max number of stale users re-fetched by one refresh run
+MAX_RETRIES = 6
+INITIAL_BACKOFF = 0.5  # seconds, base of the jittered exponential backoff
+MAX_BACKOFF = 30.0  # seconds
 
-START_INDEX = 43230      # Starting index (0-based) in users.csv
-PROCESS_COUNT = 84540 # Number of users to process starting from START_INDEX
-THROTTLE_DELAY_SEC = 0.1 # Delay between processing each user to prevent rate limiting
+CONCURRENCY = 16 # Number of requests kept in flight against the api server
+BATCH_SIZE = 0 # >0: fetch users in groups of this size through POST /batch/userStats (max 100) instead of 2 requests per user
+RATE_LIMIT_PER_SEC = 20.0 # Initial request budget of each api instance, shared by all workers (token bucket)
+MIN_RATE_PER_SEC = 1.0 # The budget is halved on repeated 429s (3 within a second) down to this floor...
+MAX_RATE_PER_SEC = 50.0 # ...and grows back by 10% of this ceiling per second while requests succeed
+FAILOVER_RETRIES = 2 # With several BASE_URLS: attempts on one instance before its users fail over to the next one
+HEALTH_CHECK_EVERY_SEC = 10.0 # Health probe of every instance; failed instances leave the rotation until they answer again
 INITIAL_START_DELAY_SEC = 0 # Delay the start of the entire script by 1 hour (3600 seconds)
 
+PROGRESS_REFRESH_SEC = 1.0 # How often the single progress line is redrawn
+METRICS_LOG = "results/fill_metrics.jsonl" # Structured log: a JSON snapshot every METRICS_LOG_EVERY_SEC, failed users with their cause
+METRICS_LOG_EVERY_SEC = 30.0
+METRICS_PORT = 0 # >0: serve Prometheus text metrics on http://127.0.0.1:<port>/metrics while the crawl runs
+
+METRICS = CrawlMetrics()
+API_CLIENT = EndpointPool(
+    BASE_URLS, RATE_LIMIT_PER_SEC, MIN_RATE_PER_SEC, MAX_RATE_PER_SEC,
+    pool_size=CONCURRENCY, max_retries=MAX_RETRIES, failover_retries=FAILOVER_RETRIES,
+    initial_backoff=INITIAL_BACKOFF, max_backoff=MAX_BACKOFF, metrics=METRICS,
+    health_every=HEALTH_CHECK_EVERY_SEC
+)
+
 # --- Helper Functions for API and Robustness ---
 
-def fetch_data_with_retry(url):
-    """Fetches data from a URL with exponential backoff for robustness."""
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status() # Raises an HTTPError for bad responses (4xx or 5xx)
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            # Handle connection errors, timeouts, and HTTP errors
-            print(f"Error fetching {url} for attempt {attempt + 1}: {e}")
-            if attempt < MAX_RETRIES - 1:
-                sleep_time = INITIAL_BACKOFF * (2 ** attempt)
-                time.sleep(sleep_time)
-                continue
-            return None # Failed after all retries
-
-# --- Feature Extraction Functions ---
-
-def get_count_by_difficulty(data_array, difficulty_name):
-    """Safely finds the 'count' value for a specific difficulty in the API arrays."""
-    if not data_array:
-        return 0
-    for item in data_array:
-        if item.get("difficulty") == difficulty_name:
-            # We want the 'count' of problems (not 'submissions')
-            return item.get("count", 0)
-    return 0
-
-def extract_solved_stats(username, solved_data):
-    """
-    Creates a single row record for the solved_stats table: 
-    username, easy, medium, hard, ac_easy, ac_medium, ac_hard
-    """
-    default_record = {
-        "username": username, "easy": 0, "medium": 0, "hard": 0,
-        "ac_easy": 0, "ac_medium": 0, "ac_hard": 0
-    }
-    if not solved_data:
-        return default_record
-
-    total_submissions = solved_data.get("totalSubmissionNum", [])
-    accepted_submissions = solved_data.get("acSubmissionNum", [])
-
-    return {
-        "username": username,
-        # Total Solved Problems (All, Easy, Medium, Hard)
-        "easy": get_count_by_difficulty(total_submissions, "Easy"),
-        "medium": get_count_by_difficulty(total_submissions, "Medium"),
-        "hard": get_count_by_difficulty(total_submissions, "Hard"),
-        # Accepted Problems (Easy, Medium, Hard)
-        "ac_easy": get_count_by_difficulty(accepted_submissions, "Easy"),
-        "ac_medium": get_count_by_difficulty(accepted_submissions, "Medium"),
-        "ac_hard": get_count_by_difficulty(accepted_submissions, "Hard")
-    }
-
-def extract_language_stats(username, lang_data):
-    """
-    Creates multiple row records for the language_stats table:
-    username, languageName, problemsSolved
-    """
-    records = []
-    if not lang_data:
-        return records
-
-    lang_counts = lang_data.get("matchedUser", {}).get("languageProblemCount", [])
-    
-    for item in lang_counts:
-        records.append({
-            "username": username,
-            "languageName": item.get("languageName", "Unknown"),
-            "problemsSolved": item.get("problemsSolved", 0)
-        })
-    
-    return records
-
-
-def process_user_data(username):
-    """
-    Fetches required data and returns structured records for both tables.
+def fetch_data_with_retry(path, username):
+    """
+    Fetches an api path from the username's instance through the pooled clients (Retry-After, AIMD rate,
+    jittered backoff, failover to the next instance). Raises FetchError after all retries,
+    so a failed user is never mistaken for one with no data.
+    """
+    return API_CLIENT.get_json(path, key=username)
+
+
+def fetch_batch_with_retry(usernames):
+    """Fetches solved and language stats of several users with one POST /batch/userStats request."""
+    return API_CLIENT.post_json("/batch/userStats", {"usernames": usernames}, key=usernames[0])
+
+
+def submit_user(executor, username):
+    """
+    Schedules the /solved and /languageStats requests of one user on the executor,
+    so both calls run in parallel. Returns (solved_future, lang_future)
+    """
+    return (
+        executor.submit(fetch_data_with_retry, f"/{username}/solved", username),
+        executor.submit(fetch_data_with_retry, f"/languageStats?username={username}", username),
+    )
+
+
+def collect_user(username, futures):
+    """
+    Waits for the requests scheduled by submit_user and returns structured records for both tables.
     Returns (language_records, solved_record)
     """
-    
-    # --- 1. Fetch Solved Data ---
-    solved_url = f"{BASE_URL}/{username}/solved"
-    solved_data = fetch_data_with_retry(solved_url)
-    solved_record = extract_solved_stats(username, solved_data)
+    solved_future, lang_future = futures
+    solved_record = extract_solved_stats(username, solved_future.result())
+    language_records = extract_language_stats(username, lang_future.result())
+    return language_records, solved_record
 
-    # --- 2. Fetch Language Data ---
-    lang_url = f"{BASE_URL}/languageStats?username={username}"
-    lang_data = fetch_data_with_retry(lang_url)
-    language_records = extract_language_stats(username, lang_data)
 
+def collect_batch_user(username, batch_future):
+    """
+    Waits for the batch request scheduled by submit_users and returns the records of one of its users.
+    Unknown users come back as null: they raise KeyError, so the user is marked failed
+    instead of being written as a zero row.
+    Returns (language_records, solved_record)
+    """
+    user = batch_future.result()["users"].get(username)
+    if user is None:
+        raise KeyError(f"{username} is missing from the /batch/userStats response")
+    solved_record = extract_solved_stats(username, user.get("solved"))
+    language_records = extract_language_stats(username, user.get("languageStats"))
     return language_records, solved_record
 
+
+def submit_users(executor, usernames):
+    """
+    Schedules the requests for a group of users and returns [(username, collect)], where collect()
+    waits for that user's data and returns (language_records, solved_record).
+    With BATCH_SIZE > 0 the whole group is one batch request, otherwise every user
+    gets its own parallel /solved and /languageStats requests.
+    """
+    if BATCH_SIZE > 0:
+        batch_future = executor.submit(fetch_batch_with_retry, usernames)
+        return [(username, partial(collect_batch_user, username, batch_future)) for username in usernames]
+    return [(username, partial(collect_user, username, submit_user(executor, username))) for username in usernames]
+
+
+# --- Refresh Priority and Change Detection ---
+
+def parse_int(value, default):
+    """Parses leaderboard numbers such as '1234' or 'N/A'."""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def refresh_interval(global_rank, contests_attended):
+    """
+    Seconds after which a user's stats count as stale. High-ranked users and users attending
+    many contests change more often, so they are refreshed sooner:
+    rank #1 with no contests -> 1x REFRESH_BASE_INTERVAL_SEC, rank #100000 -> 6x,
+    100 contests attended divide the interval by ~5.6.
+    """
+    rank_factor = 1 + math.log10(max(global_rank, 1))
+    activity_factor = 1 + math.log1p(max(contests_attended, 0))
+    return REFRESH_BASE_INTERVAL_SEC * rank_factor / activity_factor
+
+
+def read_input_users(path):
+    """Reads users.csv into (username, refresh_interval) pairs in file order."""
+    users = []
+    with open(path, mode='r', newline='', encoding='utf-8') as infile:
+        for row in csv.DictReader(infile):
+            username = row['username'].strip()
+            if username:
+                global_rank = parse_int(row.get('global_rank'), default=10 ** 6)
+                contests_attended = parse_int(row.get('contests_attended'), default=0)
+                users.append((username, refresh_interval(global_rank, contests_attended)))
+    return users
+
+
+def content_hash(lang_records, solved_record):
+    """Stable digest of a user's fetched records, used to skip unchanged users on refresh."""
+    payload = json.dumps([solved_record, sorted(lang_records, key=lambda r: r["languageName"])], sort_keys=True)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+# --- Output Files and Checkpoints ---
+
+LANG_FIELDNAMES = ["username", "languageName", "problemsSolved"]
+SOLVED_FIELDNAMES = [
+    "username", "easy", "medium", "hard",
+    "ac_easy", "ac_medium", "ac_hard"
+]
+
+
+def read_written_usernames(path):
+    """Usernames already present in an output CSV, skipping header rows repeated by older runs."""
+    with open(path, mode='r', newline='', encoding='utf-8') as infile:
+        return {row['username'] for row in csv.DictReader(infile) if row['username'] != 'username'}
+
+
+def seed_from_output(store):
+    """
+    Marks users already written by runs that predate the progress store as done,
+    so they are not fetched (and written) again.
+    """
+    if store.committed_size(SOLVED_STATS_OUTPUT) is not None or not os.path.exists(SOLVED_STATS_OUTPUT):
+        return
+    written = read_written_usernames(SOLVED_STATS_OUTPUT)
+    store.mark_done_without_checkpoint(written)
+    print(f"Seeded progress store with {len(written)} user(s) found in '{SOLVED_STATS_OUTPUT}'.")
+
+
+def open_sink(path, fieldnames, store):
+    """
+    Opens the output sink for a table in OUTPUT_FORMAT, rolled back to its last checkpoint.
+    Parquet outputs live next to the CSV ones, e.g. results/solved_stats2.parquet/.
+    """
+    if OUTPUT_FORMAT == "parquet":
+        path = os.path.splitext(path)[0] + ".parquet"
+        schema = parquet_schema(fieldnames, categories=("languageName",))
+        return ParquetSink(path, schema, store.committed_size(path), PARQUET_PART_ROWS)
+    return CsvSink(path, fieldnames, store.committed_size(path))
+
 # --- Main Logic ---
 
 def main():
     """
     Main function to orchestrate the reading, processing, and STREAMING of data 
-    into two separate CSV files, applying pagination.
+    into two separate CSV files. Progress is checkpointed in PROGRESS_DB, so a restart
+    skips finished users and retries only the pending and failed ones.
+
+    In refresh mode the most overdue done users are re-fetched; users whose content hash
+    did not change only get their fetch time updated, changed ones are appended to the
+    *_CHANGES_OUTPUT files to be upserted downstream.
     """
     # Apply initial delay
     if INITIAL_START_DELAY_SEC > 0:
@@ -130,90 +224,148 @@ def main():
         print("Delay complete. Starting data processing.")
         
     try:
-        with open(INPUT_FILE, mode='r', newline='', encoding='utf-8') as infile:
-            reader = csv.DictReader(infile)
-            usernames = [row['username'].strip() for row in reader]
+        users = read_input_users(INPUT_FILE)
     except FileNotFoundError:
         print(f"Error: Input file '{INPUT_FILE}' not found. Please create it.")
         return
 
-    # --- Apply Pagination Logic ---
-    total_users = len(usernames)
-    
-    if START_INDEX >= total_users:
-        print(f"Error: START_INDEX ({START_INDEX}) is beyond the total number of users ({total_users}). Exiting.")
-        return
+    store = ProgressStore(PROGRESS_DB)
+    store.add_users(users)
+    seed_from_output(store)
+
+    refresh = MODE == "refresh"
+    if refresh:
+        usernames_to_process = store.stale(time.time(), REFRESH_BATCH_SIZE)
+        previous_hashes = store.content_hashes(usernames_to_process)
+        lang_path, solved_path = LANGUAGE_STATS_CHANGES_OUTPUT, SOLVED_STATS_CHANGES_OUTPUT
+    else:
+        usernames_to_process = store.remaining()
+        previous_hashes = {}
+        lang_path, solved_path = LANGUAGE_STATS_OUTPUT, SOLVED_STATS_OUTPUT
+
+    counts = store.counts()
+    print(f"Total users found: {len(users)}")
+    print(f"Progress: {counts.get('done', 0)} done, {counts.get('failed', 0)} failed, {counts.get('pending', 0)} pending.")
 
-    # Calculate the end index (exclusive)
-    end_index = min(START_INDEX + PROCESS_COUNT, total_users)
-    
-    # Slice the list to get the users for the current batch
-    usernames_to_process = usernames[START_INDEX:end_index]
-    actual_count = len(usernames_to_process)
-
-    print(f"Total users found: {total_users}")
-    print(f"Applying pagination: Starting at index {START_INDEX} and processing {actual_count} user(s).")
-    
-    if actual_count == 0:
-        print("No users to process based on START_INDEX and PROCESS_COUNT. Exiting.")
+    if not usernames_to_process:
+        print("No stale users to refresh. Exiting." if refresh else "All users are already processed. Exiting.")
+        store.close()
         return
+    if refresh:
+        print(f"Refreshing {len(usernames_to_process)} stale user(s), most overdue first.")
 
-    # --- Define Fieldnames ---
-    lang_fieldnames = ["username", "languageName", "problemsSolved"]
-    solved_fieldnames = [
-        "username", "easy", "medium", "hard", 
-        "ac_easy", "ac_medium", "ac_hard"
-    ]
-    
     processed_count = 0
+    changed_count = 0
+    failed_count = 0
+    done_batch = {}
+    failed_batch = {}
 
     try:
-        # Open both CSV files for writing (once)
-        with open(LANGUAGE_STATS_OUTPUT, mode='a', newline='', encoding='utf-8') as lang_outfile, \
-             open(SOLVED_STATS_OUTPUT, mode='a', newline='', encoding='utf-8') as solved_outfile:
-
-            # Initialize DictWriters
-            lang_writer = csv.DictWriter(lang_outfile, fieldnames=lang_fieldnames, extrasaction='ignore')
-            solved_writer = csv.DictWriter(solved_outfile, fieldnames=solved_fieldnames, extrasaction='ignore')
-
-            # Write headers for both files
-            lang_writer.writeheader()
-            solved_writer.writeheader()
-            
-            # Process each user sequentially
-            for username in usernames_to_process:
-                if username:
-                    try: 
-                        print(f"Processing data for user: {username}")
-                        
-                        lang_records, solved_record = process_user_data(username)
-                        
-                        # 1. Write to Language Stats Table (Multi-Row)
-                        if lang_records:
-                            lang_writer.writerows(lang_records)
-                            
-                        # 2. Write to Solved Stats Table (Single-Row)
-                        if solved_record:
-                            solved_writer.writerow(solved_record)
-
-                        lang_outfile.flush()
-                        solved_outfile.flush()
-                            
-                        processed_count += 1
-                        print(f"--> Data written for {username}. Total processed: {processed_count}")
-                        
-                        # Throttle the process to prevent rate-limiting errors
-                        time.sleep(THROTTLE_DELAY_SEC)
-                    except Exception as e:
-                        print(f"An error occurred while parsing {username}")
-
-
-    except Exception as e:
-        print("Script finished with unexpected reasons")
+        lang_sink = open_sink(lang_path, LANG_FIELDNAMES, store)
+        solved_sink = open_sink(solved_path, SOLVED_FIELDNAMES, store)
+        lang_path, solved_path = lang_sink.path, solved_sink.path
+
+        def checkpoint():
+            """Commits both outputs and records the batch as done/failed together with their positions."""
+            store.checkpoint(done_batch, failed_batch, {
+                lang_path: lang_sink.commit(),
+                solved_path: solved_sink.commit(),
+            })
+            done_batch.clear()
+            failed_batch.clear()
+
+        def record_failure(username, error):
+            nonlocal failed_count
+            failed_count += 1
+            METRICS.user_failed()
+            progress.event("user_failed", username=username, error=error)
+            # A failed refresh keeps the user done with its previous data; it stays stale and is retried next run
+            if not refresh:
+                failed_batch[username] = error
+
+        def write_next_user():
+            """Writes the oldest in-flight user once both of its requests are done."""
+            nonlocal processed_count, changed_count
+            username, collect = in_flight.popleft()
+            try:
+                lang_records, solved_record = collect()
+                digest = content_hash(lang_records, solved_record)
+
+                if digest != previous_hashes.get(username):
+                    # 1. Write to Language Stats Table (Multi-Row)
+                    if lang_records:
+                        lang_sink.write(lang_records)
+
+                    # 2. Write to Solved Stats Table (Single-Row)
+                    if solved_record:
+                        solved_sink.write([solved_record])
+                    changed_count += 1
+
+                done_batch[username] = digest
+                processed_count += 1
+                METRICS.user_done()
+            except FetchError as e:
+                record_failure(username, str(e))
+            except (KeyError, TypeError, AttributeError) as e:
+                # Malformed payload: the user is marked failed with the exact cause; anything else is a bug and stops the run
+                record_failure(username, f"unexpected payload: {e!r}")
+
+            if len(done_batch) + len(failed_batch) >= CHECKPOINT_EVERY:
+                checkpoint()
+
+        # Keep CONCURRENCY users (or batches) running and as many queued; the shared token bucket paces the
+        # requests instead of a fixed sleep. Results are written in input order, so the queued ones keep
+        # the workers busy while the oldest user waits out a Retry-After.
+        group_size = max(BATCH_SIZE, 1)
+        max_in_flight = CONCURRENCY * 2 * group_size
+        in_flight = deque()
+        METRICS.start(len(usernames_to_process))
+        metrics_server = MetricsServer(METRICS, METRICS_PORT) if METRICS_PORT else None
+        if metrics_server:
+            print(f"Metrics: http://127.0.0.1:{METRICS_PORT}/metrics")
+        try:
+            with ProgressReporter(
+                METRICS, API_CLIENT, METRICS_LOG, PROGRESS_REFRESH_SEC, METRICS_LOG_EVERY_SEC
+            ) as progress, ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+                for start in range(0, len(usernames_to_process), group_size):
+                    group = usernames_to_process[start:start + group_size]
+                    in_flight.extend(submit_users(executor, group))
+                    while len(in_flight) >= max_in_flight:
+                        write_next_user()
+
+                while in_flight:
+                    write_next_user()
+        finally:
+            if metrics_server:
+                metrics_server.shutdown()
+                metrics_server.server_close()
+            # Users written so far are kept even if the run is interrupted
+            checkpoint()
+            lang_sink.close()
+            solved_sink.close()
+
+    except OutputMismatchError as e:
+        print(f"Error: {e}")
+        return
+    except Exception:
+        print("Script finished with unexpected reasons:")
+        traceback.print_exc()
+    finally:
+        API_CLIENT.close()
+        store.close()
 
     print(f"\nProcessing finished. Successfully generated two tables with data for {processed_count} users.")
-    print(f"- Language Stats Table: '{LANGUAGE_STATS_OUTPUT}'")
-    print(f"- Solved Stats Table: '{SOLVED_STATS_OUTPUT}'")
+    if refresh:
+        print(f"- Changed users: {changed_count}, unchanged: {processed_count - changed_count}")
+    if len(BASE_URLS) > 1:
+        for endpoint in API_CLIENT.status():
+            print(f"- {endpoint['base_url']}: {endpoint['served']} requests, {endpoint['failovers']} failed over, "
+                  f"{'healthy' if endpoint['healthy'] else 'down'}, rate {endpoint['rate']}/s")
+    print(f"- Language Stats Table: '{lang_path}'")
+    print(f"- Solved Stats Table: '{solved_path}'")
+    if failed_count:
+        print(f"- Failed users ({failed_count}) are marked in '{PROGRESS_DB}' and will be retried on the next run")
+        print(f"- Their causes are logged in '{METRICS_LOG}'")
 
 
 if __name__ == "__main__":
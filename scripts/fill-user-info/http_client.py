@@ -0,0 +1,138 @@
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import ERROR, FAILURE, RETRY, SUCCESS, THROTTLED, endpoint_label
+
+RETRIABLE_4XX = {408, 429}  # other 4xx are not retried
+
+
+class FetchError(Exception):
+    """Raised when a URL could not be fetched after all retries."""
+
+    def __init__(self, url, reason):
+        super().__init__(f"{url}: {reason}")
+        self.url = url
+        self.reason = reason
+
+
+def parse_retry_after(value):
+    """Returns the Retry-After header value in seconds (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ApiClient:
+    """
+    Keep-alive HTTP client for the local api server.
+    One pooled session is shared by all worker threads; every attempt takes a token from `limiter`.
+    A 429 makes the worker wait out Retry-After and tells the limiter, which slows down on repeated 429s;
+    connection errors, timeouts, 408 and 5xx are retried with jittered exponential backoff,
+    other 4xx fail at once.
+    With `metrics` (a CrawlMetrics) every attempt is counted and timed per endpoint instead of
+    printing a line per retry.
+    """
+
+    def __init__(self, limiter, pool_size=10, max_retries=6, initial_backoff=0.5, max_backoff=30.0, timeout=10,
+                 metrics=None):
+        self.limiter = limiter
+        self.metrics = metrics
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff, so retrying workers do not hit the server in lockstep."""
+        return random.uniform(0, min(self.max_backoff, self.initial_backoff * (2 ** attempt)))
+
+    def get_json(self, url):
+        """Fetches JSON from a URL. Raises FetchError once retries are exhausted."""
+        return self.request_json("GET", url)
+
+    def post_json(self, url, payload):
+        """Posts a JSON payload and returns the JSON response. Raises FetchError once retries are exhausted."""
+        return self.request_json("POST", url, json=payload)
+
+    def log(self, message):
+        if self.metrics is None:
+            print(message)
+
+    def record(self, endpoint, started, outcome):
+        if self.metrics is not None:
+            self.metrics.observe_request(endpoint, None if started is None else time.monotonic() - started, outcome)
+
+    def request_json(self, method, url, **kwargs):
+        endpoint = endpoint_label(method, url)
+        reason = None
+        for attempt in range(self.max_retries):
+            self.limiter.acquire()
+            if attempt:
+                self.record(endpoint, None, RETRY)
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException as e:
+                reason = e
+                self.record(endpoint, started, ERROR)
+                self.log(f"Error fetching {url} for attempt {attempt + 1}: {e}")
+                time.sleep(self.backoff(attempt))
+                continue
+
+            if response.status_code == 429:
+                reason = "429 Too Many Requests"
+                self.record(endpoint, started, THROTTLED)
+                self.limiter.on_throttled()
+                # Only this worker waits out Retry-After; the limiter slows everyone down on repeated 429s
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = retry_after if retry_after is not None else self.backoff(attempt)
+                self.log(f"Rate limited on {url} for attempt {attempt + 1}, retrying in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                reason = e
+                self.record(endpoint, started, ERROR)
+                if response.status_code < 500 and response.status_code not in RETRIABLE_4XX:
+                    # Any other 4xx will be answered the same way on every attempt
+                    break
+                self.log(f"Error fetching {url} for attempt {attempt + 1}: {e}")
+                time.sleep(self.backoff(attempt))
+                continue
+
+            try:
+                data = response.json()
+            except ValueError as e:
+                reason = e
+                self.record(endpoint, started, ERROR)
+                self.log(f"Error fetching {url} for attempt {attempt + 1}: {e}")
+                time.sleep(self.backoff(attempt))
+                continue
+
+            self.record(endpoint, started, SUCCESS)
+            self.limiter.on_success()
+            return data
+
+        self.record(endpoint, None, FAILURE)
+        raise FetchError(url, reason)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,292 @@
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Upper bounds (seconds) of the request latency histogram buckets, Prometheus-style
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+# Outcomes of one request attempt, plus "failure" once all retries of a request are exhausted
+SUCCESS = "success"
+RETRY = "retry"
+THROTTLED = "throttled"
+ERROR = "error"
+FAILURE = "failure"
+OUTCOMES = (SUCCESS, RETRY, THROTTLED, ERROR, FAILURE)
+
+
+def endpoint_label(method, url):
+    """Groups URLs by route, so every username does not become its own endpoint: GET /:username/solved"""
+    path = urlparse(url).path
+    parts = path.strip("/").split("/")
+    if len(parts) == 2 and parts[1] in ("solved", "submission", "acSubmission", "calendar"):
+        path = f"/:username/{parts[1]}"
+    return f"{method} {path}"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; percentiles are interpolated inside the bucket, like histogram_quantile."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i]
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-2]
+
+
+class CrawlMetrics:
+    """
+    Thread-safe counters of a crawl: per-endpoint request latency histograms and
+    success/retry/429/error/failure counters (fed by ApiClient), done/failed users,
+    users/sec and ETA. Read as a progress line, a JSON snapshot or Prometheus text.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {}
+        self.requests = {}
+        self.users = {"done": 0, "failed": 0}
+        self.total_users = 0
+        self.started = time.monotonic()
+
+    def start(self, total_users):
+        with self.lock:
+            self.total_users = total_users
+            self.users = {"done": 0, "failed": 0}
+            self.started = time.monotonic()
+
+    def observe_request(self, endpoint, seconds, outcome):
+        """One attempt: its latency goes to the endpoint histogram, its outcome to the counters."""
+        with self.lock:
+            if endpoint not in self.latency:
+                self.latency[endpoint] = Histogram()
+                self.requests[endpoint] = dict.fromkeys(OUTCOMES, 0)
+            if seconds is not None:
+                self.latency[endpoint].observe(seconds)
+            self.requests[endpoint][outcome] += 1
+
+    def user_done(self):
+        with self.lock:
+            self.users["done"] += 1
+
+    def user_failed(self):
+        with self.lock:
+            self.users["failed"] += 1
+
+    def snapshot(self):
+        """Current values as a plain dict, the payload of the structured log lines."""
+        with self.lock:
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+            finished = self.users["done"] + self.users["failed"]
+            users_per_sec = finished / elapsed
+            remaining = max(self.total_users - finished, 0)
+            return {
+                "elapsed_sec": round(elapsed, 1),
+                "users_total": self.total_users,
+                "users_done": self.users["done"],
+                "users_failed": self.users["failed"],
+                "users_per_sec": round(users_per_sec, 2),
+                "eta_sec": round(remaining / users_per_sec) if users_per_sec else None,
+                "requests": {
+                    endpoint: {
+                        **counts,
+                        **{
+                            f"p{int(q * 100)}_ms": None if value is None else round(value * 1000, 1)
+                            for q in (0.5, 0.95, 0.99)
+                            for value in [self.latency[endpoint].percentile(q)]
+                        },
+                    }
+                    for endpoint, counts in self.requests.items()
+                },
+            }
+
+    def totals(self):
+        """Request counters summed over all endpoints."""
+        with self.lock:
+            totals = dict.fromkeys(OUTCOMES, 0)
+            for counts in self.requests.values():
+                for outcome, value in counts.items():
+                    totals[outcome] += value
+            return totals
+
+    def progress_line(self, rate=None):
+        data = self.snapshot()
+        totals = self.totals()
+        finished = data["users_done"] + data["users_failed"]
+        share = finished / data["users_total"] if data["users_total"] else 0.0
+        eta = data["eta_sec"]
+        eta_text = format_duration(eta) if eta is not None else "--:--:--"
+        slowest = max(
+            (counts["p95_ms"] for counts in data["requests"].values() if counts["p95_ms"] is not None),
+            default=None,
+        )
+        line = (
+            f"[{finished}/{data['users_total']}] {share:.1%} | {data['users_per_sec']:.1f} users/s | ETA {eta_text} | "
+            f"failed {data['users_failed']} | req ok {totals[SUCCESS]}, retry {totals[RETRY]}, "
+            f"429 {totals[THROTTLED]}, err {totals[ERROR]}"
+        )
+        if slowest is not None:
+            line += f" | p95 {slowest:.0f}ms"
+        if rate is not None:
+            line += f" | rate {rate:.1f}/s"
+        return line
+
+    def prometheus_text(self, prefix="leetcode_crawl"):
+        """Prometheus text exposition format (version 0.0.4)."""
+        data = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_request_duration_seconds Latency of one request attempt",
+            f"# TYPE {prefix}_request_duration_seconds histogram",
+        ]
+        with self.lock:
+            for endpoint, histogram in self.latency.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{prefix}_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_request_duration_seconds_sum{{endpoint="{endpoint}"}} {histogram.sum}')
+                lines.append(f'{prefix}_request_duration_seconds_count{{endpoint="{endpoint}"}} {histogram.count}')
+        lines += [f"# HELP {prefix}_requests_total Request attempts by outcome", f"# TYPE {prefix}_requests_total counter"]
+        for endpoint, counts in data["requests"].items():
+            for outcome in OUTCOMES:
+                lines.append(f'{prefix}_requests_total{{endpoint="{endpoint}",outcome="{outcome}"}} {counts[outcome]}')
+        lines += [
+            f"# TYPE {prefix}_users_total counter",
+            f'{prefix}_users_total{{status="done"}} {data["users_done"]}',
+            f'{prefix}_users_total{{status="failed"}} {data["users_failed"]}',
+            f"# TYPE {prefix}_users_to_process gauge",
+            f"{prefix}_users_to_process {data['users_total']}",
+            f"# TYPE {prefix}_users_per_second gauge",
+            f"{prefix}_users_per_second {data['users_per_sec']}",
+        ]
+        if data["eta_sec"] is not None:
+            lines += [f"# TYPE {prefix}_eta_seconds gauge", f"{prefix}_eta_seconds {data['eta_sec']}"]
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """GET /metrics in Prometheus text format, served from a daemon thread."""
+
+    daemon_threads = True
+
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        super().__init__((host, port), MetricsHandler)
+        self.metrics = metrics
+        threading.Thread(target=self.serve_forever, name="metrics", daemon=True).start()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def format_duration(seconds):
+    """H:MM:SS with hours past 24 (e.g. 27:03:00), for ETAs of long crawls."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+class ProgressReporter:
+    """
+    Background thread that replaces per-user prints: redraws one progress line every
+    `refresh_every` seconds on a terminal (or prints it every `log_every` seconds when
+    stdout is redirected) and appends a JSON snapshot to `log_path` every `log_every` seconds.
+    """
+
+    def __init__(self, metrics, rate_source=None, log_path=None, refresh_every=1.0, log_every=30.0, stream=None):
+        self.metrics = metrics
+        self.rate_source = rate_source  # anything with a `rate` (req/sec) attribute: a limiter or an EndpointPool
+        self.log_path = log_path
+        self.refresh_every = refresh_every
+        self.log_every = log_every
+        self.stream = stream or sys.stdout
+        self.interactive = self.stream.isatty()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="progress", daemon=True)
+        self.log_file = None
+        self.log_lock = threading.Lock()  # the reporter thread and the workers' event() share the file
+
+    def __enter__(self):
+        if self.log_path:
+            self.log_file = open(self.log_path, "a", encoding="utf-8")
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+        self.report(final=True)
+        with self.log_lock:
+            if self.log_file:
+                self.log_file.close()
+                self.log_file = None
+
+    def event(self, name, **fields):
+        """Structured log line for a single event, e.g. a failed user with its cause."""
+        self.write_log({"event": name, **fields})
+
+    def write_log(self, record):
+        if not self.log_path:
+            return
+        record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), **record}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.log_lock:
+            if self.log_file:
+                self.log_file.write(line)
+                self.log_file.flush()
+
+    def report(self, final=False, log=True):
+        line = self.metrics.progress_line(self.rate_source.rate if self.rate_source else None)
+        if self.interactive:
+            self.stream.write("\r\033[K" + line + ("\n" if final else ""))
+            self.stream.flush()
+        elif log or final:
+            print(line, file=self.stream, flush=True)
+        if log or final:
+            self.write_log({"event": "final" if final else "progress", **self.metrics.snapshot()})
+
+    def run(self):
+        last_log = time.monotonic()
+        while not self.stopped.wait(self.refresh_every):
+            log = time.monotonic() - last_log >= self.log_every
+            if log:
+                last_log = time.monotonic()
+            self.report(log=log)
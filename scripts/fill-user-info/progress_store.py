@@ -0,0 +1,143 @@
+import sqlite3
+import time
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username   TEXT PRIMARY KEY,
+    position   INTEGER NOT NULL,
+    status     TEXT NOT NULL DEFAULT 'pending',
+    error      TEXT,
+    updated_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS outputs (
+    path      TEXT PRIMARY KEY,
+    committed INTEGER NOT NULL
+);
+"""
+
+# Columns added after the first version of the store, created on open when missing
+USER_COLUMNS = {
+    "fetched_at": "REAL",
+    "content_hash": "TEXT",
+    "refresh_interval": "REAL",
+}
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS users_status ON users (status, position);
+"""
+
+
+class ProgressStore:
+    """
+    Durable crawl progress kept in SQLite.
+    Every username is pending, done or failed; every output has a committed position (bytes for CSV, rows for Parquet).
+    Statuses and sizes are updated in one transaction, so after a crash the outputs can be
+    truncated back to the last checkpoint and no user is written twice.
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(users)")}
+        for column, column_type in USER_COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE users ADD COLUMN {column} {column_type}")
+        self.conn.executescript(INDEXES)
+
+    def add_users(self, users):
+        """
+        Registers (username, refresh_interval) pairs as pending; users already known
+        keep their status and only get their input position and refresh interval updated.
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO users (username, position, status, refresh_interval) VALUES (?, ?, 'pending', ?) "
+                "ON CONFLICT (username) DO UPDATE SET "
+                "position = excluded.position, refresh_interval = excluded.refresh_interval",
+                ((username, position, interval) for position, (username, interval) in enumerate(users)),
+            )
+
+    def mark_done_without_checkpoint(self, usernames):
+        """Marks users finished by a run that predates the store (see seed_from_output)."""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE users SET status = 'done', error = NULL, updated_at = ? WHERE username = ?",
+                ((time.time(), username) for username in usernames),
+            )
+
+    def remaining(self):
+        """Pending and failed usernames in input order."""
+        rows = self.conn.execute(
+            "SELECT username FROM users WHERE status != 'done' ORDER BY position"
+        )
+        return [username for (username,) in rows]
+
+    def stale(self, now, limit):
+        """
+        Done usernames whose last fetch is older than their refresh interval, most overdue first
+        (time since the last fetch relative to the interval). Never-fetched users come first.
+        """
+        rows = self.conn.execute(
+            "SELECT username FROM users "
+            "WHERE status = 'done' AND COALESCE(fetched_at, 0) + refresh_interval <= :now "
+            "ORDER BY (:now - COALESCE(fetched_at, 0)) / refresh_interval DESC LIMIT :limit",
+            {"now": now, "limit": limit},
+        )
+        return [username for (username,) in rows]
+
+    def content_hashes(self, usernames):
+        """
+        Returns {username: content hash of the last fetched data} for users fetched before,
+        with one join against a temp table of the usernames instead of a query per user.
+        """
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (username TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM wanted")
+            self.conn.executemany("INSERT OR IGNORE INTO wanted (username) VALUES (?)", ((u,) for u in usernames))
+        rows = self.conn.execute(
+            "SELECT u.username, u.content_hash FROM wanted JOIN users u USING (username) "
+            "WHERE u.content_hash IS NOT NULL"
+        ).fetchall()
+        with self.conn:
+            self.conn.execute("DELETE FROM wanted")
+        return dict(rows)
+
+    def counts(self):
+        """Returns {status: number of users}."""
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM users GROUP BY status"))
+
+    def committed_size(self, path):
+        """Committed position of an output at the last checkpoint (see the sinks), or None if it was never checkpointed."""
+        row = self.conn.execute("SELECT committed FROM outputs WHERE path = ?", (path,)).fetchone()
+        return row[0] if row else None
+
+    def checkpoint(self, done, failed, sizes):
+        """
+        Atomically records finished users with the hash of their data ({username: content_hash}),
+        failed users ({username: error}) and the current byte sizes of the output files ({path: size}).
+        """
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE users SET status = 'done', error = NULL, updated_at = ?, fetched_at = ?, content_hash = ? "
+                "WHERE username = ?",
+                ((now, now, content_hash, username) for username, content_hash in done.items()),
+            )
+            self.conn.executemany(
+                "UPDATE users SET status = 'failed', error = ?, updated_at = ? WHERE username = ?",
+                ((error, now, username) for username, error in failed.items()),
+            )
+            self.conn.executemany(
+                "INSERT INTO outputs (path, committed) VALUES (?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET committed = excluded.committed",
+                sizes.items(),
+            )
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import deque
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every worker of the crawl.
+    Tokens are refilled at `rate` per second up to `capacity`; each request takes one.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity is not None else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Blocks the calling thread until a token is available."""
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """
+    Token bucket whose rate follows AIMD. While requests succeed the rate grows by `increase` * max_rate
+    per second of traffic, so it recovers in the same time however low it fell. The rate is multiplied by
+    `decrease` only after `threshold` throttled responses within `window` seconds: an isolated 429 is just
+    retried, and the count starts over after every decrease.
+    """
+
+    def __init__(self, rate, min_rate, max_rate, increase=0.1, decrease=0.5, threshold=3, window=1.0):
+        super().__init__(rate, capacity=max(1.0, rate))
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.increase = float(increase)
+        self.decrease = float(decrease)
+        self.threshold = int(threshold)
+        self.window = float(window)
+        self._throttled = deque()
+
+    def on_success(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            # ~rate successes per second, each adding increase * max_rate / rate
+            self.rate = min(self.max_rate, self.rate + self.increase * self.max_rate / self.rate)
+            self.capacity = max(1.0, self.rate)
+
+    def on_throttled(self):
+        with self._lock:
+            now = time.monotonic()
+            self._throttled.append(now)
+            while now - self._throttled[0] > self.window:
+                self._throttled.popleft()
+            if len(self._throttled) < self.threshold:
+                return
+            self._throttled.clear()
+            self._refill(now)
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.capacity = max(1.0, self.rate)
+            self._tokens = min(self._tokens, self.capacity)
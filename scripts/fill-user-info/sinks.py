@@ -0,0 +1,148 @@
+import csv
+import os
+
+
+class OutputMismatchError(Exception):
+    """Raised when an output holds less than its last checkpoint, e.g. it was deleted or replaced."""
+
+    def __init__(self, path, committed, found):
+        super().__init__(
+            f"'{path}' is shorter than its last checkpoint ({found} < {committed}). "
+            f"Restore it, or delete the progress database to start over."
+        )
+        self.path = path
+
+
+class CsvSink:
+    """
+    Appends records to a CSV file. Rows written after the last checkpoint (e.g. by a run
+    that crashed mid-batch) are truncated away on open, and the header only goes into an empty file.
+    The committed position is the file size in bytes.
+    """
+
+    def __init__(self, path, fieldnames, committed=None):
+        self.path = path
+        self.outfile = open(path, mode='a', newline='', encoding='utf-8')
+        size = self.outfile.tell()
+        if committed is not None and size < committed:
+            self.outfile.close()
+            raise OutputMismatchError(path, committed, size)
+        if committed is not None and size > committed:
+            self.outfile.truncate(committed)
+            self.outfile.seek(committed)
+        self.writer = csv.DictWriter(self.outfile, fieldnames=fieldnames, extrasaction='ignore')
+        if self.outfile.tell() == 0:
+            self.writer.writeheader()
+
+    def write(self, records):
+        self.writer.writerows(records)
+
+    def commit(self):
+        """Flushes the file to disk and returns its size in bytes."""
+        self.outfile.flush()
+        os.fsync(self.outfile.fileno())
+        return os.fstat(self.outfile.fileno()).st_size
+
+    def close(self):
+        self.outfile.close()
+
+
+class ParquetSink:
+    """
+    Buffers records in memory and writes every commit as one typed Parquet part file
+    (`part-00000.parquet`, ...) inside the `path` directory, which pandas/pyarrow/DuckDB
+    read as a single dataset. String columns listed in `categories` are dictionary-encoded.
+    The committed position is the number of rows in the parts taken in name order; parts past it
+    are deleted on open. close() merges the parts smaller than `target_rows` into parts of about
+    `target_rows` rows, so a run leaves a few large files instead of one per checkpoint.
+    """
+
+    def __init__(self, path, schema, committed=None, target_rows=1_000_000):
+        import pyarrow as pa  # optional dependency, only needed for OUTPUT_FORMAT = "parquet"
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.pq = pq
+        self.path = path
+        self.schema = schema
+        self.target_rows = target_rows
+        self.buffer = []
+        os.makedirs(path, exist_ok=True)
+
+        for name in os.listdir(path):
+            if name.endswith('.tmp'):
+                os.remove(os.path.join(path, name))
+        self.parts = {}  # part name -> rows
+        self.rows = 0
+        for name in sorted(name for name in os.listdir(path) if name.startswith('part-')):
+            if committed is not None and self.rows >= committed:
+                # Written after the last checkpoint, or by a compaction that did not finish
+                os.remove(os.path.join(path, name))
+                continue
+            self.parts[name] = pq.read_metadata(os.path.join(path, name)).num_rows
+            self.rows += self.parts[name]
+        if committed is not None and self.rows != committed:
+            raise OutputMismatchError(path, committed, self.rows)
+        self.next_part = max((int(name[len('part-'):].split('.')[0]) for name in self.parts), default=-1) + 1
+
+    def write(self, records):
+        self.buffer.extend(records)
+
+    def write_part(self, table):
+        name = f"part-{self.next_part:05d}.parquet"
+        tmp_path = os.path.join(self.path, f".{name}.tmp")
+        self.pq.write_table(table, tmp_path, compression='zstd')
+        os.replace(tmp_path, os.path.join(self.path, name))
+        self.parts[name] = table.num_rows
+        self.rows += table.num_rows
+        self.next_part += 1
+
+    def commit(self):
+        """Writes the buffered records as a new part file and returns the number of committed rows."""
+        if self.buffer:
+            self.write_part(self.pa.Table.from_pylist(self.buffer, schema=self.schema))
+            self.buffer = []
+        return self.rows
+
+    def compact(self):
+        """
+        Merges the parts smaller than target_rows. The merged parts are named after every existing one,
+        so if this stops before the originals are deleted, they lie past the committed rows and
+        are removed on the next open. The row count, and so the committed position, does not change.
+        """
+        small = [name for name, rows in self.parts.items() if rows < self.target_rows]
+        if len(small) < 2:
+            return
+        pending, pending_rows = [], 0
+        for name in small:
+            table = self.pq.read_table(os.path.join(self.path, name), schema=self.schema)
+            pending.append(table)
+            pending_rows += table.num_rows
+            if pending_rows >= self.target_rows:
+                self.write_part(self.pa.concat_tables(pending))
+                pending, pending_rows = [], 0
+        if pending:
+            self.write_part(self.pa.concat_tables(pending))
+        for name in small:
+            os.remove(os.path.join(self.path, name))
+            self.rows -= self.parts.pop(name)
+
+    def close(self):
+        """Drops uncommitted records and compacts the parts; call it after the last checkpoint."""
+        self.buffer = []
+        self.compact()
+
+
+def parquet_schema(fieldnames, categories=()):
+    """Arrow schema for fill-user-info records: username and categories as strings, the rest as int32."""
+    import pyarrow as pa
+
+    fields = []
+    for name in fieldnames:
+        if name in categories:
+            fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+        elif name == 'username':
+            fields.append(pa.field(name, pa.string()))
+        else:
+            fields.append(pa.field(name, pa.int32()))
+    return pa.schema(fields)
@@ -0,0 +1,56 @@
+def get_count_by_difficulty(data_array, difficulty_name):
+    """Safely finds the 'count' value for a specific difficulty in the API arrays."""
+    if not data_array:
+        return 0
+    for item in data_array:
+        if item.get("difficulty") == difficulty_name:
+            # We want the 'count' of problems (not 'submissions')
+            return item.get("count", 0)
+    return 0
+
+def extract_solved_stats(username, solved_data):
+    """
+    Creates a single row record for the solved_stats table: 
+    username, easy, medium, hard, ac_easy, ac_medium, ac_hard
+    """
+    default_record = {
+        "username": username, "easy": 0, "medium": 0, "hard": 0,
+        "ac_easy": 0, "ac_medium": 0, "ac_hard": 0
+    }
+    if not solved_data:
+        return default_record
+
+    total_submissions = solved_data.get("totalSubmissionNum", [])
+    accepted_submissions = solved_data.get("acSubmissionNum", [])
+
+    return {
+        "username": username,
+        # Total Solved Problems (All, Easy, Medium, Hard)
+        "easy": get_count_by_difficulty(total_submissions, "Easy"),
+        "medium": get_count_by_difficulty(total_submissions, "Medium"),
+        "hard": get_count_by_difficulty(total_submissions, "Hard"),
+        # Accepted Problems (Easy, Medium, Hard)
+        "ac_easy": get_count_by_difficulty(accepted_submissions, "Easy"),
+        "ac_medium": get_count_by_difficulty(accepted_submissions, "Medium"),
+        "ac_hard": get_count_by_difficulty(accepted_submissions, "Hard")
+    }
+
+def extract_language_stats(username, lang_data):
+    """
+    Creates multiple row records for the language_stats table:
+    username, languageName, problemsSolved
+    """
+    records = []
+    if not lang_data:
+        return records
+
+    lang_counts = lang_data.get("matchedUser", {}).get("languageProblemCount", [])
+    
+    for item in lang_counts:
+        records.append({
+            "username": username,
+            "languageName": item.get("languageName", "Unknown"),
+            "problemsSolved": item.get("problemsSolved", 0)
+        })
+    
+    return records
@@ -0,0 +1,92 @@
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Общий HTTP-клиент, rate limiter и пул экземпляров api из fill-user-info
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../fill-user-info')))
+from endpoint_pool import EndpointPool
+from http_client import FetchError
+from ranking_pages import OUTPUT_FILE, pending_pages, read_page_checkpoints, save_page_checkpoint, save_to_csv
+
+# --- Configuration ---
+BASE_URLS = ["http://localhost:3000"]  # экземпляры /api, страницы берутся из GET /globalRanking?page=N и распределяются между ними
+START_PAGE = 1
+END_PAGE = 100  # включительно
+CONCURRENCY = 8  # страниц одновременно
+RATE_LIMIT_PER_SEC = 10
+MIN_RATE_PER_SEC = 1
+MAX_RATE_PER_SEC = 30
+MAX_RETRIES = 6
+FAILOVER_RETRIES = 2  # при нескольких BASE_URLS: попыток на одном экземпляре до переключения на следующий
+
+
+def to_record(user, page):
+    """
+    Строка users.csv из ответа /globalRanking. GraphQL не отдаёт число контестов,
+    поэтому contests_attended остаётся пустым (fill-user-info считает его нулём).
+    """
+    return {
+        'global_rank': str(user['globalRank']),
+        'username': user['username'],
+        'display_name': user['displayName'],
+        'score': str(round(user['rating'])),
+        'country': user['country'] or "Not specified",
+        'contests_attended': "",
+        'page': page,
+    }
+
+
+def fetch_page(client, page):
+    """Загружает страницу рейтинга и атомарно сохраняет её чекпоинт. Возвращает число пользователей"""
+    data = client.get_json(f"/globalRanking?page={page}", key=page)
+    records = [to_record(user, page) for user in data['users']]
+    save_page_checkpoint(page, records)
+    return len(records)
+
+
+def fetch_pages(start_page=START_PAGE, end_page=END_PAGE):
+    """
+    Загружает страницы start_page..end_page параллельно; уже сохранённые страницы пропускаются.
+    Возвращает список страниц, которые не удалось загрузить.
+    """
+    pages = pending_pages(start_page, end_page)
+    print(f"Страниц к загрузке: {len(pages)} из {end_page - start_page + 1}")
+
+    client = EndpointPool(
+        BASE_URLS, RATE_LIMIT_PER_SEC, MIN_RATE_PER_SEC, MAX_RATE_PER_SEC, pool_size=CONCURRENCY,
+        max_retries=MAX_RETRIES, failover_retries=FAILOVER_RETRIES,
+    )
+    failed = []
+    try:
+        with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+            futures = {executor.submit(fetch_page, client, page): page for page in pages}
+            for done, future in enumerate(as_completed(futures), start=1):
+                page = futures[future]
+                try:
+                    count = future.result()
+                    print(f"[{done}/{len(pages)}] Страница {page}: {count} пользователей")
+                except (FetchError, KeyError, TypeError) as e:
+                    failed.append(page)
+                    print(f"[{done}/{len(pages)}] Страница {page} не загружена: {e}")
+    finally:
+        client.close()
+    return sorted(failed)
+
+
+def save_users(start_page=START_PAGE, end_page=END_PAGE, filename=OUTPUT_FILE):
+    """Собирает страницы в users.csv так же, как leaderboard-parser.py: без дубликатов username, по возрастанию ранга"""
+    return save_to_csv(read_page_checkpoints(start_page, end_page), filename=filename)
+
+
+def main():
+    started = time.time()
+    failed = fetch_pages()
+    if failed:
+        print(f"Не загружены страницы: {failed}. Перезапустите скрипт, чтобы догрузить их")
+    save_users()
+    print(f"Загрузка завершена за {time.time() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,38 @@
-from turtledemo.penrose import start
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
 import time
-import pandas as pd
+import lxml.html
 import re
 
+from ranking_pages import OUTPUT_FILE, pending_pages, read_page_checkpoints, save_page_checkpoint, save_to_csv
 
-def setup_driver():
+# --- Configuration ---
+# "parallel" — страницы открываются напрямую по URL в пуле headless-браузеров,
+# "sequential" — старый режим: один видимый браузер листает страницы кнопкой next
+MODE = "parallel"
+PAGE_URL = "https://leetcode.com/contest/globalranking/{page}"  # для проверки на фикстуре: http://localhost:8000/globalranking.html?page={page}
+START_PAGE = 1
+END_PAGE = 10  # включительно
+WORKERS = 4  # число браузеров
+HEADLESS = True
+PAGE_TIMEOUT_SEC = 20  # сколько ждать появления строк на странице
+PAGE_RETRIES = 3
+
+ROW_SELECTOR = "[class*='bg-fill-quaternary']"
+ROW_XPATH = "//*[contains(@class, 'bg-fill-quaternary')]"
+
+
+def setup_driver(headless=False):
     """Настройка Chrome драйвера"""
     chrome_options = Options()
-    # chrome_options.add_argument("--headless")
+    if headless:
+        chrome_options.add_argument("--headless=new")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-blink-features=AutomationControlled")
@@ -26,59 +45,54 @@ def setup_driver():
     return driver
 
 
+# XPath-аналоги прежних селекторов WebDriver, применяются к page_source через lxml за один проход
+RANK_XPATH = ".//*[contains(@class, 'w-[65px]')]//div[not(following-sibling::*)]"
+USER_LINK_XPATH = ".//a[contains(@href, '/u/')]"
+SCORE_XPATH = ".//div[contains(@class, 'min-w-[80px]')]//div[contains(@class, 'font-medium')]"
+SCORE_FALLBACK_XPATH = ".//div[contains(@class, 'font-medium')]"
+COUNTRY_XPATH = ".//span[@title]"
+CONTESTS_XPATH = ".//*[contains(concat(' ', normalize-space(@class), ' '), ' text-xs ')]"
+
+
+def element_text(element):
+    """Текст элемента с нормализованными пробелами, как .text у WebElement"""
+    return " ".join(element.text_content().split())
+
+
 def parse_user_row(row):
-    """Парсинг данных одного пользователя из строки"""
+    """Парсинг данных одного пользователя из строки (элемент lxml)"""
     try:
-        # Парсим rank
-        rank_elem = row.find_element(By.CSS_SELECTOR, "[class*='w-\\[65px\\]'] div:last-child")
-        rank = rank_elem.text.strip()
-
-        # Парсим username из ссылки
-        try:
-            link_elem = row.find_element(By.CSS_SELECTOR, "a[href*='/u/']")
-            href = link_elem.get_attribute('href')
+        rank_elems = row.xpath(RANK_XPATH)
+        if not rank_elems:
+            return None
+        rank = element_text(rank_elems[0])
+
+        # Username из ссылки и display name из её текста
+        link_elems = row.xpath(USER_LINK_XPATH)
+        if link_elems:
+            href = link_elems[0].get('href', '')
             username = href.split('/u/')[-1].split('/')[0] if '/u/' in href else "N/A"
-        except NoSuchElementException:
+            display_name = element_text(link_elems[0])
+        else:
             username = "N/A"
-
-        # Парсим display name
-        try:
-            name_elem = row.find_element(By.CSS_SELECTOR, "a[href*='/u/']")
-            display_name = name_elem.text.strip()
-        except NoSuchElementException:
             display_name = "N/A"
 
-        # Парсим score
-        try:
-            score_elem = row.find_element(By.XPATH,
-                                          ".//div[contains(@class, 'min-w-[80px]')]//div[contains(@class, 'font-medium')]")
-            score = score_elem.text.strip()
-        except NoSuchElementException:
-            try:
-                score_elems = row.find_elements(By.XPATH, ".//div[contains(@class, 'font-medium')]")
-                if len(score_elems) > 1:
-                    score = score_elems[1].text.strip()
-                else:
-                    score = "N/A"
-            except:
-                score = "N/A"
-
-        # Парсим country
-        try:
-            country_elem = row.find_element(By.CSS_SELECTOR, "span[title]")
-            country = country_elem.get_attribute('title')
-        except NoSuchElementException:
-            country = "Not specified"
+        # Score
+        score_elems = row.xpath(SCORE_XPATH)
+        if score_elems:
+            score = element_text(score_elems[0])
+        else:
+            score_elems = row.xpath(SCORE_FALLBACK_XPATH)
+            score = element_text(score_elems[1]) if len(score_elems) > 1 else "N/A"
 
-        # Парсим количество контестов
-        try:
-            contests_elem = row.find_element(By.CLASS_NAME, "text-xs")
-            contests_text = contests_elem.text.strip()
-            contests_match = re.search(r'(\d+)\s*contest', contests_text)
-            contests_attended = contests_match.group(1) if contests_match else "0"
-        except NoSuchElementException:
-            contests_attended = "0"
+        # Country
+        country_elems = row.xpath(COUNTRY_XPATH)
+        country = country_elems[0].get('title') if country_elems else "Not specified"
 
+        # Количество контестов
+        contests_elems = row.xpath(CONTESTS_XPATH)
+        contests_match = re.search(r'(\d+)\s*contest', element_text(contests_elems[0])) if contests_elems else None
+        contests_attended = contests_match.group(1) if contests_match else "0"
 
         return {
             'global_rank': rank,
@@ -94,6 +108,21 @@ def parse_user_row(row):
         return None
 
 
+def parse_page_source(html, page):
+    """
+    Парсит все строки рейтинга из HTML страницы. Вместо 5-7 вызовов WebDriver на строку
+    нужен один driver.page_source на страницу, остальное делает lxml в процессе.
+    """
+    tree = lxml.html.fromstring(html)
+    page_data = []
+    for row in tree.xpath(ROW_XPATH):
+        user_data = parse_user_row(row)
+        if user_data:
+            user_data['page'] = page
+            page_data.append(user_data)
+    return page_data
+
+
 def get_global_ranking(driver, pages_to_scrape=10):
     """Парсинг глобального рейтинга LeetCode с пагинацией"""
     try:
@@ -121,16 +150,11 @@ def get_global_ranking(driver, pages_to_scrape=10):
                 if not rows:
                     break
 
-                # Парсим каждую строку
-                successful_parses = 0
-                for i, row in enumerate(rows):
-                    user_data = parse_user_row(row)
-                    if user_data:
-                        user_data['page'] = current_page
-                        all_data.append(user_data)
-                        successful_parses += 1
+                # Парсим все строки страницы за один проход
+                page_data = parse_page_source(driver.page_source, current_page)
+                all_data.extend(page_data)
 
-                print(f"Успешно распарсено: {successful_parses}/{len(rows)}")
+                print(f"Успешно распарсено: {len(page_data)}/{len(rows)}")
             except Exception as e:
                 print(f"Ошибка при парсинге страницы {current_page}: {e}")
                 break
@@ -172,28 +196,109 @@ def get_global_ranking(driver, pages_to_scrape=10):
         return []
 
 
-def save_to_csv(data, filename='leetcode_global_ranking.csv'):
-    """Сохранение данных в CSV файл"""
-    if not data:
-        print("Нет данных для сохранения")
-        return None
-
-    df = pd.DataFrame(data)
-
-    # Убираем дубликаты по username
-    df = df.drop_duplicates(subset=['username'], keep='first')
+def wait_for_rows(driver, timeout=PAGE_TIMEOUT_SEC):
+    """Явное ожидание строк рейтинга вместо фиксированных sleep: возвращает строки, как только у первой появился ранг"""
+    def rows_ready(driver):
+        rows = driver.find_elements(By.CSS_SELECTOR, ROW_SELECTOR)
+        try:
+            return rows if rows and rows[0].text.strip() else False
+        except StaleElementReferenceException:
+            return False
+
+    return WebDriverWait(driver, timeout).until(rows_ready)
+
+
+class EmptyPageError(Exception):
+    """Браузер показал строки рейтинга, но из page_source не разобралась ни одна (вёрстка сменилась или DOM перерисовался)"""
+
+    def __init__(self, page, rows):
+        super().__init__(f"страница {page}: {rows} строк на странице, разобрано 0")
+        self.page = page
+        self.rows = rows
+
+
+def scrape_page(driver, page):
+    """Открывает страницу рейтинга по прямому URL и парсит все строки"""
+    driver.get(PAGE_URL.format(page=page))
+    rows = wait_for_rows(driver)
+    page_data = parse_page_source(driver.page_source, page)
+    if not page_data:
+        # Пустой чекпоинт пометил бы страницу готовой, и перезапуск её бы уже не догрузил
+        raise EmptyPageError(page, len(rows))
+    return page_data
+
+
+def scrape_pages_parallel(start_page=START_PAGE, end_page=END_PAGE, workers=WORKERS):
+    """
+    Парсит страницы start_page..end_page в пуле из workers headless-браузеров (по браузеру на поток).
+    Каждая страница сохраняется в ranking_pages.CHECKPOINT_DIR сразу после парсинга; страницы с готовым чекпоинтом
+    пропускаются, так что прерванный запуск продолжается с недостающих страниц.
+    Возвращает список страниц, которые не удалось получить за PAGE_RETRIES попыток.
+    """
+    pages = pending_pages(start_page, end_page)
+    print(f"Страниц к загрузке: {len(pages)} из {end_page - start_page + 1}")
+
+    local = threading.local()
+    drivers = []
+    drivers_lock = threading.Lock()
+
+    def get_driver():
+        if not hasattr(local, "driver"):
+            local.driver = setup_driver(headless=HEADLESS)
+            with drivers_lock:
+                drivers.append(local.driver)
+        return local.driver
+
+    def reset_driver():
+        """Закрывает браузер потока после ошибки WebDriver: следующая попытка получит новый"""
+        driver = getattr(local, "driver", None)
+        if driver is None:
+            return
+        del local.driver
+        with drivers_lock:
+            drivers.remove(driver)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
 
-    # Сортируем по рангу
-    df['global_rank_num'] = pd.to_numeric(df['global_rank'], errors='coerce')
-    df = df.sort_values('global_rank_num').drop('global_rank_num', axis=1)
+    def process_page(page):
+        for attempt in range(PAGE_RETRIES):
+            try:
+                page_data = scrape_page(get_driver(), page)
+                save_page_checkpoint(page, page_data)
+                return len(page_data)
+            except TimeoutException:
+                print(f"Таймаут на странице {page}, попытка {attempt + 1}")
+            except EmptyPageError as e:
+                print(f"Пустой разбор, попытка {attempt + 1}: {e}")
+            except WebDriverException as e:
+                # Упавший или зависший браузер не восстановится сам: без пересоздания все следующие страницы потока тоже упадут
+                print(f"Ошибка браузера на странице {page}, попытка {attempt + 1}: {e.msg}")
+                reset_driver()
+            except Exception as e:
+                print(f"Ошибка на странице {page}, попытка {attempt + 1}: {e}")
+        return None
 
-    df.to_csv(filename, index=False, encoding='utf-8')
-    print(f"Данные сохранены в {filename}")
-    print(f"Всего записей: {len(df)}")
-    return df
+    failed = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(process_page, page): page for page in pages}
+            for done, future in enumerate(as_completed(futures), start=1):
+                page = futures[future]
+                count = future.result()
+                if count is None:
+                    failed.append(page)
+                    print(f"[{done}/{len(pages)}] Страница {page} не загружена")
+                else:
+                    print(f"[{done}/{len(pages)}] Страница {page}: {count} пользователей")
+    finally:
+        for driver in drivers:
+            driver.quit()
+    return sorted(failed)
 
 
-def main():
+def main_sequential():
     driver = setup_driver()
     try:
         ranking_data = get_global_ranking(driver, pages_to_scrape=10)
@@ -210,5 +315,18 @@ def main():
         print("Парсинг завершен")
 
 
+def main():
+    if MODE == "sequential":
+        main_sequential()
+        return
+
+    started = time.time()
+    failed = scrape_pages_parallel()
+    if failed:
+        print(f"Не загружены страницы: {failed}. Перезапустите скрипт, чтобы догрузить их")
+    save_to_csv(read_page_checkpoints(START_PAGE, END_PAGE), filename=OUTPUT_FILE)
+    print(f"Парсинг завершен за {time.time() - started:.1f} с")
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,61 @@
+import os
+
+import pandas as pd
+
+# Постраничные чекпоинты рейтинга, общие для leaderboard-parser.py (браузер) и global_ranking_api.py (api):
+# оба пишут страницы в одном формате, поэтому режимы можно чередовать и догружать друг за другом
+CHECKPOINT_DIR = "results/leaderboard_pages"  # по CSV на страницу, уже сохранённые страницы при перезапуске пропускаются
+OUTPUT_FILE = "results/users.csv"
+
+PAGE_COLUMNS = ['global_rank', 'username', 'display_name', 'score', 'country', 'contests_attended', 'page']
+
+
+def page_checkpoint_path(page):
+    return os.path.join(CHECKPOINT_DIR, f"page-{page:06d}.csv")
+
+
+def pending_pages(start_page, end_page):
+    """Страницы диапазона, для которых ещё нет чекпоинта"""
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    return [page for page in range(start_page, end_page + 1) if not os.path.exists(page_checkpoint_path(page))]
+
+
+def save_page_checkpoint(page, page_data):
+    """Атомарно сохраняет строки одной страницы: файл появляется только целиком"""
+    path = page_checkpoint_path(page)
+    tmp_path = path + ".tmp"
+    pd.DataFrame(page_data, columns=PAGE_COLUMNS).to_csv(tmp_path, index=False, encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def read_page_checkpoints(start_page, end_page):
+    """Собирает сохранённые страницы диапазона в один список записей"""
+    frames = [
+        pd.read_csv(page_checkpoint_path(page), dtype=str, keep_default_na=False)
+        for page in range(start_page, end_page + 1)
+        if os.path.exists(page_checkpoint_path(page))
+    ]
+    if not frames:
+        return []
+    return pd.concat(frames, ignore_index=True).to_dict('records')
+
+
+def save_to_csv(data, filename='leetcode_global_ranking.csv'):
+    """Сохранение данных в CSV файл"""
+    if not data:
+        print("Нет данных для сохранения")
+        return None
+
+    df = pd.DataFrame(data)
+
+    # Убираем дубликаты по username
+    df = df.drop_duplicates(subset=['username'], keep='first')
+
+    # Сортируем по рангу
+    df['global_rank_num'] = pd.to_numeric(df['global_rank'], errors='coerce')
+    df = df.sort_values('global_rank_num').drop('global_rank_num', axis=1)
+
+    df.to_csv(filename, index=False, encoding='utf-8')
+    print(f"Данные сохранены в {filename}")
+    print(f"Всего записей: {len(df)}")
+    return df
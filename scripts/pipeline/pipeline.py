@@ -0,0 +1,278 @@
+import sys
+import os
+import queue
+import threading
+import time
+
+# Стадии собраны из существующих скриптов
+scripts_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for name in ('fill-user-info', 'leaderboard-parser', 'db-connector', 'data-extraction'):
+    sys.path.append(os.path.join(scripts_dir, name))
+
+from endpoint_pool import EndpointPool
+from http_client import FetchError
+from user_stats import extract_language_stats, extract_solved_stats
+from global_ranking_api import to_record
+
+# --- Configuration ---
+BASE_URLS = ["http://localhost:3000"]  # экземпляры /api: страницы и группы пользователей распределяются между ними консистентным хэшированием
+START_PAGE = 1
+END_PAGE = 100  # включительно
+STATS_WORKERS = 8  # потоков, загружающих статистику пользователей
+BATCH_SIZE = 25  # пользователей в одном POST /batch/userStats
+BATCH_WAIT_SEC = 0.5  # сколько ждать пополнения неполной группы из очереди
+QUEUE_SIZE = 1000  # размер каждой очереди между стадиями: при заполнении предыдущая стадия ждёт
+DB_BATCH_ROWS = 5000  # строк, после которых буфер записывается в БД...
+DB_FLUSH_SEC = 10.0  # ...или через сколько секунд, если строк меньше
+REPORT_EVERY_SEC = 300  # как часто перестраивать отчёты data_extraction во время загрузки (0 — только в конце)
+RATE_LIMIT_PER_SEC = 20.0  # стартовый темп каждого экземпляра api
+MIN_RATE_PER_SEC = 1.0
+MAX_RATE_PER_SEC = 50.0
+MAX_RETRIES = 6
+FAILOVER_RETRIES = 2  # при нескольких BASE_URLS: попыток на одном экземпляре до переключения на следующий
+HEALTH_CHECK_EVERY_SEC = 10.0
+
+# Порядок записи таблиц при сбросе буфера: пользователь попадает в users раньше своей статистики
+TABLE_ORDER = ["users", "solved_stats", "language_stats"]
+STOP = object()
+
+
+class PipelineAborted(Exception):
+    """Одна из стадий упала, остальные останавливаются вместо вечного ожидания очереди."""
+
+
+class Pipeline:
+    """
+    Рейтинг -> статистика пользователей -> upsert в БД в одном процессе.
+    Стадии — потоки, связанные очередями ограниченного размера: пользователи идут дальше по мере
+    появления, медленная стадия притормаживает быструю (backpressure), и память не зависит от числа
+    пользователей. Агрегаты в БД обновляются при каждой записи (см. db_connector.upsert_records),
+    отчёты перестраиваются каждые REPORT_EVERY_SEC секунд, не дожидаясь конца загрузки.
+    """
+
+    def __init__(self, start_page=START_PAGE, end_page=END_PAGE):
+        import db_connector
+        import data_extraction
+
+        self.db = db_connector
+        self.reports = data_extraction
+        self.reports.engine = db_connector.engine
+
+        self.start_page = start_page
+        self.end_page = end_page
+        self.client = EndpointPool(
+            BASE_URLS, RATE_LIMIT_PER_SEC, MIN_RATE_PER_SEC, MAX_RATE_PER_SEC, pool_size=STATS_WORKERS + 1,
+            max_retries=MAX_RETRIES, failover_retries=FAILOVER_RETRIES, health_every=HEALTH_CHECK_EVERY_SEC,
+        )
+        self.users_queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.db_queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.aborted = threading.Event()
+        self.errors = []
+        self.counts = {"pages": 0, "failed_pages": 0, "users": 0, "failed_users": 0, "rows": 0, "applied": 0}
+        self.counts_lock = threading.Lock()
+        self.changed_users = set()  # изменённые пользователи: снапшот user_index обновляется один раз в конце
+
+    def count(self, name, value=1):
+        with self.counts_lock:
+            self.counts[name] += value
+
+    def put(self, target, item):
+        """put с ожиданием свободного места, прерываемый, если другая стадия упала"""
+        while True:
+            if self.aborted.is_set():
+                raise PipelineAborted()
+            try:
+                target.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def run_stage(self, stage, *args):
+        try:
+            stage(*args)
+        except PipelineAborted:
+            pass
+        except Exception as e:
+            self.errors.append(e)
+            self.aborted.set()
+            print(f"Стадия {stage.__name__} упала: {e!r}")
+
+    # --- Stages ---
+
+    def ranking_stage(self):
+        """Страницы рейтинга по порядку: каждый пользователь уходит в БД (users) и на загрузку статистики"""
+        try:
+            for page in range(self.start_page, self.end_page + 1):
+                try:
+                    data = self.client.get_json(f"/globalRanking?page={page}", key=page)
+                except FetchError as e:
+                    self.count("failed_pages")
+                    print(f"Страница {page} не загружена: {e}")
+                    continue
+                records = [to_record(user, page) for user in data["users"]]
+                self.put(self.db_queue, ("users", records))
+                for record in records:
+                    self.put(self.users_queue, record["username"])
+                self.count("pages")
+        finally:
+            for _ in range(STATS_WORKERS):
+                self.put(self.users_queue, STOP)
+
+    def next_group(self):
+        """Собирает из очереди до BATCH_SIZE пользователей. Возвращает (группа, пришёл ли STOP)"""
+        while True:
+            if self.aborted.is_set():
+                raise PipelineAborted()
+            try:
+                item = self.users_queue.get(timeout=1)
+                break
+            except queue.Empty:
+                continue
+        if item is STOP:
+            return [], True
+        group = [item]
+        while len(group) < BATCH_SIZE:
+            try:
+                item = self.users_queue.get(timeout=BATCH_WAIT_SEC)
+            except queue.Empty:
+                break
+            if item is STOP:
+                return group, True
+            group.append(item)
+        return group, False
+
+    def stats_stage(self):
+        """Загружает статистику группами через POST /batch/userStats и передаёт строки в БД"""
+        stopped = False
+        while not stopped and not self.aborted.is_set():
+            group, stopped = self.next_group()
+            if not group:
+                continue
+            try:
+                data = self.client.post_json("/batch/userStats", {"usernames": group}, key=group[0])
+                users = data["users"]
+                if not isinstance(users, dict):
+                    raise TypeError(f"users: ожидался объект, получено {type(users).__name__}")
+            except (FetchError, KeyError, TypeError) as e:
+                # Ошибка сети и ответ без data["users"] — одинаково: группа не загружена, стадия работает дальше
+                self.count("failed_users", len(group))
+                print(f"Статистика {len(group)} пользователей не загружена: {e!r}")
+                continue
+
+            # Пользователь, которого нет в ответе (или null — неизвестный LeetCode), считается ошибкой,
+            # а не записывается нулевой строкой
+            solved_records, language_records, missing = [], [], []
+            for username in group:
+                user = users.get(username)
+                if user is None:
+                    missing.append(username)
+                    continue
+                solved_records.append(extract_solved_stats(username, user.get("solved")))
+                language_records.extend(extract_language_stats(username, user.get("languageStats")))
+            if missing:
+                self.count("failed_users", len(missing))
+                print(f"Нет в ответе /batch/userStats ({len(missing)}): {', '.join(missing[:5])}"
+                      f"{' …' if len(missing) > 5 else ''}")
+            if solved_records:
+                self.put(self.db_queue, ("solved_stats", solved_records))
+                self.put(self.db_queue, ("language_stats", language_records))
+            self.count("users", len(solved_records))
+
+    def db_stage(self):
+        """
+        Копит строки по таблицам и пишет их пачками через upsert_records (COPY + ON CONFLICT),
+        каждые DB_BATCH_ROWS строк или DB_FLUSH_SEC секунд; периодически перестраивает отчёты.
+        """
+        buffers = {table_name: [] for table_name in TABLE_ORDER}
+        buffered = 0
+        last_flush = last_report = time.monotonic()
+
+        def flush():
+            nonlocal buffered, last_flush
+            for table_name in TABLE_ORDER:
+                records = buffers[table_name]
+                if records:
+                    self.count("applied", self.db.upsert_records(records, table_name, self.changed_users))
+                    self.count("rows", len(records))
+                    buffers[table_name] = []
+            buffered = 0
+            last_flush = time.monotonic()
+
+        while True:
+            if self.aborted.is_set():
+                # Другая стадия упала: STOP не придёт, буфер не записывается
+                raise PipelineAborted()
+            try:
+                item = self.db_queue.get(timeout=min(DB_FLUSH_SEC, 1.0))
+            except queue.Empty:
+                item = None
+            if item is STOP:
+                break
+            if item is not None:
+                table_name, records = item
+                buffers[table_name].extend(records)
+                buffered += len(records)
+
+            if buffered >= DB_BATCH_ROWS or (buffered and time.monotonic() - last_flush >= DB_FLUSH_SEC):
+                flush()
+                self.print_progress()
+            if REPORT_EVERY_SEC and time.monotonic() - last_report >= REPORT_EVERY_SEC:
+                self.reports.run_reports()
+                last_report = time.monotonic()
+        flush()
+
+    def print_progress(self):
+        c = self.counts
+        print(
+            f"Страниц {c['pages']}, пользователей {c['users']} (ошибок {c['failed_users']}), "
+            f"строк в БД {c['rows']} (изменено {c['applied']}), "
+            f"очереди: users {self.users_queue.qsize()}, db {self.db_queue.qsize()}, "
+            f"rate {self.client.rate:.1f}/s"
+        )
+
+    def run(self):
+        started = time.time()
+        self.db.ensure_schema()
+
+        ranking = threading.Thread(target=self.run_stage, args=(self.ranking_stage,), name="ranking")
+        stats = [
+            threading.Thread(target=self.run_stage, args=(self.stats_stage,), name=f"stats-{i}")
+            for i in range(STATS_WORKERS)
+        ]
+        db = threading.Thread(target=self.run_stage, args=(self.db_stage,), name="db")
+        for thread in [ranking, *stats, db]:
+            thread.start()
+
+        try:
+            ranking.join()
+            for thread in stats:
+                thread.join()
+            try:
+                self.put(self.db_queue, STOP)
+            except PipelineAborted:
+                # db_stage сам выйдет, увидев aborted
+                pass
+            db.join()
+        except KeyboardInterrupt:
+            print("Остановка...")
+            self.aborted.set()
+            raise
+        finally:
+            self.client.close()
+
+        # Записанные пачки уже закоммичены, поэтому снапшот обновляется и после падения стадии
+        if self.changed_users:
+            self.db.update_user_index(sorted(self.changed_users))
+        if self.errors:
+            raise self.errors[0]
+        self.reports.run_reports()
+        self.print_progress()
+        print(f"Pipeline завершён за {time.time() - started:.1f} с")
+
+
+def main():
+    Pipeline().run()
+
+
+if __name__ == "__main__":
+    main()
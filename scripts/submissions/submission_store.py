@@ -0,0 +1,290 @@
+import glob
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username       TEXT PRIMARY KEY,
+    high_water     INTEGER,
+    calendar_day   TEXT,
+    calendar_count INTEGER,
+    checked_at     REAL,
+    error          TEXT
+);
+
+CREATE TABLE IF NOT EXISTS parts (
+    path         TEXT PRIMARY KEY,
+    committed_at REAL NOT NULL
+);
+"""
+
+# Наборы хранилища: колонки part-файлов, ключ, по которому читатели схлопывают повторы,
+# и партиция: каталог day=YYYY-MM-DD или month=YYYY-MM
+DATASETS = {
+    "submissions": {
+        "columns": ["username", "timestamp", "title_slug", "title", "status", "lang", "is_accepted"],
+        "key": ["username", "timestamp", "title_slug", "lang"],
+        "partition": "day",
+    },
+    # Число посылок пользователя за день по submissionCalendar; день может дописываться повторно
+    # с большим числом, читается последняя версия. Строки маленькие, а первая загрузка приносит
+    # год истории, поэтому партиции помесячные: чекпоинт пишет 12 файлов, а не 365
+    "submission_calendar": {
+        "columns": ["username", "day", "submissions", "fetched_at"],
+        "key": ["username", "day"],
+        "partition": "month",
+    },
+}
+
+NOT_SPECIFIED = "Not specified"
+COMPACT_MIN_PARTS = 8  # день, в котором набралось больше частей, сливается в одну
+
+
+def day_of(timestamp: int) -> str:
+    """Дата UTC (YYYY-MM-DD) unix-времени, по ней выбирается партиция"""
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def partition_of(dataset: str, day: str) -> str:
+    """Значение партиции набора для дня YYYY-MM-DD"""
+    return day if DATASETS[dataset]["partition"] == "day" else day[:7]
+
+
+def tmp_part_path(path: str) -> str:
+    """Незакоммиченная часть: с точкой в начале имени её пропускают pyarrow и DuckDB"""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.tmp")
+
+
+class SubmissionStore:
+    """
+    Append-only хранилище посылок и календарей с разбиением по дням:
+    <root>/<dataset>/<day=YYYY-MM-DD|month=YYYY-MM>/part-<run>-<n>.parquet (hive-партиции,
+    читаются pandas/pyarrow/DuckDB).
+    Состояние в SQLite: для каждого пользователя high-water mark (время самой новой сохранённой посылки),
+    последний день календаря с посылками и их число в этот день. Part-файлы пишутся как .<имя>.tmp,
+    затем в одной транзакции с состояниями пользователей записываются их имена, и только потом они переименовываются:
+    после падения восстанавливаются закоммиченные части, а незакоммиченные удаляются,
+    поэтому посылка не попадает в хранилище дважды и не теряется.
+    """
+
+    def __init__(self, root: str, state_path: str):
+        self.root = root
+        self.conn = sqlite3.connect(state_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.run_id = time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + f"-{os.getpid()}"
+        self.part_number = 0
+        self.recover()
+
+    def recover(self):
+        """
+        Доводит закоммиченные части до конца после падения, незакоммиченные удаляет,
+        как и части, уже заменённые слиянием (см. compact), но ещё не удалённые
+        """
+        committed = {path for (path,) in self.conn.execute("SELECT path FROM parts")}
+        for dataset in DATASETS:
+            pattern = os.path.join(self.root, dataset, f"{DATASETS[dataset]['partition']}=*")
+            for tmp_path in glob.glob(os.path.join(pattern, ".*.parquet.tmp")):
+                directory, name = os.path.split(tmp_path)
+                path = os.path.join(directory, name[1:-len(".tmp")])
+                if os.path.relpath(path, self.root) in committed:
+                    os.replace(tmp_path, path)
+                else:
+                    os.remove(tmp_path)
+            for path in glob.glob(os.path.join(pattern, "*.parquet")):
+                if os.path.relpath(path, self.root) not in committed:
+                    os.remove(path)
+
+    def add_users(self, usernames):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO users (username) VALUES (?) ON CONFLICT (username) DO NOTHING",
+                ((username,) for username in usernames),
+            )
+
+    def due(self, limit: int = None):
+        """Пользователи, которых дольше всех не проверяли (никогда не проверенные — первыми)"""
+        query = "SELECT username FROM users ORDER BY checked_at IS NOT NULL, checked_at"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [username for (username,) in self.conn.execute(query)]
+
+    def states(self, usernames):
+        """
+        {username: (high_water, calendar_day, calendar_count)} для уже проверенных пользователей,
+        одним join с временной таблицей имён, а не запросом на каждого пользователя
+        """
+        with self.conn:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (username TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM wanted")
+            self.conn.executemany("INSERT OR IGNORE INTO wanted (username) VALUES (?)", ((u,) for u in usernames))
+        rows = self.conn.execute(
+            "SELECT u.username, u.high_water, u.calendar_day, u.calendar_count FROM wanted JOIN users u USING (username) "
+            "WHERE u.checked_at IS NOT NULL"
+        ).fetchall()
+        with self.conn:
+            self.conn.execute("DELETE FROM wanted")
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def write_parts(self, dataset: str, frame: pd.DataFrame, days: pd.Series):
+        """Пишет frame как .tmp part-файлы по партициям дней days, возвращает список относительных путей"""
+        parts = []
+        partition = DATASETS[dataset]["partition"]
+        values = days.map(lambda day: partition_of(dataset, day)).to_numpy()
+        for value, part in frame.groupby(values, sort=True):
+            self.part_number += 1
+            relative = os.path.join(dataset, f"{partition}={value}", f"part-{self.run_id}-{self.part_number:05d}.parquet")
+            path = os.path.join(self.root, relative)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            part[DATASETS[dataset]["columns"]].to_parquet(tmp_part_path(path), index=False)
+            parts.append(relative)
+        return parts
+
+    def checkpoint(self, states: dict, failed: dict, submissions: pd.DataFrame, calendar: pd.DataFrame):
+        """
+        Атомарно сохраняет новые посылки и дни календаря вместе с новыми состояниями пользователей
+        ({username: (high_water, calendar_day, calendar_count)}) и ошибками ({username: error}).
+        calendar — строки (username, day, submissions, fetched_at). Возвращает множество затронутых дней.
+        """
+        parts = []
+        days = set()
+        if len(submissions):
+            submission_days = submissions["timestamp"].map(day_of)
+            parts += self.write_parts("submissions", submissions, submission_days)
+            days.update(submission_days)
+        if len(calendar):
+            parts += self.write_parts("submission_calendar", calendar, calendar["day"])
+            days.update(calendar["day"])
+
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE users SET high_water = ?, calendar_day = ?, calendar_count = ?, checked_at = ?, error = NULL "
+                "WHERE username = ?",
+                ((*state, now, username) for username, state in states.items()),
+            )
+            # Неудачный пользователь остаётся в конце очереди со старым high-water mark и будет проверен снова
+            self.conn.executemany(
+                "UPDATE users SET checked_at = ?, error = ? WHERE username = ?",
+                ((now, error, username) for username, error in failed.items()),
+            )
+            self.conn.executemany(
+                "INSERT INTO parts (path, committed_at) VALUES (?, ?)",
+                ((path, now) for path in parts),
+            )
+        for path in parts:
+            path = os.path.join(self.root, path)
+            os.replace(tmp_part_path(path), path)
+        return days
+
+    def read_days(self, dataset: str, days) -> pd.DataFrame:
+        """
+        Строки набора за дни days с колонкой day одним чтением (лишние партиции отсекаются по каталогам).
+        Строки с одинаковым ключом схлопываются, побеждает последняя полученная.
+        """
+        spec = DATASETS[dataset]
+        path = os.path.join(self.root, dataset)
+        columns = list(dict.fromkeys(spec["columns"] + ["day"]))
+        if not os.path.isdir(path):
+            return pd.DataFrame(columns=columns)
+        partitions = sorted({partition_of(dataset, day) for day in days})
+        frame = pd.read_parquet(path, filters=[(spec["partition"], "in", partitions)])
+        if spec["partition"] == "day":
+            frame["day"] = frame["day"].astype(str)
+        else:
+            frame = frame[frame["day"].isin(list(days))]
+        if "fetched_at" in frame:
+            frame = frame.sort_values("fetched_at", kind="stable")
+        return frame.drop_duplicates(spec["key"], keep="last")[columns]
+
+    def compact(self, days, min_parts: int = COMPACT_MIN_PARTS) -> int:
+        """
+        Сливает части каждой партиции дней days, если их больше min_parts, в одну (без повторов по ключу):
+        частые чекпоинты не оставляют тысячи мелких файлов. Новая часть и удаление старых
+        коммитятся одной транзакцией, файлы старых удаляются после неё. Возвращает число слитых дней.
+        """
+        compacted = 0
+        for dataset, spec in DATASETS.items():
+            for value in sorted({partition_of(dataset, day) for day in days}):
+                directory = os.path.join(self.root, dataset, f"{spec['partition']}={value}")
+                paths = sorted(glob.glob(os.path.join(directory, "*.parquet")))
+                if len(paths) <= min_parts:
+                    continue
+                frame = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+                if "fetched_at" in frame:
+                    frame = frame.sort_values("fetched_at", kind="stable")
+                frame = frame.drop_duplicates(spec["key"], keep="last")
+                days_of_rows = frame["day"] if "day" in frame else pd.Series(value, index=frame.index)
+                (relative,) = self.write_parts(dataset, frame, days_of_rows)
+                with self.conn:
+                    self.conn.executemany(
+                        "DELETE FROM parts WHERE path = ?", ((os.path.relpath(path, self.root),) for path in paths)
+                    )
+                    self.conn.execute("INSERT INTO parts (path, committed_at) VALUES (?, ?)", (relative, time.time()))
+                path = os.path.join(self.root, relative)
+                os.replace(tmp_part_path(path), path)
+                for old_path in paths:
+                    os.remove(old_path)
+                compacted += 1
+        return compacted
+
+    def close(self):
+        self.conn.close()
+
+
+# --- Rollups ---
+
+def daily_rollups(store: SubmissionStore, days, countries: dict):
+    """
+    Агрегаты дней days:
+    solves — решённые задачи (принятые посылки, разные задачи пользователя) по дню, стране и языку,
+    activity — посылки по submissionCalendar и активные пользователи по дню и стране.
+    countries — {username: страна}, неизвестные пользователи попадают в NOT_SPECIFIED.
+    """
+    submissions = store.read_days("submissions", days)
+    accepted = submissions[submissions["is_accepted"].astype(bool)]
+    accepted = accepted.drop_duplicates(["day", "username", "title_slug", "lang"])
+    accepted = accepted.assign(country=accepted["username"].map(countries).fillna(NOT_SPECIFIED))
+    solves = (
+        accepted.groupby(["day", "country", "lang"])
+        .agg(solves=("title_slug", "size"), users=("username", "nunique"))
+        .reset_index()
+    )
+
+    calendar = store.read_days("submission_calendar", days)
+    calendar = calendar[calendar["submissions"] > 0]
+    calendar = calendar.assign(country=calendar["username"].map(countries).fillna(NOT_SPECIFIED))
+    activity = (
+        calendar.groupby(["day", "country"])
+        .agg(submissions=("submissions", "sum"), active_users=("username", "nunique"))
+        .reset_index()
+    )
+    return solves, activity
+
+
+def update_rollups(store: SubmissionStore, days, countries: dict, solves_path: str, activity_path: str):
+    """
+    Пересчитывает агрегаты только затронутых дней и заменяет их строки в CSV solves_path и activity_path,
+    остальные дни не перечитываются. Файлы подменяются через os.replace.
+    """
+    days = sorted(days)
+    if not days:
+        return
+    solves, activity = daily_rollups(store, days, countries)
+    for path, frame, columns in (
+        (solves_path, solves, ["day", "country", "lang", "solves", "users"]),
+        (activity_path, activity, ["day", "country", "submissions", "active_users"]),
+    ):
+        frames = [frame[columns]]
+        if os.path.exists(path):
+            existing = pd.read_csv(path, dtype={"day": str}, keep_default_na=False)
+            frames.insert(0, existing[~existing["day"].isin(days)])
+        rollup = pd.concat(frames, ignore_index=True).sort_values(columns[:-2], kind="stable")
+        tmp_path = f"{path}.tmp"
+        rollup.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
@@ -0,0 +1,253 @@
+import sys
+import os
+import csv
+import json
+import time
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Клиент api, метрики и прогресс — общие с fill-user-info
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../fill-user-info')))
+
+from endpoint_pool import EndpointPool
+from http_client import FetchError
+from metrics import CrawlMetrics, MetricsServer, ProgressReporter
+from submission_store import NOT_SPECIFIED, SubmissionStore, day_of, update_rollups
+
+# --- Configuration ---
+BASE_URLS = ["http://localhost:3000"]  # экземпляры /api: пользователи распределяются между ними по username
+INPUT_FILE = "results/users.csv"
+STORE_DIR = "results"  # наборы results/submissions/ (части по дням) и results/submission_calendar/ (по месяцам)
+STATE_DB = "results/submissions_state.sqlite3"  # high-water mark и календарь каждого пользователя
+SOLVES_OUTPUT = "results/daily_solves.csv"  # решённые задачи по дням, странам и языкам
+ACTIVITY_OUTPUT = "results/daily_activity.csv"  # посылки и активные пользователи по дням и странам
+USERS_PER_RUN = 0  # сколько пользователей проверить за запуск, дольше всех не проверенные первыми (0 — все)
+SUBMISSION_LIMIT = 20  # посылок в /submission и /acSubmission (больше 20 LeetCode не отдаёт)
+CHECKPOINT_EVERY = 500  # пользователей между записями part-файлов и состояния
+
+CONCURRENCY = 16
+RATE_LIMIT_PER_SEC = 20.0  # стартовый темп каждого экземпляра api
+MIN_RATE_PER_SEC = 1.0
+MAX_RATE_PER_SEC = 50.0
+MAX_RETRIES = 6
+INITIAL_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+FAILOVER_RETRIES = 2  # при нескольких BASE_URLS: попыток на одном экземпляре до переключения на следующий
+HEALTH_CHECK_EVERY_SEC = 10.0
+
+PROGRESS_REFRESH_SEC = 1.0
+METRICS_LOG = "results/submissions_metrics.jsonl"  # снимки метрик, неудачные пользователи и пропуски посылок
+METRICS_LOG_EVERY_SEC = 30.0
+METRICS_PORT = 0  # >0: метрики Prometheus на http://127.0.0.1:<port>/metrics
+
+METRICS = CrawlMetrics()
+API_CLIENT = EndpointPool(
+    BASE_URLS, RATE_LIMIT_PER_SEC, MIN_RATE_PER_SEC, MAX_RATE_PER_SEC,
+    pool_size=CONCURRENCY, max_retries=MAX_RETRIES, failover_retries=FAILOVER_RETRIES,
+    initial_backoff=INITIAL_BACKOFF, max_backoff=MAX_BACKOFF, metrics=METRICS,
+    health_every=HEALTH_CHECK_EVERY_SEC
+)
+
+
+def read_countries(path):
+    """{username: страна} из users.csv; пустая страна — NOT_SPECIFIED, как в db_schema"""
+    countries = {}
+    with open(path, mode='r', newline='', encoding='utf-8') as infile:
+        for row in csv.DictReader(infile):
+            username = row['username'].strip()
+            if username and username != 'username':
+                countries[username] = (row.get('country') or '').strip() or NOT_SPECIFIED
+    return countries
+
+
+def fetch_calendar(username):
+    """submissionCalendar пользователя как {день: число посылок}"""
+    data = API_CLIENT.get_json(f"/{username}/calendar", key=username)
+    calendar = data["submissionCalendar"]
+    if isinstance(calendar, str):
+        calendar = json.loads(calendar)
+    days = {}
+    for timestamp, count in calendar.items():
+        day = day_of(timestamp)
+        days[day] = days.get(day, 0) + int(count)
+    return days
+
+
+def fetch_submissions(username, route):
+    data = API_CLIENT.get_json(f"/{username}/{route}?limit={SUBMISSION_LIMIT}", key=username)
+    return data["submission"] or []
+
+
+def expected_new(calendar, state):
+    """
+    Сколько посылок появилось после прошлой проверки по календарю, None — пользователь проверяется впервые.
+    Считаются дни после последнего сохранённого и прирост в сам этот день.
+    """
+    if state is None:
+        return None
+    _, last_day, last_count = state
+    if last_day is None:
+        return sum(calendar.values())
+    later = sum(count for day, count in calendar.items() if day > last_day)
+    return later + max(calendar.get(last_day, 0) - (last_count or 0), 0)
+
+
+def sync_user(username, state):
+    """
+    Проверяет одного пользователя: календарь (один запрос), и только если по нему есть новые посылки —
+    /submission и /acSubmission. Сохраняются посылки новее high-water mark и дни календаря
+    начиная с последнего сохранённого. Возвращает словарь с новыми строками и состоянием.
+    """
+    high_water, last_day, last_count = state or (None, None, None)
+    calendar = fetch_calendar(username)
+    expected = expected_new(calendar, state)
+
+    records = {}
+    gap = False
+    if expected is None or expected > 0:
+        recent = fetch_submissions(username, "submission")
+        accepted = fetch_submissions(username, "acSubmission")
+        for item in recent + accepted:
+            timestamp = int(item["timestamp"])
+            if high_water is not None and timestamp <= high_water:
+                continue
+            status = item.get("statusDisplay")
+            records.setdefault((timestamp, item["titleSlug"], item["lang"]), {
+                "username": username,
+                "timestamp": timestamp,
+                "title_slug": item["titleSlug"],
+                "title": item.get("title"),
+                "status": status,
+                "lang": item["lang"],
+                "is_accepted": status == "Accepted",
+            })
+        # Все SUBMISSION_LIMIT последних посылок новее high-water mark: более ранние новые api уже не отдаёт
+        gap = high_water is not None and len(recent) >= SUBMISSION_LIMIT and \
+            all(int(item["timestamp"]) > high_water for item in recent)
+
+    fetched_at = time.time()
+    calendar_rows = [
+        {"username": username, "day": day, "submissions": count, "fetched_at": fetched_at}
+        for day, count in calendar.items()
+        if last_day is None or day > last_day or (day == last_day and count != last_count)
+    ]
+    if calendar:
+        last_day = max(calendar)
+        last_count = calendar[last_day]
+    if records:
+        high_water = max(max(timestamp for timestamp, _, _ in records), high_water or 0)
+    return {
+        "submissions": list(records.values()),
+        "calendar": calendar_rows,
+        "state": (high_water, last_day, last_count),
+        "gap": gap,
+        "skipped": expected == 0,
+    }
+
+
+def main():
+    """
+    Инкрементальная загрузка истории посылок: пользователи из INPUT_FILE проверяются по очереди
+    (дольше всех не проверенные первыми), новые посылки и дни календаря дописываются в хранилище
+    с разбиением по дням, затем пересчитываются агрегаты только затронутых дней.
+    """
+    try:
+        countries = read_countries(INPUT_FILE)
+    except FileNotFoundError:
+        print(f"Файл {INPUT_FILE} не найден: сначала выполните leaderboard-parser")
+        return
+
+    store = SubmissionStore(STORE_DIR, STATE_DB)
+    store.add_users(countries)
+    usernames = store.due(USERS_PER_RUN)
+    states = store.states(usernames)
+    print(f"Пользователей: {len(countries)}, к проверке: {len(usernames)}, проверялись раньше: {len(states)}")
+
+    totals = {"submissions": 0, "calendar_days": 0, "skipped": 0, "gaps": 0, "failed": 0}
+    touched_days = set()
+    new_states = {}
+    failed = {}
+    submissions = []
+    calendar = []
+
+    def checkpoint():
+        frames = (pd.DataFrame(submissions), pd.DataFrame(calendar))
+        touched_days.update(store.checkpoint(new_states, failed, *frames))
+        new_states.clear()
+        failed.clear()
+        submissions.clear()
+        calendar.clear()
+
+    def write_next_user():
+        username, future = in_flight.popleft()
+        try:
+            result = future.result()
+        except FetchError as e:
+            error = str(e)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            error = f"unexpected payload: {e!r}"
+        else:
+            error = None
+            submissions.extend(result["submissions"])
+            calendar.extend(result["calendar"])
+            new_states[username] = result["state"]
+            totals["submissions"] += len(result["submissions"])
+            totals["calendar_days"] += len(result["calendar"])
+            totals["skipped"] += result["skipped"]
+            if result["gap"]:
+                totals["gaps"] += 1
+                progress.event("submission_gap", username=username, limit=SUBMISSION_LIMIT)
+            METRICS.user_done()
+        if error is not None:
+            failed[username] = error
+            totals["failed"] += 1
+            METRICS.user_failed()
+            progress.event("user_failed", username=username, error=error)
+        if len(new_states) + len(failed) >= CHECKPOINT_EVERY:
+            checkpoint()
+
+    in_flight = deque()
+    METRICS.start(len(usernames))
+    metrics_server = MetricsServer(METRICS, METRICS_PORT) if METRICS_PORT else None
+    try:
+        with ProgressReporter(
+            METRICS, API_CLIENT, METRICS_LOG, PROGRESS_REFRESH_SEC, METRICS_LOG_EVERY_SEC
+        ) as progress, ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+            try:
+                for username in usernames:
+                    in_flight.append((username, executor.submit(sync_user, username, states.get(username))))
+                    while len(in_flight) >= CONCURRENCY * 2:
+                        write_next_user()
+                while in_flight:
+                    write_next_user()
+            finally:
+                # Проверенные пользователи сохраняются, даже если запуск прерван
+                for _, future in in_flight:
+                    future.cancel()
+                checkpoint()
+                update_rollups(store, touched_days, countries, SOLVES_OUTPUT, ACTIVITY_OUTPUT)
+                store.compact(touched_days)
+    except Exception:
+        print("Загрузка посылок остановлена из-за ошибки:")
+        traceback.print_exc()
+    finally:
+        if metrics_server:
+            metrics_server.shutdown()
+            metrics_server.server_close()
+        API_CLIENT.close()
+        store.close()
+
+    print(f"\nНовых посылок: {totals['submissions']}, дней календаря: {totals['calendar_days']}, "
+          f"пользователей без новой активности: {totals['skipped']}, не удалось загрузить: {totals['failed']}")
+    if totals["gaps"]:
+        print(f"- У {totals['gaps']} пользователей новых посылок больше {SUBMISSION_LIMIT}: "
+              f"более ранние из них api не отдаёт, они учтены только в календаре")
+    print(f"- Посылки: {os.path.join(STORE_DIR, 'submissions')}/day=*/, календарь: {os.path.join(STORE_DIR, 'submission_calendar')}/month=*/")
+    print(f"- Агрегаты по дням ({len(touched_days)} затронуто): {SOLVES_OUTPUT}, {ACTIVITY_OUTPUT}")
+
+
+if __name__ == "__main__":
+    main()